@@ -1,11 +1,16 @@
-import logging, json
+import logging, json, time
 import httpx
-from typing import Any, Dict, Optional
-from .config import AIPIPE_TOKEN
+from typing import Any, Callable, Dict, Optional
+from .config import AIPIPE_TOKEN, AIPIPE_URL, LLM_CACHE_TTL, LLM_STREAM
+from .http_client import get_client, timeout_for
+from .llm_cache import llm_cache
+from .llm_scheduler import llm_scheduler, RateLimited
+from .utils import timer
+from .metrics import observe
 
 logger = logging.getLogger("aipipe-client")
 
-AIPIPE_OPENROUTER_URL = "https://aipipe.org/openrouter/v1/responses"
+AIPIPE_OPENROUTER_URL = AIPIPE_URL
 
 HEADERS = {}
 if AIPIPE_TOKEN:
@@ -13,23 +18,182 @@ if AIPIPE_TOKEN:
 else:
     logger.warning("AIPIPE_TOKEN not set — AiPipe calls will be skipped or mocked.")
 
-async def ask_openai(prompt: str, model: str = "openai/gpt-4o-mini", timeout: int = 30) -> Optional[Dict[str, Any]]:
+async def ask_openai(prompt: str, model: str = "openai/gpt-4o-mini", timeout: int = 30,
+                     deadline_ts: Optional[float] = None, priority: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    One AiPipe call through llm_scheduler (in-flight cap, adaptive rate, retries within
+    deadline_ts). priority defaults to the calling task's llm_priority.
+    """
     if not AIPIPE_TOKEN:
         logger.warning("Skipping AiPipe call: no token")
         return None
     payload = {"model": model, "input": prompt}
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.post(AIPIPE_OPENROUTER_URL, headers=HEADERS, json=payload)
+
+    async def send():
+        return await get_client().post(AIPIPE_OPENROUTER_URL, headers=HEADERS, json=payload,
+                                       timeout=timeout_for("llm", timeout, deadline_ts))
+
+    with timer("llm", worker=model) as span:
+        try:
+            r = await llm_scheduler.request(send, priority=priority, deadline_ts=deadline_ts)
             r.raise_for_status()
             return r.json()
-    except httpx.HTTPStatusError as e:
-        body = e.response.text if e.response is not None else ""
-        logger.error("OpenRouter HTTP error %s: %s", e.response.status_code if e.response else "?", body[:500])
+        except httpx.HTTPStatusError as e:
+            span["outcome"] = f"http_{e.response.status_code}" if e.response is not None else "http_error"
+            body = e.response.text if e.response is not None else ""
+            logger.error("OpenRouter HTTP error %s: %s", e.response.status_code if e.response else "?", body[:500])
+            return None
+        except RateLimited as e:
+            span["outcome"] = "rate_limited"
+            logger.error("OpenRouter call not sent: %s", e)
+            return None
+        except Exception as e:
+            span["outcome"] = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            logger.error("OpenRouter call failed: %s", e)
+            return None
+
+
+# --- streaming ---
+
+StopCondition = Callable[[str], Optional[str]]
+
+
+def first_line(text: str) -> Optional[str]:
+    """Stop once the first non-empty line (code fences aside) is complete; returns that line."""
+    lines = text.split("\n")
+    for line in lines[:-1]:  # the last piece may still be growing
+        line = line.strip()
+        if line and not line.startswith("```"):
+            return line
+    return None
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def json_value(text: str) -> Optional[str]:
+    """Stop once a complete JSON value has been streamed; returns its source text."""
+    s = text.lstrip()
+    if s.startswith("```"):
+        s = s.split("\n", 1)[1].lstrip() if "\n" in s else ""
+    if not s:
+        return None
+    try:
+        _, end = _JSON_DECODER.raw_decode(s)
+    except ValueError:
         return None
-    except Exception as e:
-        logger.error("OpenRouter call failed: %s", e)
+    # a bare number or literal may still be growing ("12" -> "123"): wait for what follows it
+    if s[0] not in "{[\"" and end == len(s):
         return None
+    return s[:end]
+
+
+def first_answer(text: str) -> Optional[str]:
+    """
+    json_value when the answer opens a JSON object or array (which may span lines), else first_line.
+    Complete preamble lines ending in ":" ("The answer is:") and code fences are skipped.
+    """
+    s = text.lstrip()
+    while True:
+        if not (s.startswith("```") or s.split("\n", 1)[0].rstrip().endswith(":")):
+            break
+        if "\n" not in s:
+            return None  # still growing, or only a preamble so far
+        s = s.split("\n", 1)[1].lstrip()
+    if s[:1] in ("{", "["):
+        return json_value(s)
+    return first_line(s)
+
+
+def _sse_delta(event: Dict[str, Any]) -> str:
+    """Text carried by one SSE event, for both the responses and the chat-completions stream shapes."""
+    kind = event.get("type") or ""
+    if kind == "response.output_text.delta":
+        return event.get("delta") or ""
+    if kind in ("error", "response.failed"):
+        raise RuntimeError(f"stream error: {json.dumps(event)[:300]}")
+    choices = event.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        delta = choices[0].get("delta") or {}
+        return delta.get("content") or "" if isinstance(delta, dict) else ""
+    return ""
+
+
+async def stream_openai(prompt: str, model: str = "openai/gpt-4o-mini", timeout: int = 30,
+                        deadline_ts: Optional[float] = None, priority: Optional[int] = None,
+                        stop: Optional[StopCondition] = None) -> Optional[str]:
+    """
+    Like ask_openai, but streams the response (SSE) and returns its text.
+    stop(text_so_far) is checked after every delta; a non-None result closes the stream
+    and is returned. Time to first token is recorded as the llm_ttft stage.
+    A server that answers with plain JSON instead of a stream is handled too.
+    """
+    if not AIPIPE_TOKEN:
+        logger.warning("Skipping AiPipe call: no token")
+        return None
+    payload = {"model": model, "input": prompt, "stream": True}
+    out: Dict[str, Any] = {}
+
+    async def send():
+        out.clear()
+        parts = []
+        t0 = time.perf_counter()
+        request = get_client().build_request("POST", AIPIPE_OPENROUTER_URL, headers=HEADERS, json=payload,
+                                             timeout=timeout_for("llm", timeout, deadline_ts))
+        r = await get_client().send(request, stream=True)
+        try:
+            if r.status_code >= 400:
+                await r.aread()
+                return r
+            if "text/event-stream" not in r.headers.get("content-type", ""):
+                await r.aread()
+                out["text"] = _extract_text_from_openai_like(r.json())
+                return r
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = _sse_delta(json.loads(data))
+                except ValueError:
+                    continue
+                if not delta:
+                    continue
+                if not parts:
+                    observe("llm_ttft", time.perf_counter() - t0, worker=model)
+                parts.append(delta)
+                if stop is not None:
+                    early = stop("".join(parts))
+                    if early is not None:
+                        out["text"], out["stopped"] = early, True
+                        return r
+            text = "".join(parts)
+            out["text"] = (stop(text + "\n") if stop is not None else None) or text.strip()
+            return r
+        finally:
+            await r.aclose()
+
+    with timer("llm", worker=model) as span:
+        try:
+            r = await llm_scheduler.request(send, priority=priority, deadline_ts=deadline_ts)
+            r.raise_for_status()
+            if out.get("stopped"):
+                span["outcome"] = "stopped"
+            return out.get("text")
+        except httpx.HTTPStatusError as e:
+            span["outcome"] = f"http_{e.response.status_code}"
+            logger.error("OpenRouter HTTP error %s: %s", e.response.status_code, e.response.text[:500])
+            return None
+        except RateLimited as e:
+            span["outcome"] = "rate_limited"
+            logger.error("OpenRouter call not sent: %s", e)
+            return None
+        except Exception as e:
+            span["outcome"] = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            logger.error("OpenRouter streaming call failed: %s", e)
+            return None
 
 # app/aipipe_client.py — replace _extract_text_from_openai_like with this stronger parser
 def _extract_text_from_openai_like(resp: Dict[str, Any]) -> str:
@@ -84,17 +248,46 @@ def _extract_text_from_openai_like(resp: Dict[str, Any]) -> str:
                     return v.strip()
     return ""
 
-async def run_llm(prompt: str, timeout: int = 30) -> str:
+async def run_llm(prompt: str, timeout: int = 30, model: str = "openai/gpt-4o-mini",
+                  bypass_cache: bool = False, cache_ttl: Optional[float] = None,
+                  deadline_ts: Optional[float] = None, priority: Optional[int] = None,
+                  stop: Optional[StopCondition] = None) -> str:
     """
     Use AiPipe (OpenRouter) to run LLM inference. Returns plain text (or empty on failure).
+    deadline_ts caps the request timeout (and any retries) at the time left before it;
+    priority orders the call in llm_scheduler's queue (lower first).
+    `stop` (e.g. first_answer) trims the reply to what it returns: with LLM_STREAM it also ends
+    the stream early, otherwise it is applied to the whole reply, so the result does not depend on
+    the transport. Answers are cached per (model, prompt, stop); bypass_cache forces a fresh call
+    (and refreshes the entry).
     """
+    use_cache = LLM_CACHE_TTL > 0
+    # a stop-trimmed reply must not be served to a caller that wants the whole text
+    cache_model = model if stop is None else f"{model}#stop={stop.__module__}.{stop.__qualname__}"
+    if use_cache and not bypass_cache:
+        cached = await llm_cache.get(cache_model, prompt)
+        if cached is not None:
+            return cached
+    elif bypass_cache:
+        llm_cache.counters["bypasses"] += 1
     if not AIPIPE_TOKEN:
         logger.warning("No AIPIPE_TOKEN, returning empty")
         return ""
-    result = await ask_openai(prompt, model="openai/gpt-4o-mini", timeout=timeout)
+    if LLM_STREAM:
+        text = await stream_openai(prompt, model=model, timeout=timeout, deadline_ts=deadline_ts,
+                                   priority=priority, stop=stop)
+        if text and use_cache:
+            await llm_cache.put(cache_model, prompt, text, ttl=cache_ttl)
+        return text or ""
+    result = await ask_openai(prompt, model=model, timeout=timeout, deadline_ts=deadline_ts,
+                              priority=priority)
     if result:
         text = _extract_text_from_openai_like(result)
+        if text and stop is not None:
+            text = stop(text + "\n") or text
         if text:
+            if use_cache:
+                await llm_cache.put(cache_model, prompt, text, ttl=cache_ttl)
             return text
         logger.warning("OpenRouter response had no extractable text; sample: %s", json.dumps(result)[:500])
     return ""
@@ -0,0 +1,133 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from ..config import BROWSER_POOL_SIZE, BROWSER_MAX_USES
+from ..utils import logger
+
+
+class BrowserPool:
+    """
+    Process-wide Chromium pool.
+    One browser is kept alive and hands out isolated BrowserContexts (at most max_contexts at once).
+    A browser is retired after max_uses contexts or when it disconnects; a retired browser is
+    closed as soon as its last active context is released.
+    """
+
+    def __init__(self, max_contexts: int = BROWSER_POOL_SIZE, max_uses: int = BROWSER_MAX_USES, headless: bool = True):
+        self.max_contexts = max(1, max_contexts)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self._sem = asyncio.Semaphore(self.max_contexts)
+        self._lock = asyncio.Lock()
+        self._pw = None
+        self._current: Optional[Dict[str, Any]] = None
+        self._closing = False
+        self.launches = 0
+        self.active = 0
+
+    async def start(self):
+        """Start Playwright and launch the first browser (called from app startup)."""
+        self._closing = False
+        async with self._lock:
+            await self._ensure_browser()
+
+    async def stop(self):
+        """Close every browser and stop Playwright (called from app shutdown)."""
+        self._closing = True
+        async with self._lock:
+            if self._current is not None:
+                await self._close_entry(self._current)
+                self._current = None
+            if self._pw is not None:
+                try:
+                    await self._pw.stop()
+                except Exception as e:
+                    logger.warning("Playwright stop failed: %s", e)
+                self._pw = None
+
+    async def _ensure_browser(self) -> Dict[str, Any]:
+        # caller must hold self._lock
+        cur = self._current
+        if cur is not None and cur["browser"].is_connected() and cur["uses"] < self.max_uses:
+            return cur
+        if cur is not None:
+            self._retire(cur)
+        if self._pw is None:
+            from playwright.async_api import async_playwright
+            self._pw = await async_playwright().start()
+        browser = await self._pw.chromium.launch(headless=self.headless)
+        self.launches += 1
+        entry = {"browser": browser, "uses": 0, "active": 0, "retired": False}
+        browser.on("disconnected", lambda _b: self._on_disconnected(entry))
+        self._current = entry
+        logger.info("Browser pool launched chromium (launch #%d)", self.launches)
+        return entry
+
+    def _on_disconnected(self, entry: Dict[str, Any]):
+        if not entry["retired"] and not self._closing:
+            logger.warning("Pooled browser disconnected; it will be relaunched on next use")
+        entry["retired"] = True
+
+    def _retire(self, entry: Dict[str, Any]):
+        entry["retired"] = True
+        if self._current is entry:
+            self._current = None
+        if entry["active"] == 0:
+            asyncio.ensure_future(self._close_entry(entry))
+
+    async def _close_entry(self, entry: Dict[str, Any]):
+        entry["retired"] = True
+        try:
+            if entry["browser"].is_connected():
+                await entry["browser"].close()
+        except Exception as e:
+            logger.warning("Browser close failed: %s", e)
+
+    @asynccontextmanager
+    async def page(self, **context_kwargs):
+        """
+        Yield a fresh page inside an isolated BrowserContext.
+        The context is closed on exit; the underlying browser is reused.
+        """
+        from playwright.async_api import Error as PWError
+        async with self._sem:
+            async with self._lock:
+                entry = await self._ensure_browser()
+                entry["uses"] += 1
+                entry["active"] += 1
+            self.active += 1
+            context = None
+            try:
+                context = await entry["browser"].new_context(**context_kwargs)
+                yield await context.new_page()
+            except PWError:
+                if not entry["browser"].is_connected():
+                    entry["retired"] = True
+                raise
+            finally:
+                self.active -= 1
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                entry["active"] -= 1
+                if entry["uses"] >= self.max_uses or not entry["browser"].is_connected():
+                    entry["retired"] = True
+                if entry["retired"]:
+                    async with self._lock:
+                        if self._current is entry:
+                            self._current = None
+                    if entry["active"] == 0:
+                        await self._close_entry(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_contexts": self.max_contexts,
+            "active_contexts": self.active,
+            "launches": self.launches,
+            "current_uses": self._current["uses"] if self._current else 0,
+        }
+
+
+browser_pool = BrowserPool()
@@ -1,69 +1,85 @@
-import asyncio, re, base64, logging
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
-from ..utils import logger
+import time
+from playwright.async_api import TimeoutError as PWTimeout
+from ..utils import logger, timer
+from .browser_pool import browser_pool
+from .page_extract import decode_atob_instruction, find_submit_urls, find_data_urls, origin_of
+from .readiness import wait_ready
+from .resource_policy import resource_policy
 
-# ... keep imports ...
+# Everything render_page_extract reads from the page, gathered in one round trip.
+# Anchor/form URLs come back resolved against the page (the .href/.action properties).
+EXTRACT_JS = """
+() => {
+  const cellText = c => (c.innerText || c.textContent || "").trim();
+  const attrUrls = [];
+  for (const el of document.querySelectorAll("[src],[data-url],[data-href]")) {
+    for (const name of ["src", "data-url", "data-href"]) {
+      const v = el.getAttribute(name);
+      if (v) attrUrls.push(v);
+    }
+  }
+  return {
+    html: document.documentElement.outerHTML,
+    scripts: Array.from(document.scripts, s => s.textContent || "").filter(Boolean),
+    text: document.body ? document.body.innerText : "",
+    hrefs: Array.from(document.querySelectorAll("a[href]"), a => a.href),
+    forms: Array.from(document.forms, f => f.action).filter(Boolean),
+    attr_urls: attrUrls,
+    origin: location.origin,
+    tables: Array.from(document.querySelectorAll("table"),
+                       t => Array.from(t.rows, r => Array.from(r.cells, cellText))),
+  };
+}
+"""
 
-async def render_page_extract(url: str, wait_until="networkidle", timeout=30000):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
+
+def page_info_from_extract(data: dict, url: str) -> dict:
+    """page_info from the EXTRACT_JS result; the URL regexes only see text, scripts and attributes, not the whole HTML."""
+    instruction = decode_atob_instruction("\n".join(data.get("scripts") or []))
+    instruction_from = "atob" if instruction else "text"
+    text = data.get("text") or ""
+    if not instruction:
+        instruction = text
+    searchable = "\n".join([*(data.get("scripts") or []), text, instruction, *(data.get("hrefs") or []),
+                            *(data.get("attr_urls") or [])])
+    submit_urls = find_submit_urls(searchable)
+    origin = (data.get("origin") or "").rstrip("/")
+    if not submit_urls and origin and origin != "null" and "/submit" in searchable:
+        submit_urls = [origin + "/submit"]
+    if not submit_urls and data.get("forms"):
+        submit_urls = [data["forms"][0]]
+    return {
+        "instruction": instruction,
+        "instruction_from": instruction_from,
+        "submit_url": submit_urls[0] if submit_urls else None,
+        # src/data-url attributes come back as written: resolve them (and any relative href) against the page
+        "data_urls": find_data_urls(searchable, [*(data.get("hrefs") or []), *(data.get("attr_urls") or [])],
+                                    base_url=url),
+        "tables": data.get("tables") or [],
+        "html": data.get("html") or "",
+        "url": url,
+        "via": "browser",
+    }
+
+
+async def render_page_extract(url: str, wait_until="domcontentloaded", timeout=90000):
+    """
+    Navigate (up to wait_until), wait for the page's content with the readiness engine and extract it.
+    timeout (ms) covers all of it: a first goto gets a third, a retry two thirds of what is left, readiness the rest.
+    """
+    end = time.monotonic() + timeout / 1000
+    async with browser_pool.page() as page:
+        resources = await resource_policy.attach(page, url)
         try:
-            await page.goto(url, wait_until=wait_until, timeout=timeout)
+            await page.goto(url, wait_until=wait_until, timeout=timeout // 3)
         except PWTimeout:
             logger.warning("Page load timeout, trying again with longer timeout")
-            await page.goto(url, wait_until="domcontentloaded", timeout=timeout*2)
-        await asyncio.sleep(1.0)
-        html = await page.content()
-        script_texts = await page.eval_on_selector_all("script", "elements => elements.map(e => e.innerText)")
-        combined = "\n".join([s for s in script_texts if s])
-        instruction = ""
-        b64_matches = re.findall(r"atob\(`([^`]+)`\)", combined)
-        if b64_matches:
-            try:
-                dec = "".join([base64.b64decode(x).decode("utf-8", errors="ignore") for x in b64_matches])
-                instruction = dec
-            except Exception as e:
-                logger.warning("Failed to decode base64: %s", e)
-        if not instruction:
-            visible = await page.inner_text("body")
-            instruction = visible[:10000]
-        submit_urls = re.findall(r"https?://[A-Za-z0-9./?=_-]*submit[A-Za-z0-9./?=_-]*", html)
-        if not submit_urls:
-            try:
-                visible = await page.inner_text("body")
-            except Exception:
-                visible = ""
-            if "/submit" in html or "/submit" in visible:
-                try:
-                    origin = await page.evaluate("() => window.location.origin")
-                    if origin:
-                        submit_urls = [origin.rstrip("/") + "/submit"]
-                except Exception:
-                    pass
-        if not submit_urls:
-            try:
-                form_action = await page.eval_on_selector("form", "f => f.action", timeout=2000)
-                if form_action:
-                    submit_urls = [form_action]
-            except Exception:
-                submit_urls = []
-        data_urls = re.findall(r"https?://[A-Za-z0-9./?=_-]+\.(?:csv|xlsx|xls|pdf|png|jpg|jpeg)", html)
-        anchors = await page.query_selector_all("a")
-        for a in anchors:
-            try:
-                href = await a.get_attribute("href")
-                if href and href.startswith("http"):
-                    if any(href.lower().endswith(ext) for ext in [".csv", ".xlsx", ".xls", ".pdf", ".png", ".jpg", ".jpeg"]):
-                        data_urls.append(href)
-            except Exception:
-                pass
-        await browser.close()
-        return {
-            "instruction": instruction,
-            "submit_url": submit_urls[0] if submit_urls else None,
-            "data_urls": list(dict.fromkeys(data_urls)),
-            "html": html,
-            "url": url
-        }
+            await page.goto(url, wait_until=wait_until, timeout=max(1000, int((end - time.monotonic()) * 1000 * 2 / 3)))
+        await wait_ready(page, origin_of(page.url) or origin_of(url), end - time.monotonic())
+        with timer("extract", worker="browser"):
+            data = await page.evaluate(EXTRACT_JS)
+            page_info = page_info_from_extract(data, url)
+        page_info["resources"] = dict(resources)
+        logger.info("Rendered %s: %d requests, %d blocked, %d from asset cache, ~%d KB saved", url,
+                    resources["requests"], resources["blocked"], resources["cached"], resources["bytes_saved"] // 1024)
+        return page_info
@@ -0,0 +1,192 @@
+import asyncio, os, sqlite3, threading, time, uuid
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from ..config import DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_BYTES, DOWNLOAD_CACHE_MAX_AGE, DOWNLOAD_CACHE_FRESH_SECONDS
+from ..utils import logger
+from .downloader import fetch_to_file
+
+
+class DownloadCache:
+    """
+    URL -> local file cache shared by every worker, and by every process using the same root.
+    Files are stored once per content hash under <root>/blobs; a SQLite index maps each URL to its
+    blob plus the ETag/Last-Modified validators used to revalidate it. Concurrent requests for the
+    same URL in one process share one transfer. Entries are evicted by age and then
+    least-recently-used until the blobs fit in max_bytes; entries used (by any process) within the
+    fresh window are never evicted, so paths already handed to a worker stay valid. Blobs are only
+    added or removed inside an index write transaction, so processes never delete each other's files.
+    """
+
+    def __init__(self, root: str = DOWNLOAD_CACHE_DIR, max_bytes: int = DOWNLOAD_CACHE_MAX_BYTES,
+                 max_age: int = DOWNLOAD_CACHE_MAX_AGE, fresh_seconds: int = DOWNLOAD_CACHE_FRESH_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fresh_seconds = fresh_seconds
+        self._blob_dir = os.path.join(root, "blobs")
+        self._tmp_dir = os.path.join(root, "tmp")
+        self._index_path = os.path.join(root, "index.sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "shared": 0, "evicted": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self._blob_dir, exist_ok=True)
+            os.makedirs(self._tmp_dir, exist_ok=True)
+            conn = sqlite3.connect(self._index_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, sha256 TEXT, ext TEXT, size INTEGER, "
+                "etag TEXT, last_modified TEXT, fetched_at REAL, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, entry) -> str:
+        return os.path.join(self._blob_dir, entry["sha256"] + (entry["ext"] or ""))
+
+    def _lookup(self, url: str, now: float) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(entry, fresh). A fresh entry is marked used in the same transaction, so no process evicts it now."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+                if row is None or not os.path.exists(self._blob_path(row)):
+                    return None, False
+                fresh = now - row["fetched_at"] < self.fresh_seconds
+                if fresh:
+                    db.execute("UPDATE entries SET last_used = ? WHERE url = ?", (now, url))
+                return dict(row), fresh
+            finally:
+                db.execute("COMMIT")
+
+    def _touch(self, url: str, now: float) -> bool:
+        """Mark a revalidated entry fresh; False when its blob went away meanwhile."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+                if row is None or not os.path.exists(self._blob_path(row)):
+                    return False
+                db.execute("UPDATE entries SET fetched_at = ?, last_used = ? WHERE url = ?", (now, now, url))
+                return True
+            finally:
+                db.execute("COMMIT")
+
+    def _store(self, url: str, entry: Dict[str, Any], tmp: str, now: float) -> str:
+        """Move the downloaded file into place, index it and evict, all under the index write lock."""
+        dest = self._blob_path(entry)
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if os.path.exists(dest):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, dest)
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           (url, entry["sha256"], entry["ext"], entry["size"], entry["etag"],
+                            entry["last_modified"], now, now))
+                self._evict(db, now)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return dest
+
+    async def get(self, url: str, timeout: Optional[float] = None) -> str:
+        """
+        Return a local path holding the body of url, downloading or revalidating as needed.
+        timeout bounds the transfer; a download already in flight keeps its starter's timeout.
+        """
+        task = self._inflight.get(url)
+        if task is not None:
+            self.counters["shared"] += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(url, timeout))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(url, None))
+        # shield: one cancelled caller must not abort the transfer the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, timeout: Optional[float] = None) -> str:
+        now = time.time()
+        entry, fresh = await asyncio.to_thread(self._lookup, url, now)
+        if fresh:
+            self.counters["hits"] += 1
+            return self._blob_path(entry)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        tmp = os.path.join(self._tmp_dir, uuid.uuid4().hex)
+        try:
+            meta = await fetch_to_file(url, tmp, headers=headers or None, timeout=timeout)
+            if meta["status"] == 304 and entry is not None:
+                if await asyncio.to_thread(self._touch, url, now):
+                    self.counters["revalidated"] += 1
+                    return self._blob_path(entry)
+                # evicted by another process during the revalidation: fetch the body
+                meta = await fetch_to_file(url, tmp, timeout=timeout)
+            self.counters["misses"] += 1
+            entry = {
+                "sha256": meta["sha256"],
+                "ext": os.path.splitext(urlparse(url).path)[1].lower(),
+                "size": meta["bytes"],
+                "etag": meta.get("etag"),
+                "last_modified": meta.get("last_modified"),
+            }
+            return await asyncio.to_thread(self._store, url, entry, tmp, now)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        """Runs inside _store's transaction, against the index as every process last left it."""
+        protected = now - self.fresh_seconds
+        rows = db.execute("SELECT * FROM entries ORDER BY last_used").fetchall()
+        refs: Dict[str, int] = {}
+        sizes: Dict[str, int] = {}
+        for r in rows:
+            path = self._blob_path(r)
+            refs[path] = refs.get(path, 0) + 1
+            sizes[path] = r["size"]
+        total = sum(sizes.values())
+        for r in rows:
+            expired = r["last_used"] < now - self.max_age
+            if r["last_used"] >= protected or (not expired and total <= self.max_bytes):
+                continue
+            db.execute("DELETE FROM entries WHERE url = ?", (r["url"],))
+            self.counters["evicted"] += 1
+            path = self._blob_path(r)
+            refs[path] -= 1
+            if refs[path] == 0:
+                # blob no longer referenced by another URL with identical content
+                total -= sizes.pop(path)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            logger.info("Download cache evicted %s", r["url"])
+
+    def stats(self) -> Dict[str, Any]:
+        entries = None
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return {**self.counters, "entries": entries, "inflight": len(self._inflight)}
+
+
+download_cache = DownloadCache()
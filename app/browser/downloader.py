@@ -1,14 +1,75 @@
-import httpx, os, logging
-from ..config import DOWNLOAD_MAX_BYTES
-from ..utils import logger
+import os, logging, hashlib, time
+from typing import Any, Dict, Optional
+from ..config import DOWNLOAD_MAX_BYTES, DOWNLOAD_CHUNK_BYTES, DOWNLOAD_SLOW_BYTES_PER_SEC
+from ..utils import logger, timer
+from ..http_client import get_client, timeout_for
 
-async def download_file(url: str, dest_path: str, timeout: int = 60):
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.get(url, follow_redirects=True)
+
+class DownloadTooLarge(ValueError):
+    pass
+
+
+async def fetch_to_file(url: str, dest_path: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                        max_bytes: int = DOWNLOAD_MAX_BYTES, hash_algo: Optional[str] = "sha256") -> Dict[str, Any]:
+    """
+    Stream url into dest_path chunk by chunk and return response metadata
+    (status, validators, size, content hash, throughput).
+    Rejects up front on Content-Length and aborts mid-stream once max_bytes is crossed,
+    so memory stays at one chunk per download. A 304 answer to conditional headers writes nothing.
+    timeout defaults to the "download" profile.
+    """
+    with timer("download") as span:
+        try:
+            meta = await _stream_to_file(url, dest_path, headers, timeout, max_bytes, hash_algo)
+        except DownloadTooLarge:
+            span["outcome"] = "too_large"
+            raise
+        if meta["status"] == 304:
+            span["outcome"] = "not_modified"
+        return meta
+
+
+async def _stream_to_file(url: str, dest_path: str, headers: Optional[Dict[str, str]], timeout: Optional[float],
+                          max_bytes: int, hash_algo: Optional[str]) -> Dict[str, Any]:
+    t0 = time.monotonic()
+    async with get_client().stream("GET", url, headers=headers, follow_redirects=True,
+                                   timeout=timeout_for("download", timeout)) as r:
+        meta = {"status": r.status_code, "etag": r.headers.get("etag"), "last_modified": r.headers.get("last-modified")}
+        if r.status_code == 304:
+            return meta
         r.raise_for_status()
-        content = r.content
-        if len(content) > DOWNLOAD_MAX_BYTES:
-            raise ValueError("Download exceeds max size")
-        with open(dest_path, "wb") as f:
-            f.write(content)
+        declared = r.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise DownloadTooLarge(f"Download exceeds max size ({declared} > {max_bytes} bytes)")
+        digest = hashlib.new(hash_algo) if hash_algo else None
+        size = 0
+        try:
+            with open(dest_path, "wb") as f:
+                async for chunk in r.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadTooLarge(f"Download exceeds max size (> {max_bytes} bytes)")
+                    if digest is not None:
+                        digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            try:
+                os.remove(dest_path)
+            except OSError:
+                pass
+            raise
+
+    elapsed = max(time.monotonic() - t0, 1e-6)
+    rate = size / elapsed
+    if size >= DOWNLOAD_CHUNK_BYTES and rate < DOWNLOAD_SLOW_BYTES_PER_SEC:
+        logger.warning("Slow download: %s %d bytes in %.2fs (%.0f B/s)", url, size, elapsed, rate)
+    else:
+        logger.info("Downloaded %s: %d bytes in %.2fs (%.0f B/s)", url, size, elapsed, rate)
+    meta.update(bytes=size, elapsed=elapsed, bytes_per_sec=rate)
+    if digest is not None:
+        meta[hash_algo] = digest.hexdigest()
+    return meta
+
+async def download_file(url: str, dest_path: str, timeout: Optional[float] = None):
+    await fetch_to_file(url, dest_path, timeout=timeout, hash_algo=None)
     return dest_path
@@ -0,0 +1,45 @@
+import re, base64
+from typing import Iterable, List
+from urllib.parse import urljoin, urlparse
+from ..utils import logger
+
+DATA_EXTENSIONS = (".csv", ".xlsx", ".xls", ".pdf", ".png", ".jpg", ".jpeg")
+
+_ATOB_RE = re.compile(r"atob\(`([^`]+)`\)")
+# host with an optional :port, then the path characters the quiz pages use
+_SUBMIT_RE = re.compile(r"https?://[A-Za-z0-9.-]+(?::\d+)?[A-Za-z0-9./?=_-]*submit[A-Za-z0-9./?=_-]*")
+_DATA_RE = re.compile(r"https?://[A-Za-z0-9.-]+(?::\d+)?[A-Za-z0-9./?=_-]*\.(?:csv|xlsx|xls|pdf|png|jpg|jpeg)")
+
+
+def decode_atob_instruction(script_text: str) -> str:
+    """Decode and join every atob(`...`) payload found in the given script text."""
+    b64_matches = _ATOB_RE.findall(script_text or "")
+    if not b64_matches:
+        return ""
+    try:
+        return "".join([base64.b64decode(x).decode("utf-8", errors="ignore") for x in b64_matches])
+    except Exception as e:
+        logger.warning("Failed to decode base64: %s", e)
+        return ""
+
+
+def find_submit_urls(text: str) -> List[str]:
+    return _SUBMIT_RE.findall(text or "")
+
+
+def origin_of(url: str) -> str:
+    p = urlparse(url or "")
+    return f"{p.scheme}://{p.netloc}" if p.scheme and p.netloc else ""
+
+
+def find_data_urls(text: str, hrefs: Iterable[str] = (), base_url: str = "") -> List[str]:
+    """Absolute data-file URLs from free text plus anchor hrefs, de-duplicated in order."""
+    data_urls = _DATA_RE.findall(text or "")
+    for href in hrefs:
+        if not href:
+            continue
+        if base_url and not href.startswith("http"):
+            href = urljoin(base_url, href)
+        if href.startswith("http") and href.lower().endswith(DATA_EXTENSIONS):
+            data_urls.append(href)
+    return list(dict.fromkeys(data_urls))
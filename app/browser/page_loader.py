@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from ..utils import logger, now_ts, timer
+from ..budget import time_left
+from .page_extract import origin_of
+from .http_fetcher import fetch_page_extract
+
+
+class OriginPaths:
+    """
+    origin -> "http" | "browser": the extraction path that last produced a usable page there.
+    Kept for the most recent `max_origins` origins; a "browser" verdict expires after `ttl`
+    seconds so the HTTP fast path is tried again.
+    """
+
+    def __init__(self, max_origins: int = 256, ttl: float = 600.0):
+        self.max_origins = max_origins
+        self.ttl = ttl
+        self._paths: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, origin: str) -> Optional[str]:
+        item = self._paths.get(origin)
+        if item is None:
+            return None
+        if item[0] == "browser" and time.monotonic() - item[1] > self.ttl:
+            del self._paths[origin]
+            return None
+        self._paths.move_to_end(origin)
+        return item[0]
+
+    def learn(self, origin: str, path: str):
+        if not origin:
+            return
+        self._paths[origin] = (path, time.monotonic())
+        self._paths.move_to_end(origin)
+        while len(self._paths) > self.max_origins:
+            self._paths.popitem(last=False)
+
+
+_origin_paths = OriginPaths()
+
+
+def _usable(page_info: Dict[str, Any]) -> bool:
+    return bool(page_info and (page_info.get("instruction") or "").strip())
+
+
+async def load_page_info(url: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build page_info for url, trying a plain HTTP fetch before the headless browser.
+    Origins where the HTTP page lacked the instruction go straight to the browser for a while;
+    an HTTP error (possibly transient) does not count against the origin.
+    timeout (seconds) bounds both paths together: the HTTP try gets at most half, the browser the rest.
+    """
+    deadline_ts = now_ts() + timeout if timeout else None
+    origin = origin_of(url)
+    http_lacked = False  # this HTTP try returned a page without the instruction
+    if _origin_paths.get(origin) != "browser":
+        with timer("render", worker="http") as span:
+            try:
+                page_info = await fetch_page_extract(url, timeout=time_left(deadline_ts, cap=timeout and timeout / 2))
+                if _usable(page_info):
+                    _origin_paths.learn(origin, "http")
+                    return page_info
+                span["outcome"] = "needs_browser"
+                http_lacked = True
+            except Exception as e:
+                span["outcome"] = "error"
+                logger.warning("HTTP fast path failed for %s: %s", url, e)
+        logger.info("Falling back to browser rendering for %s", url)
+    # imported here so Playwright is only loaded once a page actually needs it
+    from .browser_runner import render_page_extract
+    with timer("render", worker="browser") as span:
+        left = time_left(deadline_ts)
+        page_info = await (render_page_extract(url, timeout=int(left * 1000)) if left else render_page_extract(url))
+        if not _usable(page_info):
+            span["outcome"] = "no_instruction"
+        elif http_lacked:
+            # the verdict's age is not refreshed by later browser renders, so it does expire
+            _origin_paths.learn(origin, "browser")
+    return page_info
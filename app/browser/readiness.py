@@ -0,0 +1,144 @@
+import asyncio, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..config import BROWSER_READY_MAX_WAIT, BROWSER_READY_STABLE
+from ..metrics import observe
+from ..utils import logger
+
+# One cheap probe of the DOM per poll: what readiness signals are visible right now.
+PROBE_JS = """
+() => {
+  const result = document.querySelector("#result");
+  const text = document.body ? document.body.innerText : "";
+  let hash = 0;
+  for (let i = 0; i < text.length; i++) hash = (hash * 31 + text.charCodeAt(i)) | 0;
+  return {
+    state: document.readyState,
+    result: result ? (result.innerText || "").trim().length : -1,
+    // only the atob(`...`) form decode_atob_instruction can read (page_extract._ATOB_RE)
+    atob: Array.from(document.scripts).some(s => /atob\(`[^`]+`\)/.test(s.textContent || "")),
+    text: text.trim().length,
+    hash: hash,
+  };
+}
+"""
+
+# how long an empty #result is waited for before stable text alone is accepted
+RESULT_GRACE = 2.0
+POLL_FIRST, POLL_MAX = 0.05, 0.5
+
+
+class ReadinessHints:
+    """
+    What made pages of an origin ready last time ("atob", "result", "stable", or a load-state
+    fallback) and how long it took (moving average), so the next page of a chain waits for the
+    right thing. Kept for the most recent `max_origins` origins.
+    """
+
+    def __init__(self, max_origins: int = 256):
+        self.max_origins = max_origins
+        self._hints: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, origin: str) -> Optional[Dict[str, Any]]:
+        hint = self._hints.get(origin)
+        if hint is not None:
+            self._hints.move_to_end(origin)
+        return hint
+
+    def learn(self, origin: str, signal: str, seconds: float):
+        if not origin:
+            return
+        hint = self._hints.get(origin)
+        if hint is None or hint["signal"] != signal:
+            self._hints[origin] = {"signal": signal, "seconds": seconds, "pages": 1}
+        else:
+            hint["seconds"] = 0.7 * hint["seconds"] + 0.3 * seconds
+            hint["pages"] += 1
+        self._hints.move_to_end(origin)
+        while len(self._hints) > self.max_origins:
+            self._hints.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"origins": len(self._hints)}
+
+
+readiness_hints = ReadinessHints()
+
+
+def _signal(probe: Dict[str, Any], stable_for: float, elapsed: float, hint: Optional[Dict[str, Any]],
+            stable_window: float) -> Optional[str]:
+    if probe["atob"]:
+        return "atob"  # the instruction is decoded from the script text itself
+    if probe["result"] > 0:
+        return "result"
+    if probe["state"] == "loading" or probe["text"] == 0 or stable_for < stable_window:
+        return None
+    # an empty #result, or an origin whose pages filled #result before, gets time to be filled
+    expects_result = probe["result"] == 0 or (hint is not None and hint["signal"] == "result")
+    if expects_result and elapsed < max(RESULT_GRACE, 2 * hint["seconds"] if hint else 0.0):
+        return None
+    return "stable"
+
+
+async def wait_ready(page, origin: str, timeout: float, max_wait: float = BROWSER_READY_MAX_WAIT,
+                     stable_window: float = BROWSER_READY_STABLE) -> Dict[str, Any]:
+    """
+    Return as soon as the page has what extraction needs: atob() instruction scripts, a
+    populated #result, or body text unchanged for `stable_window` seconds. Polls start at
+    50 ms and back off to 500 ms (100 ms while an empty #result waits to be filled), restarting
+    whenever the text changes. After `max_wait` (or `timeout`) without a signal, fall back to
+    the load/networkidle states with what time is left. Returns {"signal", "seconds"}.
+    """
+    from playwright.async_api import Error as PWError
+    start = time.monotonic()
+    end = start + max(0.0, timeout)
+    poll_end = min(end, start + max_wait)
+    hint = readiness_hints.get(origin)
+    if hint is not None and hint["signal"] == "stable" and hint["pages"] > 1:
+        # pages of this origin settled on stable text before: a shorter window is enough
+        stable_window = stable_window / 2
+    interval = POLL_FIRST
+    last_hash, changed_at = None, start
+    signal = None
+    while True:
+        try:
+            probe = await page.evaluate(PROBE_JS)
+        except PWError as e:
+            # navigation still committing, or the document was replaced: try again
+            logger.debug("Readiness probe failed: %s", e)
+            probe = None
+        now = time.monotonic()
+        sleep = interval
+        if probe is not None:
+            if probe["hash"] != last_hash:
+                last_hash, changed_at = probe["hash"], now
+                interval = POLL_FIRST  # still changing: look again soon
+            signal = _signal(probe, now - changed_at, now - start, hint, stable_window)
+            if signal:
+                break
+            if probe["text"] and now - changed_at < stable_window:
+                # wake when the text would have been stable long enough
+                sleep = min(interval, changed_at + stable_window - now + 0.01)
+            if probe["result"] == 0:
+                sleep = min(sleep, 0.1)
+        if now + sleep >= poll_end:
+            break
+        await asyncio.sleep(sleep)
+        interval = min(POLL_MAX, interval * 1.5)
+
+    if signal is None:
+        signal = "timeout"
+        for state in ("load", "networkidle"):
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                await page.wait_for_load_state(state, timeout=left * 1000)
+                signal = state
+            except PWError:
+                break
+        logger.info("No readiness signal for %s; fell back to %s", origin, signal)
+    seconds = time.monotonic() - start
+    readiness_hints.learn(origin, signal, seconds)
+    observe("ready", seconds, worker=signal)
+    return {"signal": signal, "seconds": seconds}
@@ -0,0 +1,196 @@
+import fnmatch, re, threading, time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..config import (BROWSER_BLOCK_TYPES, BROWSER_BLOCK_PATTERNS, BROWSER_BLOCK_THIRD_PARTY_SCRIPTS,
+                      BROWSER_ALLOW, BROWSER_ASSET_CACHE_BYTES, BROWSER_ASSET_CACHE_TTL)
+from ..utils import logger
+from .page_extract import origin_of
+
+# resource types worth caching across renders (same URL, same bytes for every chained page)
+STATIC_TYPES = {"script", "stylesheet", "image", "font"}
+# rough transfer size per blocked request until real sizes of that type have been seen
+DEFAULT_SIZES = {"image": 40000, "font": 30000, "media": 200000, "stylesheet": 15000, "script": 30000}
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def parse_allow(value: str) -> Dict[str, Set[str]]:
+    """'https://a.com=image,stylesheet;https://cdn.b.com=*' -> {origin: resource types allowed}."""
+    allow: Dict[str, Set[str]] = {}
+    for entry in (value or "").split(";"):
+        if "=" not in entry:
+            continue
+        origin, types = entry.rsplit("=", 1)
+        allow.setdefault(origin.strip().rstrip("/"), set()).update(_split(types))
+    return allow
+
+
+def cache_ttl(headers: Dict[str, str], default: float = BROWSER_ASSET_CACHE_TTL) -> float:
+    """
+    Seconds a response may be reused for any render (0: not at all). Honours Cache-Control
+    no-store/no-cache/private/max-age and Expires; responses that vary on anything but encoding
+    are not shared, since the cache is keyed by URL alone. Capped at `default`, which also
+    applies when the response gives no lifetime.
+    """
+    h = {k.lower(): v for k, v in headers.items()}
+    cc = h.get("cache-control", "").lower()
+    if re.search(r"\b(?:no-store|no-cache|private)\b", cc):
+        return 0.0
+    vary = {v.strip().lower() for v in h.get("vary", "").split(",") if v.strip()}
+    if vary - {"accept-encoding"}:
+        return 0.0
+    m = re.search(r"\b(?:s-maxage|max-age)\s*=\s*(\d+)", cc)
+    if m:
+        return min(default, float(m.group(1)))
+    if "expires" in h:
+        try:
+            expires = parsedate_to_datetime(h["expires"]).timestamp()
+            date = parsedate_to_datetime(h["date"]).timestamp() if "date" in h else time.time()
+        except (TypeError, ValueError):
+            return 0.0  # an invalid Expires means "already expired"
+        return max(0.0, min(default, expires - date))
+    return default
+
+
+class AssetCache:
+    """In-memory LRU of static responses (status, headers, body, expiry), bounded by total body bytes."""
+
+    def __init__(self, max_bytes: int = BROWSER_ASSET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[int, Dict[str, str], bytes, float]]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        with self._lock:
+            item = self._items.get(url)
+            if item is None:
+                return None
+            if item[3] <= time.monotonic():
+                del self._items[url]
+                self._used -= len(item[2])
+                return None
+            self._items.move_to_end(url)
+            return item[:3]
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes, ttl: float):
+        if self.max_bytes <= 0 or ttl <= 0 or len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._items.pop(url, None)
+            if old is not None:
+                self._used -= len(old[2])
+            self._items[url] = (status, headers, body, time.monotonic() + ttl)
+            self._used += len(body)
+            while self._used > self.max_bytes and self._items:
+                _, (_, _, b, _) = self._items.popitem(last=False)
+                self._used -= len(b)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._items), "bytes": self._used, "max_bytes": self.max_bytes}
+
+
+class ResourcePolicy:
+    """
+    Which subresources a render may load. Requests are blocked by resource type
+    (BROWSER_BLOCK_TYPES) and URL glob (BROWSER_BLOCK_PATTERNS); third-party scripts optionally
+    too. BROWSER_ALLOW lists, per origin, resource types let through regardless. Allowed static
+    assets are served from an in-memory AssetCache shared by all renders of this process.
+    """
+
+    def __init__(self, block_types: str = BROWSER_BLOCK_TYPES, block_patterns: str = BROWSER_BLOCK_PATTERNS,
+                 block_third_party_scripts: bool = BROWSER_BLOCK_THIRD_PARTY_SCRIPTS, allow: str = BROWSER_ALLOW,
+                 cache_bytes: int = BROWSER_ASSET_CACHE_BYTES):
+        self.block_types = set(_split(block_types))
+        self.block_patterns = _split(block_patterns)
+        self.block_third_party_scripts = block_third_party_scripts
+        self.allow = parse_allow(allow)
+        self.cache = AssetCache(cache_bytes)
+        self._sizes: Dict[str, List[float]] = {}  # resource type -> [bytes seen, responses]
+        self.counters = {"renders": 0, "requests": 0, "blocked": 0, "cached": 0, "bytes_saved": 0}
+
+    def decide(self, url: str, resource_type: str, page_origin: str) -> str:
+        """"allow" or "block" for one request of a page at page_origin."""
+        origin = origin_of(url)
+        allowed = self.allow.get(origin, set())
+        if resource_type in allowed or "*" in allowed:
+            return "allow"
+        if any(fnmatch.fnmatchcase(url, p) for p in self.block_patterns):
+            return "block"
+        if resource_type in self.block_types:
+            return "block"
+        if resource_type == "script" and self.block_third_party_scripts and origin != page_origin:
+            return "block"
+        return "allow"
+
+    def _estimate(self, resource_type: str) -> int:
+        seen = self._sizes.get(resource_type)
+        if seen and seen[1]:
+            return int(seen[0] / seen[1])
+        return DEFAULT_SIZES.get(resource_type, 5000)
+
+    def _seen(self, resource_type: str, size: int):
+        s = self._sizes.setdefault(resource_type, [0.0, 0])
+        s[0] += size
+        s[1] += 1
+
+    async def attach(self, page, page_url: str) -> Dict[str, int]:
+        """Route every request of page through the policy; returns the render's live report dict."""
+        from playwright.async_api import Error as PWError
+        page_origin = origin_of(page_url)
+        report = {"requests": 0, "blocked": 0, "cached": 0, "bytes_saved": 0}
+        self.counters["renders"] += 1
+
+        async def handle(route):
+            request = route.request
+            rtype = request.resource_type
+            report["requests"] += 1
+            self.counters["requests"] += 1
+            try:
+                if request.is_navigation_request() or request.method != "GET":
+                    await route.continue_()
+                    return
+                if self.decide(request.url, rtype, page_origin) == "block":
+                    saved = self._estimate(rtype)
+                    report["blocked"] += 1
+                    report["bytes_saved"] += saved
+                    self.counters["blocked"] += 1
+                    self.counters["bytes_saved"] += saved
+                    await route.abort("blockedbyclient")
+                    return
+                if rtype not in STATIC_TYPES or self.cache.max_bytes <= 0:
+                    await route.continue_()
+                    return
+                hit = self.cache.get(request.url)
+                if hit is not None:
+                    status, headers, body = hit
+                    report["cached"] += 1
+                    report["bytes_saved"] += len(body)
+                    self.counters["cached"] += 1
+                    self.counters["bytes_saved"] += len(body)
+                    await route.fulfill(status=status, headers=headers, body=body)
+                    return
+                response = await route.fetch()
+                body = await response.body()
+                self._seen(rtype, len(body))
+                # the fetched body is already decoded: its transfer headers no longer apply
+                headers = {k: v for k, v in response.headers.items()
+                           if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+                if response.status == 200:
+                    self.cache.put(request.url, response.status, headers, body, cache_ttl(headers))
+                await route.fulfill(status=response.status, headers=headers, body=body)
+            except PWError as e:
+                # the page closed or navigated away mid-request; nothing left to route
+                logger.debug("Route for %s not completed: %s", request.url, e)
+
+        await page.route("**/*", handle)
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "asset_cache": self.cache.stats()}
+
+
+resource_policy = ResourcePolicy()
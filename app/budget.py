@@ -0,0 +1,57 @@
+from typing import Dict, Optional, Tuple
+from .utils import now_ts
+
+# Relative share of a quiz step's time for each stage, in the order the stages run
+STAGE_WEIGHTS: Dict[str, float] = {"render": 2, "fetch": 2, "compute": 2, "llm": 3, "submit": 1}
+# (min, max) seconds per stage: min keeps a stage usable when time is short, max keeps one slow
+# stage from eating the time later chain steps need
+STAGE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "render": (3, 40), "fetch": (3, 60), "compute": (2, 60), "llm": (5, 45), "submit": (3, 15),
+}
+
+
+def time_left(deadline_ts: Optional[float], cap: Optional[float] = None, floor: float = 0.5) -> Optional[float]:
+    """Seconds until deadline_ts (at least floor, at most cap); cap alone when there is no deadline."""
+    if deadline_ts is None:
+        return cap
+    left = max(floor, deadline_ts - now_ts())
+    return min(left, cap) if cap is not None else left
+
+
+class StepBudget:
+    """
+    Divides the time left before a deadline among the stages of one quiz step.
+    Each stage gets its weight's share of what is still left across itself and the stages
+    after it, so time a fast stage did not use flows to the later ones. Stages that are
+    skipped (e.g. no LLM call) can be marked done to release their share.
+    """
+
+    def __init__(self, deadline_ts: float, weights: Dict[str, float] = STAGE_WEIGHTS,
+                 limits: Dict[str, Tuple[float, float]] = STAGE_LIMITS):
+        self.deadline_ts = deadline_ts
+        self.weights = dict(weights)
+        self.limits = limits
+        self._done = set()
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline_ts - now_ts())
+
+    def done(self, *stages: str):
+        self._done.update(stages)
+
+    def timeout(self, *stages: str) -> float:
+        """Seconds granted to the given stage(s) starting now; never beyond the deadline."""
+        remaining = self.remaining()
+        order = list(self.weights)
+        first = min(order.index(s) for s in stages)
+        pending = [s for s in order[first:] if s not in self._done or s in stages]
+        total = sum(self.weights[s] for s in pending) or 1.0
+        share = remaining * sum(self.weights[s] for s in stages) / total
+        lo = sum(self.limits.get(s, (0, remaining))[0] for s in stages)
+        hi = sum(self.limits.get(s, (0, remaining))[1] for s in stages)
+        self.done(*stages)
+        return max(0.0, min(max(share, lo), hi, remaining))
+
+    def deadline(self, *stages: str) -> float:
+        """Absolute deadline for the given stage(s) starting now."""
+        return now_ts() + self.timeout(*stages)
@@ -1,10 +1,115 @@
 from dotenv import load_dotenv
-import os
+import os, tempfile
 
 load_dotenv()
 
 AIPIPE_TOKEN = os.getenv("AIPIPE_TOKEN", "")
+# AiPipe (OpenRouter responses API) endpoint; point it at a stub for offline runs
+AIPIPE_URL = os.getenv("AIPIPE_URL", "https://aipipe.org/openrouter/v1/responses")
 SECRET = os.getenv("SECRET", "mysecret123")
 EMAIL = os.getenv("EMAIL", "you@example.com")
 GLOBAL_TIMEOUT = int(os.getenv("GLOBAL_TIMEOUT", "170"))
+# /quiz admission control: jobs running at once, jobs allowed to wait, finished jobs kept for status
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "500"))
+# Job backend: "memory" runs jobs in the API process; "sqlite" makes the API only enqueue into JOB_QUEUE_PATH
+# while separate worker processes (python -m app.job_worker, JOB_CONCURRENCY jobs each) claim them under leases
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory").lower()
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "quiz-jobs.sqlite3"))
+# worker processes the API starts and restarts itself in sqlite mode (0 when they are run separately)
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+# a claimed job whose worker stops heartbeating for JOB_LEASE_SECONDS is claimed again, up to JOB_MAX_ATTEMPTS times
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "15"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.2"))
 DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", "52428800"))
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", "65536"))
+# downloads slower than this are logged as warnings
+DOWNLOAD_SLOW_BYTES_PER_SEC = int(os.getenv("DOWNLOAD_SLOW_BYTES_PER_SEC", "102400"))
+# import worker modules and launch the browser in the background right after startup
+PREWARM = os.getenv("PREWARM", "1").lower() not in ("0", "false", "no")
+
+# Browser pool: max concurrently open contexts, and how many contexts a browser serves before relaunch
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+# Readiness after navigation: longest wait (s) for a content signal before falling back to load states,
+# and how long (s) body text must stay unchanged to count as settled
+BROWSER_READY_MAX_WAIT = float(os.getenv("BROWSER_READY_MAX_WAIT", "10"))
+BROWSER_READY_STABLE = float(os.getenv("BROWSER_READY_STABLE", "0.3"))
+# Subresources renders may skip: resource types and URL globs to block (comma separated), whether
+# scripts from other origins are blocked, per-origin allow-lists ("https://a.com=image,font;https://b.com=*")
+# and the in-memory cache (bytes, 0 disables) for static assets repeated across chained pages.
+# Stylesheets are not blocked by default: without them innerText also shows CSS-hidden elements.
+BROWSER_BLOCK_TYPES = os.getenv("BROWSER_BLOCK_TYPES", "image,media,font")
+BROWSER_BLOCK_PATTERNS = os.getenv("BROWSER_BLOCK_PATTERNS", "*google-analytics.com/*,*googletagmanager.com/*,"
+                                   "*doubleclick.net/*,*facebook.net/*,*hotjar.com/*")
+BROWSER_BLOCK_THIRD_PARTY_SCRIPTS = os.getenv("BROWSER_BLOCK_THIRD_PARTY_SCRIPTS", "0").lower() in ("1", "true", "yes")
+BROWSER_ALLOW = os.getenv("BROWSER_ALLOW", "")
+BROWSER_ASSET_CACHE_BYTES = int(os.getenv("BROWSER_ASSET_CACHE_BYTES", "33554432"))
+# how long a cached asset without max-age/Expires is reused (seconds); also the most any asset is kept
+BROWSER_ASSET_CACHE_TTL = float(os.getenv("BROWSER_ASSET_CACHE_TTL", "300"))
+
+# Shared outbound HTTP client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Content-addressed download cache shared by all workers
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "quiz-download-cache"))
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", "524288000"))
+DOWNLOAD_CACHE_MAX_AGE = int(os.getenv("DOWNLOAD_CACHE_MAX_AGE", "3600"))
+# within this many seconds a cached file is served without revalidating against the origin
+DOWNLOAD_CACHE_FRESH_SECONDS = int(os.getenv("DOWNLOAD_CACHE_FRESH_SECONDS", "120"))
+# how many data files of one page are downloaded at the same time
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+
+# Rows per chunk when aggregating CSV files without loading them whole
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "200000"))
+
+# Parsed-dataframe cache: Arrow files on disk keyed by content hash, plus an in-memory LRU
+FRAME_CACHE_DIR = os.getenv("FRAME_CACHE_DIR", os.path.join(tempfile.gettempdir(), "quiz-frame-cache"))
+FRAME_CACHE_MEMORY_BYTES = int(os.getenv("FRAME_CACHE_MEMORY_BYTES", "268435456"))
+FRAME_CACHE_DISK_BYTES = int(os.getenv("FRAME_CACHE_DISK_BYTES", "1073741824"))
+
+# PDF text extraction: how many documents keep their page-text index
+PDF_INDEX_MAX_DOCS = int(os.getenv("PDF_INDEX_MAX_DOCS", "32"))
+# pages of a PDF handed to the LLM when the instruction names no page
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+
+# LLM response cache: in-memory LRU in front of a SQLite file; LLM_CACHE_TTL=0 disables caching
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "quiz-llm-cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Client-side admission for AiPipe calls: requests in flight, token-bucket rate (requests/s) and burst,
+# and retries (jittered exponential backoff from LLM_BACKOFF_BASE up to LLM_BACKOFF_MAX seconds) on 429/5xx
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "5"))
+LLM_BURST = int(os.getenv("LLM_BURST", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+# LLM prompt context: token budget, rows shown per table or data file, and how long (s) to wait
+# for a data file still downloading before leaving its summary out
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "3000"))
+LLM_CONTEXT_SAMPLE_ROWS = int(os.getenv("LLM_CONTEXT_SAMPLE_ROWS", "10"))
+LLM_CONTEXT_FILE_WAIT = float(os.getenv("LLM_CONTEXT_FILE_WAIT", "3"))
+# Stream AiPipe responses (SSE) so callers can stop at the first complete answer
+LLM_STREAM = os.getenv("LLM_STREAM", "1").lower() in ("1", "true", "yes")
+
+# Routes whose main worker and fallbacks run concurrently (comma separated route names, or "all"/"none")
+SPECULATIVE_ROUTES = os.getenv("SPECULATIVE_ROUTES", "api_sourcing")
+# seconds a higher-priority worker gets to override an earlier lower-priority answer
+SPECULATION_GRACE = float(os.getenv("SPECULATION_GRACE", "1.5"))
+
+# CPU-bound worker stages run off the event loop
+CPU_PROCESS_WORKERS = int(os.getenv("CPU_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+CPU_THREAD_WORKERS = int(os.getenv("CPU_THREAD_WORKERS", "4"))
+# max heavy stages running at once across all jobs
+HEAVY_STAGE_LIMIT = int(os.getenv("HEAVY_STAGE_LIMIT", "4"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG_WARN_SECONDS = float(os.getenv("LOOP_LAG_WARN_SECONDS", "0.2"))
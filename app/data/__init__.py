@@ -0,0 +1 @@
+# package marker for data helpers
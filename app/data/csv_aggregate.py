@@ -0,0 +1,174 @@
+import operator, re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from ..config import CSV_CHUNK_ROWS
+from ..utils import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+_ARROW_BLOCK_BYTES = 1 << 20
+
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+
+_OPS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+}
+_PC_OPS = {">": "greater", ">=": "greater_equal", "<": "less", "<=": "less_equal", "==": "equal", "!=": "not_equal"}
+
+# (column, op, value) row filter applied before aggregating
+Where = Tuple[str, str, Any]
+
+
+def read_header(path: str) -> List[str]:
+    return [str(c) for c in pd.read_csv(path, nrows=0).columns]
+
+
+def choose_column(path: str, instruction: str = "") -> Optional[str]:
+    """
+    Pick the numeric column an instruction is about without reading the file:
+    a numeric column named in the instruction, else one containing "value",
+    else the first numeric one (types are sniffed from a small sample).
+    """
+    sample = pd.read_csv(path, nrows=1000)
+    header = [str(c) for c in sample.columns]
+    numerics = [str(c) for c in sample.select_dtypes(include="number").columns]
+    text = (instruction or "").lower()
+    named = [c for c in numerics if re.search(rf"\b{re.escape(c.lower())}\b", text)]
+    if named:
+        return max(named, key=len)
+    for c in header:
+        if "value" in c.lower():
+            return c
+    return numerics[0] if numerics else None
+
+
+def _native(x):
+    """Python int/float for a numpy or Arrow scalar, so integer sums stay exact past 2**53."""
+    x = x.item() if hasattr(x, "item") else x
+    return x if isinstance(x, int) else float(x)
+
+
+def _may_overflow(lo, hi, n: int) -> bool:
+    """Whether an int64 sum of n values within [lo, hi] could wrap around."""
+    return isinstance(lo, int) and max(abs(lo), abs(hi)) * n >= 2 ** 63
+
+
+class _Partial:
+    """Running sum/count/min/max combined across chunks; integer columns are summed as Python ints."""
+
+    def __init__(self):
+        self.sum = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, s, c, lo, hi):
+        if not c:
+            return
+        self.sum += _native(s)
+        self.count += int(c)
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    def result(self, aggs: Iterable[str]) -> Dict[str, Any]:
+        out = {"sum": self.sum, "count": self.count, "min": self.min, "max": self.max,
+               "mean": self.sum / self.count if self.count else None}
+        return {a: out[a] for a in aggs}
+
+
+def _aggregate_pandas(path: str, column: str, where: Optional[Where], chunk_rows: int) -> _Partial:
+    usecols = list(dict.fromkeys([column] + ([where[0]] if where else [])))
+    part = _Partial()
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+        values = pd.to_numeric(chunk[column], errors="coerce")
+        if where:
+            col, op, val = where
+            values = values[_OPS[op](chunk[col], val)]
+        values = values.dropna()
+        if len(values):
+            lo, hi = _native(values.min()), _native(values.max())
+            s = sum(values.tolist()) if _may_overflow(lo, hi, len(values)) else values.sum()
+            part.add(s, len(values), lo, hi)
+    return part
+
+
+def _aggregate_arrow(path: str, column: str, where: Optional[Where], chunk_rows: int,
+                     column_type=None) -> _Partial:
+    """column_type None keeps the type inferred from the first block (int64 stays exact)."""
+    usecols = list(dict.fromkeys([column] + ([where[0]] if where else [])))
+    # the streaming reader buffers a few blocks ahead; small blocks keep peak memory flat
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=_ARROW_BLOCK_BYTES),
+        convert_options=pacsv.ConvertOptions(include_columns=usecols,
+                                             column_types={column: column_type} if column_type else None),
+    )
+    part = _Partial()
+    kind = reader.schema.field(column).type
+    if not (pa.types.is_integer(kind) or pa.types.is_floating(kind)):
+        raise pa.ArrowTypeError(f"column {column} read as {kind}")
+    for batch in reader:
+        values = batch.column(batch.schema.get_field_index(column))
+        if where:
+            col, op, val = where
+            mask = getattr(pc, _PC_OPS[op])(batch.column(batch.schema.get_field_index(col)), val)
+            values = pc.filter(values, mask)
+        values = pc.drop_null(values)
+        if len(values):
+            mm = pc.min_max(values)
+            lo, hi = _native(mm["min"].as_py()), _native(mm["max"].as_py())
+            s = sum(values.to_pylist()) if _may_overflow(lo, hi, len(values)) else pc.sum(values).as_py()
+            part.add(s, len(values), lo, hi)
+    return part
+
+
+def aggregate_csv(path: str, column: str, aggs: Iterable[str] = AGGREGATES, where: Optional[Where] = None,
+                  chunk_rows: int = CSV_CHUNK_ROWS, engine: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aggregate one column of a CSV without loading the whole file.
+    Only the needed columns are read, in bounded chunks (chunk_rows rows for pandas, 1 MB blocks
+    for pyarrow), and partial
+    sums/counts/min/max are combined, so memory stays flat as the file grows.
+    engine is "pyarrow" (streaming reader, used when installed) or "pandas"; non-numeric
+    cells are ignored.
+    """
+    aggs = tuple(aggs)
+    unknown = set(aggs) - set(AGGREGATES)
+    if unknown:
+        raise ValueError(f"unsupported aggregate(s): {sorted(unknown)}")
+    if where and where[1] not in _OPS:
+        raise ValueError(f"unsupported comparison: {where[1]}")
+    engine = engine or ("pyarrow" if HAVE_PYARROW else "pandas")
+    if engine == "pyarrow":
+        # inferred type first; a later block that does not fit it (e.g. decimals after integers) retries as float64
+        for column_type in (None, pa.float64()):
+            try:
+                return _aggregate_arrow(path, column, where, chunk_rows, column_type).result(aggs)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                logger.info("pyarrow CSV aggregation as %s failed (%s)", column_type or "inferred type", e)
+        logger.info("Using chunked pandas for %s", column)
+    return _aggregate_pandas(path, column, where, chunk_rows).result(aggs)
+
+
+def sum_column(path: str, instruction: str = "") -> Optional[Tuple[str, Any]]:
+    """(column, sum) for the column the instruction is about, or None if the file has no numeric column."""
+    col = choose_column(path, instruction)
+    if col is None:
+        return None
+    return col, aggregate_csv(path, col, aggs=("sum",))["sum"]
+
+
+def csv_shape(path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> Tuple[int, List[str]]:
+    """Row count and header of a CSV, reading a single column in chunks."""
+    header = read_header(path)
+    if not header:
+        return 0, header
+    rows = sum(len(c) for c in pd.read_csv(path, usecols=[0], chunksize=chunk_rows))
+    return rows, header
@@ -0,0 +1,227 @@
+import hashlib, os, re, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from ..config import FRAME_CACHE_DIR, FRAME_CACHE_MEMORY_BYTES, FRAME_CACHE_DISK_BYTES
+from ..utils import logger, timer
+from ..executors import run_cpu
+
+try:
+    import pyarrow as pa
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+_HEX64 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def content_key(path: str) -> str:
+    """SHA-256 of a file; download-cache blobs are already named by it, so no re-hash is needed there."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _HEX64.match(stem):
+        return stem
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_kind(name: str) -> Optional[str]:
+    low = name.lower()
+    if low.endswith(".csv"):
+        return "csv"
+    if low.endswith((".xls", ".xlsx")):
+        return "excel"
+    return None
+
+
+def parse_file(path: str, kind: str) -> pd.DataFrame:
+    if kind == "csv":
+        return pd.read_csv(path)
+    if kind == "excel":
+        return pd.read_excel(path)
+    raise ValueError(f"unsupported file kind: {kind}")
+
+
+def _write_arrow_file(df: pd.DataFrame, path: str) -> bool:
+    if not HAVE_PYARROW:
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+        return True
+    except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+        # mixed-type object columns cannot be stored as Arrow; keep the frame in memory only
+        logger.info("Frame not cached on disk: %s", e)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def _parse_to_arrow(path: str, kind: str, dest: str) -> bool:
+    """Process-pool stage: parse the file and write it as Arrow; the parent then memory-maps it."""
+    return _write_arrow_file(parse_file(path, kind), dest)
+
+
+class FrameCache:
+    """
+    Parse a data file once and keep the typed result.
+    Parsed frames are written as uncompressed Arrow IPC files keyed by content hash, so later
+    loads (other workers, re-attempts, other jobs) are memory-mapped instead of re-parsed.
+    Hot frames also stay in an in-process LRU bounded by their in-memory size.
+    Returned frames are shared: callers must not modify them in place.
+    """
+
+    def __init__(self, root: str = FRAME_CACHE_DIR, memory_bytes: int = FRAME_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = FRAME_CACHE_DISK_BYTES):
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._frames: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "parses": 0}
+
+    def _arrow_path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".arrow")
+
+    def _remember(self, key: str, df: pd.DataFrame):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                return
+            self._frames[key] = (df, size)
+            self._used += size
+            while self._used > self.memory_bytes and self._frames:
+                _, (_, old) = self._frames.popitem(last=False)
+                self._used -= old
+
+    def _read_arrow(self, key: str, columns: Optional[List[str]]) -> Optional[pd.DataFrame]:
+        path = self._arrow_path(key)
+        if not HAVE_PYARROW or not os.path.exists(path):
+            return None
+        try:
+            # the mapping stays alive as long as the returned buffers reference it
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+            if columns:
+                table = table.select([c for c in columns if c in table.column_names])
+            os.utime(path)
+            # split_blocks lets numeric columns without nulls be wrapped without copying
+            return table.to_pandas(split_blocks=True)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning("Frame cache file %s unreadable: %s", path, e)
+            return None
+
+    def _write_arrow(self, key: str, df: pd.DataFrame):
+        if _write_arrow_file(df, self._arrow_path(key)):
+            self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            files = [os.path.join(self.root, f) for f in os.listdir(self.root) if f.endswith(".arrow")]
+            stats = sorted(((os.stat(f).st_mtime, os.stat(f).st_size, f) for f in files))
+        except OSError:
+            return
+        total = sum(s for _, s, _ in stats)
+        for _, size, f in stats:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(f)
+                total -= size
+            except OSError:
+                pass
+
+    def load(self, path: str, kind: Optional[str] = None, columns: Optional[List[str]] = None,
+             name: str = "") -> pd.DataFrame:
+        """
+        DataFrame for the file at path. kind is "csv"/"excel" (guessed from name or path when omitted);
+        columns optionally projects the result.
+        """
+        kind = kind or file_kind(name or path)
+        if kind is None:
+            raise ValueError(f"unsupported file type: {name or path}")
+        key = content_key(path)
+        with self._lock:
+            hit = self._frames.get(key)
+            if hit is not None:
+                self._frames.move_to_end(key)
+                self.counters["memory_hits"] += 1
+        if hit is not None:
+            df = hit[0]
+            return df[[c for c in columns if c in df.columns]] if columns else df
+        df = self._read_arrow(key, columns)
+        if df is not None:
+            self.counters["disk_hits"] += 1
+            if not columns:
+                self._remember(key, df)
+            return df
+        self.counters["parses"] += 1
+        with timer("parse", worker=kind):
+            df = parse_file(path, kind)
+        self._write_arrow(key, df)
+        self._remember(key, df)
+        return df[[c for c in columns if c in df.columns]] if columns else df
+
+    async def aload(self, path: str, kind: Optional[str] = None, columns: Optional[List[str]] = None,
+                    name: str = "", deadline_ts: Optional[float] = None) -> pd.DataFrame:
+        """
+        Same as load() without blocking the event loop: a miss is parsed in the process pool
+        straight to Arrow, and the result is memory-mapped here from a thread.
+        """
+        kind = kind or file_kind(name or path)
+        if kind is None:
+            raise ValueError(f"unsupported file type: {name or path}")
+        key = content_key(path)
+        with self._lock:
+            hit = key in self._frames
+        if hit or not HAVE_PYARROW:
+            return await run_cpu(self.load, path, kind, columns, name, kind="thread", deadline_ts=deadline_ts)
+        arrow_path = self._arrow_path(key)
+        if not os.path.exists(arrow_path):
+            with timer("parse", worker=kind):
+                parsed = await run_cpu(_parse_to_arrow, path, kind, arrow_path, deadline_ts=deadline_ts, name="parse_frame")
+            if not parsed:
+                return await run_cpu(self.load, path, kind, columns, name, kind="thread", deadline_ts=deadline_ts)
+            self.counters["parses"] += 1
+            self._evict_disk()
+        else:
+            self.counters["disk_hits"] += 1
+        df = await run_cpu(self._read_arrow, key, None, kind="thread", deadline_ts=deadline_ts)
+        if df is None:
+            return await run_cpu(self.load, path, kind, columns, name, kind="thread", deadline_ts=deadline_ts)
+        self._remember(key, df)
+        return df[[c for c in columns if c in df.columns]] if columns else df
+
+    def cached_source(self, path: str) -> Tuple[Optional[str], Any]:
+        """
+        Where an already-parsed copy of the file lives, without parsing it:
+        ("memory", DataFrame), ("arrow", path of the Arrow file) or (None, None).
+        Lets readers push projections and filters into the cached copy.
+        """
+        key = content_key(path)
+        with self._lock:
+            hit = self._frames.get(key)
+            if hit is not None:
+                self._frames.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return "memory", hit[0]
+        arrow_path = self._arrow_path(key)
+        if HAVE_PYARROW and os.path.exists(arrow_path):
+            self.counters["disk_hits"] += 1
+            return "arrow", arrow_path
+        return None, None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "frames": len(self._frames), "memory_bytes": self._used}
+
+
+frame_cache = FrameCache()
@@ -0,0 +1,98 @@
+import asyncio, re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+from ..config import PDF_INDEX_MAX_DOCS
+from ..utils import timer
+from ..executors import run_cpu
+from .frame_cache import content_key
+
+_PAGE_REF = re.compile(r"\bpage\s+(?:no\.?\s*|number\s*)?(\d+)\b", re.IGNORECASE)
+
+
+def find_page_reference(instruction: str) -> Optional[int]:
+    """1-indexed page number an instruction refers to ("page 2", "on page no. 3"), if any."""
+    m = _PAGE_REF.search(instruction or "")
+    return int(m.group(1)) if m else None
+
+
+# --- run inside the process pool; must stay module-level so they pickle ---
+
+def _page_count(path: str) -> int:
+    import PyPDF2
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_pages(path: str, pages: List[int]) -> Dict[int, str]:
+    """Text of the given 1-indexed pages; PyPDF2 only parses the content streams of pages asked for."""
+    import PyPDF2
+    out = {}
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for n in pages:
+            if 1 <= n <= len(reader.pages):
+                out[n] = reader.pages[n - 1].extract_text() or ""
+    return out
+
+
+class PdfService:
+    """
+    PDF text extraction off the event loop.
+    Parsing runs in the shared process pool; extracted page texts are indexed per document
+    (keyed by content hash) so repeated "page N" queries and re-attempts are free,
+    and pages nobody asked for are never parsed.
+    """
+
+    def __init__(self, max_docs: int = PDF_INDEX_MAX_DOCS):
+        self.max_docs = max_docs
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[Any, asyncio.Future] = {}
+
+    def _doc(self, key: str) -> Dict[str, Any]:
+        doc = self._index.get(key)
+        if doc is None:
+            doc = self._index[key] = {"pages": None, "text": {}}
+            while len(self._index) > self.max_docs:
+                self._index.popitem(last=False)
+        self._index.move_to_end(key)
+        return doc
+
+    async def _extract(self, path: str, pages: List[int], deadline_ts: Optional[float]) -> Dict[int, str]:
+        with timer("parse", worker="pdf"):
+            return await run_cpu(_extract_pages, path, pages, deadline_ts=deadline_ts)
+
+    async def page_count(self, path: str, deadline_ts: Optional[float] = None) -> int:
+        doc = self._doc(content_key(path))
+        if doc["pages"] is None:
+            doc["pages"] = await run_cpu(_page_count, path, deadline_ts=deadline_ts)
+        return doc["pages"]
+
+    async def pages_text(self, path: str, pages: Iterable[int], deadline_ts: Optional[float] = None) -> Dict[int, str]:
+        """Text of the requested 1-indexed pages, extracting only the ones not yet indexed."""
+        key = content_key(path)
+        doc = self._doc(key)
+        wanted = list(dict.fromkeys(pages))
+        missing = [n for n in wanted if n not in doc["text"]]
+        if missing:
+            ident = (key, tuple(missing))
+            fut = self._inflight.get(ident)
+            if fut is None:
+                fut = asyncio.ensure_future(self._extract(path, missing, deadline_ts))
+                self._inflight[ident] = fut
+                fut.add_done_callback(lambda _f: self._inflight.pop(ident, None))
+            doc["text"].update(await asyncio.shield(fut))
+        return {n: doc["text"][n] for n in wanted if n in doc["text"]}
+
+    async def text(self, path: str, page: Optional[int] = None, max_pages: Optional[int] = None,
+                   deadline_ts: Optional[float] = None) -> str:
+        """Text of one page (1-indexed), or of the first max_pages pages (all when None)."""
+        if page is not None:
+            return (await self.pages_text(path, [page], deadline_ts)).get(page, "")
+        count = await self.page_count(path, deadline_ts)
+        if max_pages is not None:
+            count = min(count, max_pages)
+        texts = await self.pages_text(path, range(1, count + 1), deadline_ts)
+        return "\n".join(texts[n] for n in sorted(texts))
+
+
+pdf_service = PdfService()
@@ -0,0 +1,402 @@
+import math, re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from ..utils import logger, timer
+from ..executors import run_cpu
+from .csv_aggregate import AGGREGATES as STREAMING_AGGREGATES, aggregate_csv, Where
+from .frame_cache import frame_cache, HAVE_PYARROW
+
+if HAVE_PYARROW:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+AGGS = ("sum", "mean", "median", "count", "min", "max", "std")
+
+# aggregation words; when several appear, the earliest one wins
+_AGG_WORDS = [
+    (r"standard deviation|std(?:dev)?", "std"),
+    (r"median", "median"),
+    (r"average|mean", "mean"),
+    (r"sum|total|add up", "sum"),
+    (r"minimum|min|lowest|smallest", "min"),
+    (r"maximum|max|highest|largest", "max"),
+    (r"count|how many|number of", "count"),
+]
+_COUNT_ROWS = re.compile(r"\b(?:how many|number of|count (?:of |the )?)\s*(?:rows|records|entries|lines)\b")
+_TOP_K = re.compile(r"\b(?:(top|bottom|first)\s+(\d+)|(\d+)\s+(largest|highest|biggest|smallest|lowest))\b")
+_WHICH = re.compile(r"\b(highest|largest|most|maximum|greatest|lowest|smallest|least|minimum)\b")
+_DISTINCT = re.compile(r"\b(?:distinct|unique|different)\b")
+_ASCENDING_WORDS = ("bottom", "smallest", "lowest", "least", "minimum")
+
+# comparison phrases -> operator; longer phrases first so "at least" is not read as "least"
+_CMP = [
+    (r">=|greater than or equal to|at least|no less than", ">="),
+    (r"<=|less than or equal to|at most|no more than", "<="),
+    (r"!=|not equal to|is not|other than", "!="),
+    (r">|greater than|more than|above|over|exceeds|exceeding|higher than", ">"),
+    (r"<|less than|fewer than|below|under|lower than", "<"),
+    (r"==|=|equal to|equals|is", "=="),
+]
+_CMP_OPS = "|".join(f"(?:{p})" for p, _ in _CMP)
+_VALUE = r"-?\d[\d,]*(?:\.\d+)?|\"[^\"]*\"|'[^']*'|[A-Za-z_][\w-]*"
+
+# conditions a plan must have consumed: a comparison (other than "is"), a number, a row slice
+_LOOSE_CMP = re.compile(r"(?<!\w)(?:" + "|".join(p for p, o in _CMP if o != "==") + r")(?!\w)")
+_LOOSE_NUMBER = re.compile(r"(?<![\w.-])(?<!(?:quiz|step|page|part|task) )(?<!question )-?\d[\d,]*(?:\.\d+)?(?![\w-])")
+_ROW_SLICE = re.compile(r"\b(?:first|last|top|bottom)\s+\d[\d,]*\s+(?:rows|records|entries|lines)\b")
+_URLISH = re.compile(r"\S+://\S+|\S+@\S+")
+_SENTENCE_END = re.compile(r"[!?]|\.(?!\d)")
+
+
+class Plan:
+    """
+    A typed query over one table: op is "aggregate", "group", "top", "distinct" or "pivot".
+    where is a list of (column, op, value) filters applied first; by/columns name the grouping
+    (and pivot column) keys; column is the measured column (None counts rows).
+    """
+
+    def __init__(self, op: str, agg: str = "sum", column: Optional[str] = None, by: Optional[str] = None,
+                 where: Sequence[Where] = (), k: Optional[int] = None, ascending: bool = False,
+                 columns: Optional[str] = None, count: bool = False):
+        self.op = op
+        self.agg = agg
+        self.column = column
+        self.by = by
+        self.where = list(where)
+        self.k = k
+        self.ascending = ascending
+        self.columns = columns
+        self.count = count  # distinct: number of distinct values rather than the values
+
+    def needed_columns(self) -> List[str]:
+        cols = [self.by, self.columns, self.column] + [w[0] for w in self.where]
+        return list(dict.fromkeys(c for c in cols if c is not None))
+
+    def describe(self) -> str:
+        measure = f"{self.agg}({self.column or '*'})"
+        parts = {"aggregate": [measure], "group": [measure, f"by {self.by}"],
+                 "top": [f"{'bottom' if self.ascending else 'top'} {self.k}", f"{self.by or self.column}",
+                         f"by {measure}" if self.by else ""],
+                 "distinct": [f"{'count ' if self.count else ''}distinct({self.column})"],
+                 "pivot": [measure, f"rows {self.by}", f"columns {self.columns}"]}[self.op]
+        if self.where:
+            parts.append("where " + " and ".join(f"{c} {o} {v!r}" for c, o, v in self.where))
+        return " ".join(p for p in parts if p)
+
+
+# --- parsing ---
+
+def _columns_pattern(columns: Sequence[str]) -> str:
+    names = sorted({str(c) for c in columns}, key=len, reverse=True)
+    return "|".join(re.escape(n.lower()) for n in names)
+
+
+def _mentions(text: str, cols_re: str) -> List[Tuple[int, int, str]]:
+    """(start, end, lowercased column name) of every column mentioned, plurals included."""
+    return [(m.start(), m.end(), m.group(1)) for m in re.finditer(rf"(?<![\w-])({cols_re})(?:s|es)?(?![\w-])", text)]
+
+
+def _unplanned(text: str, used: Sequence[Tuple[int, int]], cols_re: str) -> Optional[str]:
+    """
+    The first comparison, number or "first N rows" slice outside the used spans, in a sentence
+    that mentions a column or an aggregation; URLs, emails and "Quiz 3"-style labels are skipped.
+    """
+    masked = _URLISH.sub(lambda m: " " * len(m.group()), text)
+    topical = re.compile(rf"\b(?:{'|'.join(p for p, _ in _AGG_WORDS)})\b|(?<![\w-])(?:{cols_re})")
+    start = 0
+    for end in [m.start() for m in _SENTENCE_END.finditer(masked)] + [len(masked)]:
+        sentence = masked[start:end]
+        if topical.search(sentence):
+            hit = _ROW_SLICE.search(sentence)
+            if hit:
+                return hit.group()
+            for pattern in (_LOOSE_CMP, _LOOSE_NUMBER):
+                for m in pattern.finditer(sentence):
+                    if not any(a <= start + m.start() < b for a, b in used):
+                        return m.group()
+        start = end + 1
+    return None
+
+
+def _coerce(value: str, numeric: bool) -> Any:
+    if value[:1] in "\"'":
+        value = value[1:-1]
+    if numeric:
+        try:
+            num = float(value.replace(",", ""))
+        except ValueError:
+            return None
+        return int(num) if num.is_integer() else num
+    return value
+
+
+def parse_instruction(instruction: str, dtypes: Dict[str, Any]) -> Optional[Plan]:
+    """
+    Plan for the instruction over a table with the given {column: dtype}, or None when the
+    instruction does not read as a query this engine can answer.
+    """
+    original = " ".join((instruction or "").split())
+    text = original.lower()  # same length: spans found in text index original too
+    if not text or not dtypes:
+        return None
+    by_lower = {str(c).lower(): c for c in dtypes}
+    numeric = {str(c).lower() for c, t in dtypes.items() if pd.api.types.is_numeric_dtype(t)}
+    cols_re = _columns_pattern(by_lower)
+
+    where, used_spans = [], []
+    filt = re.compile(rf"(?<![\w-])(?P<col>{cols_re})(?:s|es)?\s*(?:(?:is|are|was)\s+)?(?P<op>{_CMP_OPS})\s*(?P<val>{_VALUE})")
+    for m in filt.finditer(text):
+        col, phrase, raw = m.group("col"), m.group("op"), m.group("val")
+        op = next(o for p, o in _CMP if re.fullmatch(p, phrase))
+        if raw in by_lower or raw in ("the", "a", "an", "column", "columns"):
+            continue
+        value = _coerce(original[m.start("val"):m.end("val")], col in numeric)
+        if value is None or (op != "==" and op != "!=" and col not in numeric):
+            continue
+        where.append((by_lower[col], op, value))
+        used_spans.append((m.start(), m.end()))
+
+    def outside_filters(start: int) -> bool:
+        return not any(a <= start < b for a, b in used_spans)
+
+    mentions = [(s, e, c) for s, e, c in _mentions(text, cols_re) if outside_filters(s)]
+    top = _TOP_K.search(text)
+    which = re.search(rf"\bwhich\s+(?P<col>{cols_re})(?:s|es)?\b", text)
+    agg_text = text if top is None else text[:top.start()] + text[top.end():]
+    if which:
+        agg_text = _WHICH.sub(" ", agg_text)
+    found = [(m.start(), agg) for p, agg in _AGG_WORDS for m in re.finditer(rf"\b(?:{p})\b", agg_text)]
+    agg = "count" if _COUNT_ROWS.search(text) else (min(found)[1] if found else None)
+
+    group = re.search(rf"\b(?:group(?:ed)?\s+by|by|per|for each|for every|in each|of each)\s+(?:the\s+|each\s+)?"
+                      rf"(?P<col>{cols_re})(?:s|es)?\b", text)
+    categorical = [c for _, _, c in mentions if c not in numeric]
+    measured = [c for _, _, c in mentions if c in numeric]
+
+    def pick_measure(exclude=()) -> Optional[str]:
+        for c in measured:
+            if c not in exclude:
+                return by_lower[c]
+        for c in by_lower:
+            if "value" in c and c in numeric and c not in exclude:
+                return by_lower[c]
+        rest = [c for c in by_lower if c in numeric and c not in exclude]
+        return by_lower[rest[0]] if rest else None
+
+    def plan_for() -> Optional[Plan]:
+        if "pivot" in text:
+            keys = list(dict.fromkeys(categorical))
+            if len(keys) < 2:
+                return None
+            return Plan("pivot", agg=agg or "sum", column=pick_measure(keys), by=by_lower[keys[0]],
+                        columns=by_lower[keys[1]], where=where)
+
+        if _DISTINCT.search(text) and mentions:
+            col = by_lower[mentions[0][2]]
+            counting = bool(re.search(r"\b(?:how many|count|number of)\b", text))
+            return Plan("distinct", column=col, where=where, count=counting)
+
+        if top or which:
+            if which:
+                key = which.group("col")
+                k, ascending = 1, bool(_WHICH.search(text)) and _WHICH.search(text).group(1) in _ASCENDING_WORDS
+            else:
+                word = (top.group(1) or top.group(4))
+                k, ascending = int(top.group(2) or top.group(3)), word in _ASCENDING_WORDS
+                key = group.group("col") if group and group.group("col") not in numeric else \
+                    next((c for c in categorical), None)
+            if key is not None:
+                column = pick_measure((key,))
+                return Plan("top", agg=agg or ("count" if column is None else "sum"), column=column,
+                            by=by_lower[key], where=where, k=k, ascending=ascending)
+            column = pick_measure()
+            if column is None:
+                return None
+            return Plan("top", column=column, where=where, k=k, ascending=ascending)
+
+        if agg is None:
+            return None
+        if group is not None:
+            key = group.group("col")
+            column = None if agg == "count" else pick_measure((key,))
+            if agg != "count" and column is None:
+                return None
+            return Plan("group", agg=agg, column=column, by=by_lower[key], where=where)
+        column = None if agg == "count" and not measured else pick_measure()
+        if agg != "count" and column is None:
+            return None
+        return Plan("aggregate", agg=agg, column=column, where=where)
+
+    plan = plan_for()
+    if plan is None:
+        return None
+    # a column or condition the plan ignores means part of the instruction was not understood:
+    # no plan (and an LLM fallback) beats a confident answer to a different question
+    used = used_spans + [(s, e) for s, e, _ in _mentions(text, cols_re)]
+    if plan.op == "top" and top is not None:
+        used.append(top.span())
+    unplanned = _unplanned(text, used, cols_re)
+    if {by_lower[c] for _, _, c in mentions} - set(plan.needed_columns()) or unplanned:
+        logger.info("Instruction only partly planned (%s%s); not answering it", plan.describe(),
+                    f", ignoring {unplanned!r}" if unplanned else "")
+        return None
+    return plan
+
+
+# --- execution ---
+
+def _pandas_mask(df: pd.DataFrame, where: Sequence[Where]) -> pd.DataFrame:
+    if not where:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, val in where:
+        s = df[col]
+        if isinstance(val, str) and s.dtype == object:
+            # compare the few distinct strings, not every row
+            codes, uniques = pd.factorize(s)
+            hit = np.array([str(u).strip().lower() == val.lower() for u in uniques] + [False])
+            eq = hit[codes]  # code -1 (missing) indexes the trailing False
+            mask &= eq if op == "==" else ~eq
+            continue
+        mask &= {">": s.gt, ">=": s.ge, "<": s.lt, "<=": s.le, "==": s.eq, "!=": s.ne}[op](val).to_numpy()
+    return df[mask]
+
+
+def _arrow_filter(where: Sequence[Where], schema) -> Any:
+    expr = None
+    for col, op, val in where:
+        field = ds.field(col)
+        if pa.types.is_string(schema.field(col).type) or pa.types.is_large_string(schema.field(col).type):
+            # same case-insensitive match as the pandas path
+            field = pa.compute.utf8_lower(pa.compute.utf8_trim_whitespace(field))
+            val = str(val).lower()
+        term = {">": field > val, ">=": field >= val, "<": field < val, "<=": field <= val,
+                "==": field == val, "!=": field != val}[op]
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def _scan(source: str, fmt: str, columns: List[str], where: Sequence[Where]) -> pd.DataFrame:
+    """Projected, filtered read of a CSV or Arrow file: only matching rows of the needed columns are materialised."""
+    dataset = ds.dataset(source, format=fmt)
+    expr = _arrow_filter(where, dataset.schema) if where else None
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def load_filtered(path: str, kind: str, plan: Plan, cached_source: Optional[Tuple[Optional[str], Any]] = None
+                  ) -> Tuple[pd.DataFrame, str]:
+    """
+    Rows matching plan.where, projected to plan's columns. A frame already cached in memory is
+    sliced; a cached Arrow file or (without one) the CSV itself is scanned with the filter pushed
+    into the reader; anything else goes through frame_cache. Returns (frame, where it came from).
+    """
+    columns = plan.needed_columns()
+    where = plan.where
+    src, cached = cached_source or frame_cache.cached_source(path)
+    if src == "memory":
+        return _pandas_mask(cached[columns], where), "memory"
+    if HAVE_PYARROW and src == "arrow" or (src is None and kind == "csv" and HAVE_PYARROW):
+        try:
+            return _scan(cached if src == "arrow" else path, "ipc" if src == "arrow" else "csv", columns, where), \
+                src or "csv_scan"
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError, KeyError) as e:
+            logger.info("Pushdown scan of %s failed (%s); filtering a loaded frame", path, e)
+    df = frame_cache.load(path, kind, columns=columns)
+    return _pandas_mask(df, where), "frame"
+
+
+def _py(value: Any) -> Any:
+    """Plain JSON-friendly Python value: integral floats become ints, NaN becomes None."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def _measure(df: pd.DataFrame, plan: Plan):
+    if plan.column is None or plan.op == "distinct":
+        return None
+    s = df[plan.column]
+    return s if pd.api.types.is_numeric_dtype(s) else pd.to_numeric(s, errors="coerce")
+
+
+def run_plan(path: str, kind: str, plan: Plan) -> Dict[str, Any]:
+    """Execute plan over the file (vectorised); returns {"answer", "plan", "source", "rows"}."""
+    cached = frame_cache.cached_source(path)
+    # plain aggregates of a CSV nobody has parsed yet stream through the chunked reader instead
+    # (numeric filters only: string matches are case-insensitive here, exact there)
+    if (plan.op == "aggregate" and kind == "csv" and plan.agg in STREAMING_AGGREGATES and plan.column is not None
+            and len(plan.where) <= 1 and not any(isinstance(w[2], str) for w in plan.where) and cached[0] is None):
+        res = aggregate_csv(path, plan.column, aggs=(plan.agg, "count"), where=plan.where[0] if plan.where else None)
+        return {"answer": _py(res[plan.agg]), "plan": plan.describe(), "source": "csv_stream", "rows": res["count"]}
+
+    df, source = load_filtered(path, kind, plan, cached)
+    values = _measure(df, plan)
+    if plan.op == "aggregate":
+        answer = len(df) if values is None and plan.agg == "count" else getattr(values, plan.agg)()
+    elif plan.op == "group":
+        if plan.column:
+            df = df.assign(**{plan.column: values})
+            result = df.groupby(plan.by, sort=True, observed=True)[plan.column].agg(plan.agg)
+        else:
+            result = df.groupby(plan.by, sort=True, observed=True).size()
+        answer = {str(_py(k)): _py(v) for k, v in result.items()}
+    elif plan.op == "top":
+        if plan.by is not None:
+            if plan.column is not None:
+                df = df.assign(**{plan.column: values})
+                result = df.groupby(plan.by, sort=False, observed=True)[plan.column].agg(plan.agg)
+            else:
+                result = df.groupby(plan.by, sort=False, observed=True).size()
+            ranked = result.nsmallest(plan.k) if plan.ascending else result.nlargest(plan.k)
+            keys = [_py(k) for k in ranked.index]
+        else:
+            clean = values.dropna()
+            ranked = clean.nsmallest(plan.k) if plan.ascending else clean.nlargest(plan.k)
+            keys = [_py(v) for v in ranked]
+        answer = keys[0] if plan.k == 1 and keys else keys
+    elif plan.op == "distinct":
+        uniques = df[plan.column].dropna().unique()
+        answer = len(uniques) if plan.count else sorted((_py(v) for v in uniques), key=lambda v: (str(type(v)), v))
+    else:
+        if plan.column is not None:
+            df = df.assign(**{plan.column: values})
+        table = pd.pivot_table(df, index=plan.by, columns=plan.columns, values=plan.column,
+                               aggfunc=plan.agg if plan.column else "size", observed=True)
+        answer = {str(_py(r)): {str(_py(c)): _py(v) for c, v in row.items() if not pd.isna(v)}
+                  for r, row in table.iterrows()}
+    return {"answer": _py(answer), "plan": plan.describe(), "source": source, "rows": int(len(df))}
+
+
+def sniff_dtypes(path: str, kind: str) -> Dict[str, Any]:
+    """{column: dtype} from a cached frame or a small sample, without parsing the whole file."""
+    src, cached = frame_cache.cached_source(path)
+    if src == "memory":
+        return dict(cached.dtypes)
+    if src == "arrow":
+        return {f.name: f.type.to_pandas_dtype() for f in ds.dataset(cached, format="ipc").schema}
+    if kind == "csv":
+        return dict(pd.read_csv(path, nrows=1000).dtypes)
+    return dict(frame_cache.load(path, kind).dtypes)
+
+
+def answer_query(path: str, kind: str, instruction: str) -> Optional[Dict[str, Any]]:
+    """Parse the instruction against the file's columns and run it; None when it is not a query we can plan."""
+    plan = parse_instruction(instruction, sniff_dtypes(path, kind))
+    if plan is None:
+        return None
+    logger.info("Query plan: %s", plan.describe())
+    return run_plan(path, kind, plan)
+
+
+async def aanswer_query(path: str, kind: str, instruction: str, deadline_ts: Optional[float] = None):
+    """answer_query off the event loop (a thread: it reads this process's frame cache)."""
+    with timer("query", worker=kind) as span:
+        res = await run_cpu(answer_query, path, kind, instruction, kind="thread", deadline_ts=deadline_ts,
+                            name="query")
+        span["outcome"] = "planned" if res is not None else "no_plan"
+    return res
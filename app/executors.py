@@ -0,0 +1,142 @@
+import asyncio, functools, multiprocessing, time, weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from .config import CPU_PROCESS_WORKERS, CPU_THREAD_WORKERS, HEAVY_STAGE_LIMIT, LOOP_LAG_INTERVAL, LOOP_LAG_WARN_SECONDS
+from .utils import logger, now_ts, timer
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+# one HEAVY_STAGE_LIMIT semaphore per event loop: asyncio primitives are bound to the loop that first waits on them
+_heavy_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_stats: Dict[str, Any] = {"process_stages": 0, "thread_stages": 0, "running": 0, "timeouts": 0}
+
+
+def _pool(kind: str):
+    global _process_pool, _thread_pool
+    if kind == "process":
+        if _process_pool is None:
+            # spawn: forking a process that holds Playwright and event-loop threads is unsafe
+            _process_pool = ProcessPoolExecutor(max_workers=CPU_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+    if kind == "thread":
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=CPU_THREAD_WORKERS, thread_name_prefix="cpu")
+        return _thread_pool
+    raise ValueError(f"unknown executor kind: {kind}")
+
+
+async def run_cpu(fn: Callable, *args, kind: str = "process", deadline_ts: Optional[float] = None, name: str = "", **kwargs):
+    """
+    Run a CPU-bound stage off the event loop.
+    kind="process" for pure functions of picklable arguments (parsing files, rendering plots),
+    kind="thread" for work on objects that live in this process (e.g. cached DataFrames).
+    At most HEAVY_STAGE_LIMIT stages run at once; waiting for a slot and running both count
+    against deadline_ts. On timeout a stage still queued in the pool is dropped; one that
+    already started finishes in the background (holding its slot) and its result is discarded.
+    """
+    label = name or getattr(fn, "__name__", "stage")
+    timeout = None
+    if deadline_ts is not None:
+        timeout = deadline_ts - now_ts()
+        if timeout <= 0:
+            raise asyncio.TimeoutError(f"{label}: deadline already passed")
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        sem = _heavy_sems.get(loop)
+        if sem is None:
+            sem = _heavy_sems[loop] = asyncio.Semaphore(HEAVY_STAGE_LIMIT)
+        await sem.acquire()
+
+        def release(_f=None):
+            _stats["running"] -= 1
+            sem.release()
+
+        def release_threadsafe(_f):
+            try:
+                loop.call_soon_threadsafe(release)
+            except RuntimeError:
+                pass  # loop already closed (shutdown): nobody is waiting for the slot
+
+        _stats[f"{kind}_stages"] += 1
+        _stats["running"] += 1
+        try:
+            cf = _pool(kind).submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        # the slot is freed when the stage really ends, not when a timed-out caller stops waiting:
+        # a started stage cannot be interrupted and still occupies a CPU
+        cf.add_done_callback(release_threadsafe)
+        return await asyncio.wrap_future(cf)
+
+    try:
+        with timer("cpu", worker=label):
+            return await asyncio.wait_for(_run(), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        logger.warning("CPU stage %s exceeded its deadline", label)
+        raise
+
+
+def shutdown():
+    global _process_pool, _thread_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+
+
+def executor_stats() -> Dict[str, Any]:
+    return {**_stats, "process_workers": CPU_PROCESS_WORKERS, "thread_workers": CPU_THREAD_WORKERS,
+            "heavy_stage_limit": HEAVY_STAGE_LIMIT}
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop was blocked: a task sleeps for `interval`
+    and records how late it woke up. Lags above `warn_seconds` are logged.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, warn_seconds: float = LOOP_LAG_WARN_SECONDS):
+        self.interval = interval
+        self.warn_seconds = warn_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked_seconds = 0.0
+        self.stalls = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - t0 - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.warn_seconds:
+                self.stalls += 1
+                self.blocked_seconds += lag
+                logger.warning("Event loop was blocked for %.3fs", lag)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"last_lag": round(self.last_lag, 4), "max_lag": round(self.max_lag, 4),
+                "stalls": self.stalls, "blocked_seconds": round(self.blocked_seconds, 3)}
+
+
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, Dict, Optional
+import httpx
+from .config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_MAX_PER_HOST, HTTP_KEEPALIVE_EXPIRY
+from .utils import logger, now_ts
+
+try:  # HTTP/2 needs the optional h2 package
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# per-purpose timeout profiles; callers pass purpose=... (and optionally an explicit override)
+TIMEOUT_PROFILES = {
+    "default": httpx.Timeout(20, connect=10),
+    "page": httpx.Timeout(15, connect=5),
+    "api": httpx.Timeout(20, connect=5),
+    "download": httpx.Timeout(60, connect=10),
+    "submit": httpx.Timeout(20, connect=10),
+    "llm": httpx.Timeout(30, connect=10),
+}
+
+_stats: Dict[str, int] = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0, "http2_requests": 0}
+
+
+async def _trace(event: str, info: Dict[str, Any]):
+    if event == "connection.connect_tcp.complete":
+        _stats["tcp_connects"] += 1
+    elif event == "connection.start_tls.complete":
+        _stats["tls_handshakes"] += 1
+    elif event == "http2.send_request_headers.started":
+        _stats["http2_requests"] += 1
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that frees the per-host slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, sem: asyncio.Semaphore):
+        self._stream = stream
+        self._sem = sem
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._sem.release()
+
+
+class _PooledTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the connection-pool transport to cap in-flight requests per host
+    and to count new TCP/TLS connections through httpcore's trace hook.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._host_sems: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        sem = self._host_sems.get(host)
+        if sem is None:
+            sem = self._host_sems[host] = asyncio.Semaphore(self._max_per_host)
+        await sem.acquire()
+        _stats["requests"] += 1
+        request.extensions = {**request.extensions, "trace": _trace}
+        try:
+            resp = await self._transport.handle_async_request(request)
+        except BaseException:
+            sem.release()
+            raise
+        resp.stream = _ReleasingStream(resp.stream, sem)
+        return resp
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = _PooledTransport(httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, limits=limits), HTTP_MAX_PER_HOST)
+    return httpx.AsyncClient(transport=transport, timeout=TIMEOUT_PROFILES["default"])
+
+
+async def open_client():
+    """Create the shared client (called from app startup)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("Shared HTTP client opened (http2=%s)", HTTP2_AVAILABLE)
+
+
+async def close_client():
+    """Close the shared client and its keep-alive connections (called from app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily for scripts that run outside the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def timeout_for(purpose: str, seconds: Optional[float] = None, deadline_ts: Optional[float] = None) -> httpx.Timeout:
+    """
+    Timeout for a purpose profile; an explicit seconds value overrides the read/write/pool parts,
+    and deadline_ts caps the result at the time left before that deadline.
+    """
+    profile = TIMEOUT_PROFILES.get(purpose, TIMEOUT_PROFILES["default"])
+    if deadline_ts is not None:
+        seconds = min(seconds or profile.read, max(0.5, deadline_ts - now_ts()))
+    if seconds is None:
+        return profile
+    return httpx.Timeout(seconds, connect=min(profile.connect or seconds, seconds))
+
+
+def http_stats() -> Dict[str, Any]:
+    reqs = _stats["requests"]
+    return {
+        **_stats,
+        "reused_connections": max(0, reqs - _stats["tcp_connects"]),
+        "http2_enabled": HTTP2_AVAILABLE,
+    }
@@ -0,0 +1,236 @@
+import json, math, os, sqlite3, threading, uuid
+from typing import Any, Dict, List, Optional
+from .config import (GLOBAL_TIMEOUT, JOB_CONCURRENCY, JOB_QUEUE_SIZE, JOB_HISTORY, JOB_QUEUE_PATH,
+                     JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
+from .scheduler import QueueFull
+from .utils import logger, now_ts
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, payload TEXT, deadline REAL, state TEXT, step TEXT, url TEXT, steps_done INTEGER, "
+    "created REAL, started REAL, finished REAL, error TEXT, owner TEXT, lease_expires REAL, attempts INTEGER)",
+    "CREATE INDEX IF NOT EXISTS jobs_state_deadline ON jobs(state, deadline)",
+    "CREATE TABLE IF NOT EXISTS job_workers (owner TEXT PRIMARY KEY, pid INTEGER, started REAL, last_seen REAL, "
+    "jobs_done INTEGER)",
+    "CREATE TABLE IF NOT EXISTS job_metrics (owner TEXT PRIMARY KEY, snapshot TEXT)",
+)
+_STATUS_COLUMNS = "id, state, step, url, steps_done, created, started, finished, deadline, error, owner, attempts"
+
+
+class DurableQueue:
+    """
+    SQLite-backed job queue shared by the API process and separate worker processes.
+    The API side has the same submit/status/stats interface as JobScheduler. Workers claim
+    the earliest-deadline job under a lease and keep it alive with heartbeats. A running job
+    whose lease lapses (its worker died) is claimed again, up to max_attempts times.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, max_queue: int = JOB_QUEUE_SIZE, timeout: float = GLOBAL_TIMEOUT,
+                 lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # autocommit mode: claims open their own BEGIN IMMEDIATE transaction
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            self._conn = conn
+        return self._conn
+
+    def start(self):
+        with self._lock:
+            self._db()
+
+    async def stop(self):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- API side -------------------------------------------------------------
+
+    def _retry_after(self, db: sqlite3.Connection, queued: int) -> int:
+        row = db.execute(
+            "SELECT AVG(finished - started) FROM (SELECT finished, started FROM jobs "
+            "WHERE state = 'done' ORDER BY finished DESC LIMIT 50)"
+        ).fetchone()
+        avg = row[0] or 30.0
+        slots = max(1, len(self._live_workers(db)) * JOB_CONCURRENCY)
+        return max(1, math.ceil(avg * (queued + 1) / slots))
+
+    def submit(self, payload: Dict[str, Any]) -> "QueuedJob":
+        now = now_ts()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire(db, now)
+                queued = db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+                if queued >= self.max_queue:
+                    raise QueueFull(self._retry_after(db, queued))
+                job = QueuedJob(uuid.uuid4().hex)
+                db.execute(
+                    "INSERT INTO jobs (id, payload, deadline, state, url, steps_done, created, attempts) "
+                    "VALUES (?, ?, ?, 'queued', ?, 0, ?, 0)",
+                    (job.id, json.dumps(payload), now + self.timeout, payload.get("url"), now),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return job
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._db()
+            row = db.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            status = dict(row)
+            status["job_id"] = status.pop("id")
+            position = None
+            if row["state"] == "queued":
+                position = 1 + db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND (deadline < ? OR (deadline = ? AND created < ?))",
+                    (row["deadline"], row["deadline"], row["created"]),
+                ).fetchone()[0]
+        return {**status, "queue_position": position}
+
+    def _live_workers(self, db: sqlite3.Connection):
+        cutoff = now_ts() - self.lease_seconds
+        return db.execute("SELECT owner, pid, jobs_done FROM job_workers WHERE last_seen >= ?", (cutoff,)).fetchall()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            counts = dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            retried = db.execute("SELECT COUNT(*) FROM jobs WHERE attempts > 1").fetchone()[0]
+            workers = [dict(w) for w in self._live_workers(db)]
+        return {"backend": "sqlite", "running": counts.get("running", 0), "queued": counts.get("queued", 0),
+                "states": counts, "reclaimed": retried, "workers": workers,
+                "concurrency": len(workers) * JOB_CONCURRENCY, "max_queue": self.max_queue}
+
+    # --- worker side ----------------------------------------------------------
+
+    def _expire(self, db: sqlite3.Connection, now: float):
+        db.execute("UPDATE jobs SET state = 'timeout', error = 'deadline reached while queued', finished = ? "
+                   "WHERE state = 'queued' AND deadline <= ?", (now, now))
+        # running jobs whose worker vanished and that cannot be retried any more
+        db.execute("UPDATE jobs SET state = 'failed', error = 'worker lost', finished = ?, owner = NULL "
+                   "WHERE state = 'running' AND lease_expires < ? AND (deadline <= ? OR attempts >= ?)",
+                   (now, now, now, self.max_attempts))
+
+    def register(self, owner: str):
+        """Record (or refresh) a live worker process."""
+        now = now_ts()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO job_workers VALUES (?, ?, ?, ?, 0) "
+                "ON CONFLICT(owner) DO UPDATE SET last_seen = excluded.last_seen",
+                (owner, os.getpid(), now, now),
+            )
+
+    def unregister(self, owner: str):
+        with self._lock:
+            self._db().execute("DELETE FROM job_workers WHERE owner = ?", (owner,))
+            self._db().execute("DELETE FROM job_metrics WHERE owner = ?", (owner,))
+
+    def publish_metrics(self, owner: str, snapshot: Dict[str, Any]):
+        """Store a worker's metrics snapshot (app.metrics.Registry.snapshot) for the API's /metrics."""
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO job_metrics VALUES (?, ?)", (owner, json.dumps(snapshot)))
+
+    def metrics_snapshots(self) -> List[Dict[str, Any]]:
+        """Latest metrics snapshots of the live worker processes."""
+        with self._lock:
+            db = self._db()
+            live = {w["owner"] for w in self._live_workers(db)}
+            rows = db.execute("SELECT owner, snapshot FROM job_metrics").fetchall()
+        return [json.loads(snap) for owner, snap in rows if owner in live]
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the earliest-deadline runnable job to owner: a queued one, or a running one whose
+        lease has lapsed. Returns {"id", "payload", "deadline", "attempts"} or None.
+        """
+        now = now_ts()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire(db, now)
+                row = db.execute(
+                    "SELECT id, payload, deadline, attempts, state FROM jobs "
+                    "WHERE (state = 'queued' OR (state = 'running' AND lease_expires < ?)) AND deadline > ? "
+                    "ORDER BY deadline, created LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                db.execute(
+                    "UPDATE jobs SET state = 'running', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "started = COALESCE(started, ?) WHERE id = ?",
+                    (owner, now + self.lease_seconds, now, row["id"]),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if row["state"] == "running":
+            logger.warning("Reclaiming job %s from a lost worker (attempt %d)", row["id"], row["attempts"] + 1)
+        return {"id": row["id"], "payload": json.loads(row["payload"]), "deadline": row["deadline"],
+                "attempts": row["attempts"] + 1}
+
+    def heartbeat(self, job_id: str, owner: str, step: Optional[str] = None, url: Optional[str] = None,
+                  steps_done: int = 0) -> bool:
+        """Extend owner's lease on job_id and record its progress; False if the lease was lost."""
+        now = now_ts()
+        with self._lock:
+            db = self._db()
+            cur = db.execute(
+                "UPDATE jobs SET lease_expires = ?, step = COALESCE(?, step), url = COALESCE(?, url), steps_done = ? "
+                "WHERE id = ? AND owner = ? AND state = 'running'",
+                (now + self.lease_seconds, step, url, steps_done, job_id, owner),
+            )
+            db.execute("UPDATE job_workers SET last_seen = ? WHERE owner = ?", (now, owner))
+        return cur.rowcount == 1
+
+    def release(self, job_id: str, owner: str):
+        """Put a job this worker cannot finish back in the queue."""
+        with self._lock:
+            self._db().execute("UPDATE jobs SET state = 'queued', owner = NULL, lease_expires = NULL, attempts = attempts - 1 "
+                               "WHERE id = ? AND owner = ? AND state = 'running'", (job_id, owner))
+
+    def finish(self, job_id: str, owner: str, state: str, error: Optional[str] = None, steps_done: int = 0):
+        now = now_ts()
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE jobs SET state = ?, error = ?, finished = ?, steps_done = ?, owner = NULL "
+                       "WHERE id = ? AND owner = ?", (state, error, now, steps_done, job_id, owner))
+            db.execute("UPDATE job_workers SET jobs_done = jobs_done + 1, last_seen = ? WHERE owner = ?", (now, owner))
+            db.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE finished IS NOT NULL "
+                "ORDER BY finished DESC LIMIT -1 OFFSET ?)", (JOB_HISTORY,),
+            )
+
+
+class QueuedJob:
+    """Handle returned by DurableQueue.submit (the job itself lives in the database)."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
@@ -0,0 +1,209 @@
+"""
+Worker process for the durable job queue (JOB_BACKEND=sqlite).
+
+Run one per core with `python -m app.job_worker`, or let the API start JOB_WORKER_PROCESSES
+of them. Each process has its own event loop, HTTP client and browser pool, and runs up to
+JOB_CONCURRENCY jobs at once.
+"""
+import argparse, asyncio, os, signal, socket, sys, uuid
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from .config import (JOB_CONCURRENCY, JOB_HEARTBEAT_SECONDS, JOB_POLL_INTERVAL, JOB_WORKER_PROCESSES, PREWARM)
+from .utils import logger, now_ts
+from .job_queue import DurableQueue
+from .metrics import observe, registry
+
+
+class _JobHandle:
+    """Stands in for scheduler.Job inside the orchestrator; progress is flushed by heartbeats."""
+
+    def __init__(self, job_id: str, url: Optional[str]):
+        self.id = job_id
+        self.step: Optional[str] = None
+        self.url = url
+        self.steps_done = 0
+
+    def set_step(self, step: str, url: Optional[str] = None):
+        self.step = step
+        if url:
+            self.url = url
+
+
+async def _heartbeat(queue: DurableQueue, handle: _JobHandle, owner: str, task: asyncio.Task):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            ok = await asyncio.to_thread(queue.heartbeat, handle.id, owner, handle.step, handle.url, handle.steps_done)
+        except Exception as e:
+            # e.g. "database is locked": the lease is still ours until the queue says otherwise, retry next beat
+            logger.warning("Heartbeat for job %s failed: %s", handle.id, e)
+            continue
+        if not ok:
+            logger.warning("Lost the lease on job %s; abandoning it", handle.id)
+            task.cancel()
+            return
+
+
+async def run_job(queue: DurableQueue, claimed: Dict[str, Any], owner: str):
+    """Run one claimed job to completion or its deadline and record the outcome."""
+    from .worker import orchestrator_start
+
+    handle = _JobHandle(claimed["id"], claimed["payload"].get("url"))
+    task = asyncio.ensure_future(orchestrator_start(claimed["payload"], deadline=claimed["deadline"], job=handle))
+    beat = asyncio.ensure_future(_heartbeat(queue, handle, owner, task))
+    state, error = "done", None
+    started = now_ts()
+    try:
+        await asyncio.wait_for(asyncio.shield(task), max(0.0, claimed["deadline"] - now_ts()))
+    except asyncio.TimeoutError:
+        task.cancel()
+        logger.warning("Job %s cancelled at its deadline (step=%s)", handle.id, handle.step)
+        state, error = "timeout", "deadline reached"
+    except asyncio.CancelledError:
+        task.cancel()
+        if not beat.done():
+            # this process is shutting down: hand the job back for another worker
+            queue.release(handle.id, owner)
+            raise
+        state, error = "abandoned", "lease lost"
+    except Exception as e:
+        state, error = "failed", str(e)
+    finally:
+        beat.cancel()
+    observe("job", now_ts() - started, outcome=state, host=urlparse(handle.url or "").hostname or "")
+    if state != "abandoned":
+        await asyncio.to_thread(queue.finish, handle.id, owner, state, error, handle.steps_done)
+
+
+async def _publish_metrics(queue: DurableQueue, owner: str):
+    """Hand this process's metrics to the API process, which serves /metrics for all workers."""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            await asyncio.to_thread(queue.publish_metrics, owner, registry.snapshot())
+        except Exception as e:
+            logger.warning("Publishing metrics failed: %s", e)
+
+
+async def _prewarm(browser_pool):
+    from .workers import prewarm
+    try:
+        await prewarm()
+        await browser_pool.start()
+    except Exception as e:
+        logger.warning("Prewarm failed: %s", e)
+
+
+async def serve(queue: Optional[DurableQueue] = None, concurrency: int = JOB_CONCURRENCY,
+                stop: Optional[asyncio.Event] = None):
+    """Claim and run jobs from the queue until stop is set."""
+    from .http_client import open_client, close_client
+    from .browser.browser_pool import browser_pool
+    from .executors import loop_monitor, shutdown as shutdown_executors
+
+    queue = queue or DurableQueue()
+    stop = stop or asyncio.Event()
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    await open_client()
+    loop_monitor.start()
+    warm = None
+    if PREWARM:
+        warm = asyncio.ensure_future(_prewarm(browser_pool))
+    await asyncio.to_thread(queue.register, owner)
+    logger.info("Job worker %s serving %s with %d slot(s)", owner, queue.path, concurrency)
+
+    async def slot():
+        idle_since = now_ts()
+        while not stop.is_set():
+            claimed = await asyncio.to_thread(queue.claim, owner)
+            if claimed is None:
+                if now_ts() - idle_since >= JOB_HEARTBEAT_SECONDS:
+                    await asyncio.to_thread(queue.register, owner)
+                    idle_since = now_ts()
+                try:
+                    await asyncio.wait_for(stop.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            logger.info("Worker %s running job %s (attempt %d)", owner, claimed["id"], claimed["attempts"])
+            await run_job(queue, claimed, owner)
+            idle_since = now_ts()
+
+    slots = [asyncio.ensure_future(slot()) for _ in range(max(1, concurrency))]
+    slots.append(asyncio.ensure_future(_publish_metrics(queue, owner)))
+    try:
+        await stop.wait()
+    finally:
+        for s in slots:
+            s.cancel()
+        await asyncio.gather(*slots, return_exceptions=True)
+        if warm is not None:
+            warm.cancel()
+        await asyncio.to_thread(queue.unregister, owner)
+        queue.close()
+        await browser_pool.stop()
+        await close_client()
+        await loop_monitor.stop()
+        shutdown_executors()
+
+
+class WorkerSupervisor:
+    """Starts `processes` job worker processes from the API and restarts any that exit."""
+
+    def __init__(self, processes: int = JOB_WORKER_PROCESSES):
+        self.processes = processes
+        self._procs: List[Optional[asyncio.subprocess.Process]] = []
+        self._tasks: List[asyncio.Task] = []
+        self.restarts = 0
+
+    async def _keep(self, i: int):
+        while True:
+            proc = await asyncio.create_subprocess_exec(sys.executable, "-m", "app.job_worker")
+            self._procs[i] = proc
+            code = await proc.wait()
+            self.restarts += 1
+            logger.warning("Job worker process %d exited with %s; restarting", proc.pid, code)
+            await asyncio.sleep(1)
+
+    def start(self):
+        if not self._tasks and self.processes > 0:
+            self._procs = [None] * self.processes
+            self._tasks = [asyncio.ensure_future(self._keep(i)) for i in range(self.processes)]
+
+    async def stop(self, grace: float = 10.0):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        live = [p for p in self._procs if p is not None and p.returncode is None]
+        for p in live:
+            p.terminate()
+        for p in live:
+            try:
+                await asyncio.wait_for(p.wait(), grace)
+            except asyncio.TimeoutError:
+                p.kill()
+        self._procs = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"processes": self.processes, "pids": [p.pid for p in self._procs if p is not None],
+                "restarts": self.restarts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run quiz jobs from the durable job queue.")
+    parser.add_argument("--concurrency", type=int, default=JOB_CONCURRENCY, help="jobs run at once by this process")
+    args = parser.parse_args()
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await serve(concurrency=args.concurrency, stop=stop)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
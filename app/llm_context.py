@@ -0,0 +1,206 @@
+import asyncio, os, re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from .config import LLM_CONTEXT_TOKENS, LLM_CONTEXT_SAMPLE_ROWS, LLM_CONTEXT_FILE_WAIT
+from .executors import run_cpu
+from .prefetch import data_file
+from .utils import logger, now_ts, timer
+
+# tags whose text is never part of the question
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe", "head",
+                     "nav", "footer", "aside"]
+_PIECES = re.compile(r"\d+|[^\W\d_]+|\S")
+
+counters = {"prompts": 0, "tokens_raw": 0, "tokens_used": 0, "tokens_saved": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token count, close to BPE tokenizers without loading one: a word is one
+    token plus one per 8 further letters, digit runs split in threes, other symbols count one each.
+    """
+    n = 0
+    for piece in _PIECES.findall(text or ""):
+        if piece[0].isdigit():
+            n += (len(piece) + 2) // 3
+        else:
+            n += 1 + len(piece) // 8
+    return n
+
+
+def dedupe(lines: List[str], seen: Optional[set] = None) -> List[str]:
+    """
+    Drop empty and repeated lines (whitespace and case insensitive), keeping first occurrences.
+    Multi-line blocks (tables, lists) are compared whole and kept verbatim: their repeated
+    rows are data, not boilerplate.
+    """
+    seen = set() if seen is None else seen
+    out = []
+    for line in lines:
+        line = line.strip() if "\n" in line else " ".join(line.split())
+        key = line.lower()
+        if line and key not in seen:
+            seen.add(key)
+            out.append(line)
+    return out
+
+
+def _table_block(table) -> str:
+    rows = [" | ".join(c.get_text(" ", strip=True) for c in tr.find_all(["th", "td"])) for tr in table.find_all("tr")]
+    return "\n".join(r for r in rows if r.strip(" |"))
+
+
+def _list_block(lst) -> str:
+    items = [" ".join(li.get_text(" ", strip=True).split()) for li in lst.find_all("li", recursive=False)]
+    return "\n".join(f"- {i}" for i in items if i)
+
+
+def page_blocks(html: str) -> List[str]:
+    """
+    Process-pool stage: the page's visible text as deduplicated lines, without scripts,
+    styles, navigation or footers. Each table and list is one multi-line block, kept whole
+    (repeated values included); _pack decides how much of it fits.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html or "", "html.parser")
+    for tag in soup(_BOILERPLATE_TAGS):
+        tag.decompose()
+    blocks: Dict[str, str] = {}
+
+    def stash(tag, text: str):
+        # a placeholder line survives get_text(); it is swapped back for the block afterwards
+        key = f"\x00block{len(blocks)}\x00"
+        blocks[key] = text
+        tag.replace_with(soup.new_string(f"\n{key}\n"))
+
+    for table in soup.find_all("table"):
+        if table.find_parent("table") is None:
+            stash(table, _table_block(table))
+    for lst in soup.find_all(["ul", "ol"]):
+        if lst.find_parent(["ul", "ol"]) is None:
+            stash(lst, _list_block(lst))
+    body = soup.body or soup
+    lines = [blocks.get(line.strip(), line) for line in body.get_text("\n", strip=True).split("\n")]
+    return dedupe(lines)
+
+
+def summarize_frame(df, name: str, sample_rows: int = LLM_CONTEXT_SAMPLE_ROWS) -> List[str]:
+    """Schema, numeric ranges and the first rows of a parsed data file."""
+    cols = []
+    for c in df.columns:
+        s = df[c]
+        desc = f"{c} ({s.dtype}"
+        if s.dtype.kind in "iuf" and len(s):
+            desc += f", min {s.min()}, max {s.max()}"
+        cols.append(desc + ")")
+    lines = [f"{name}: {len(df)} rows x {len(df.columns)} columns", "columns: " + ", ".join(cols), "first rows:"]
+    lines += df.head(sample_rows).to_csv(index=False).strip().split("\n")
+    return lines
+
+
+async def _file_summary(page_info: Dict[str, Any], url: str, deadline_ts: float) -> List[str]:
+    from .data.frame_cache import frame_cache, file_kind
+    name = os.path.basename(urlparse(url).path) or url
+    kind = file_kind(name)
+    if kind is None:
+        return []
+    # only wait a little for a download the prefetcher has not finished: the LLM call needs the time more
+    wait_until = min(deadline_ts, now_ts() + LLM_CONTEXT_FILE_WAIT)
+    try:
+        path = await asyncio.wait_for(data_file(page_info, url, wait_until), max(0.0, wait_until - now_ts()))
+        df = await frame_cache.aload(path, kind, name=name, deadline_ts=wait_until)
+        return await run_cpu(summarize_frame, df, name, kind="thread", deadline_ts=deadline_ts)
+    except Exception as e:
+        logger.info("No summary of %s for the LLM context: %s", url, e)
+        return []
+
+
+def _cut(line: str, room: int) -> str:
+    """Longest prefix of line (plus " ...") whose estimate fits in room tokens, or "" if none does."""
+    lo, hi = 0, len(line)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(line[:mid] + " ...") <= room:
+            lo = mid
+        else:
+            hi = mid - 1
+    # the estimate is not strictly monotonic in the prefix length: make sure the result fits
+    while lo > 0 and estimate_tokens(line[:lo] + " ...") > room:
+        lo -= 1
+    return line[:lo].rstrip() + " ..." if lo else ""
+
+
+def _pack(sections: List[Tuple[str, List[str]]], budget: int) -> Tuple[str, int, int]:
+    """
+    Fill the budget section by section, in order; a section stops at the first line (or block)
+    that does not fit, which is cut to the tokens left. Returns (text, tokens used, lines dropped).
+    """
+    out, used, dropped = [], 0, 0
+    for title, lines in sections:
+        if not lines:
+            continue
+        head = f"{title}:"
+        cost = estimate_tokens(head)
+        if used + cost >= budget:
+            dropped += len(lines)
+            continue
+        out.append(head)
+        used += cost
+        for i, line in enumerate(lines):
+            cost = estimate_tokens(line)
+            if used + cost <= budget:
+                out.append(line)
+                used += cost
+                continue
+            cut = _cut(line, budget - used) if budget - used > 8 else ""
+            if cut:
+                out.append(cut)
+                used += estimate_tokens(cut)
+                dropped -= 1
+            dropped += len(lines) - i
+            break
+        out.append("")
+    return "\n".join(out).strip(), used, dropped
+
+
+async def build_context(page_info: Dict[str, Any], deadline_ts: float,
+                        budget: int = LLM_CONTEXT_TOKENS) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compact LLM context for a quiz page, at most ~budget tokens: the instruction, attached
+    document text, summaries of the page's data files and whatever page text is left, in
+    that order of priority. Returns (context, report) where the report compares the estimated
+    tokens with what sending the raw instruction/HTML and document text would have cost.
+    """
+    instruction = page_info.get("instruction") or page_info.get("text") or ""
+    html = page_info.get("html") or ""
+    pdf_text = page_info.get("pdf_text") or ""
+    with timer("context") as span:
+        blocks = await run_cpu(page_blocks, html, deadline_ts=deadline_ts, name="page_blocks") if html else []
+        seen: set = set()
+        if page_info.get("instruction_from") == "atob":
+            instruction_lines = dedupe(instruction.split("\n"), seen)
+        else:
+            # the instruction is the page's own visible text: use its cleaned blocks instead
+            instruction_lines = dedupe(blocks or instruction.split("\n"), seen)
+        page_lines = dedupe(blocks, seen)
+        summaries = await asyncio.gather(*[_file_summary(page_info, u, deadline_ts)
+                                           for u in page_info.get("data_urls") or []])
+        data_lines = [line for s in summaries for line in s]
+        context, used, dropped = _pack([
+            ("Instruction", instruction_lines),
+            ("Attached document text", dedupe(pdf_text.split("\n"))),
+            ("Data files", data_lines),
+            ("Other page text", page_lines),
+        ], budget)
+        raw = estimate_tokens(instruction or html) + estimate_tokens(pdf_text)
+        report = {"tokens_raw": raw, "tokens_used": used, "tokens_saved": max(0, raw - used),
+                  "lines_dropped": dropped, "data_files_summarized": sum(1 for s in summaries if s)}
+        span["outcome"] = "truncated" if dropped else "ok"
+    counters["prompts"] += 1
+    for k in ("tokens_raw", "tokens_used", "tokens_saved"):
+        counters[k] += report[k]
+    return context, report
+
+
+def stats() -> Dict[str, Any]:
+    return dict(counters)
@@ -0,0 +1,202 @@
+import asyncio, heapq, itertools, random, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+from .config import (LLM_MAX_IN_FLIGHT, LLM_RATE_PER_SEC, LLM_BURST, LLM_MAX_RETRIES,
+                     LLM_BACKOFF_BASE, LLM_BACKOFF_MAX)
+from .utils import logger, now_ts
+from .metrics import observe
+
+# Lower value = served first. Speculative LLM candidates yield to calls an answer depends on.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_SPECULATIVE = 2
+_PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_SPECULATIVE: "speculative"}
+
+# priority of LLM calls made from the current task; race() and the orchestrator set it
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def prioritized(priority: int):
+    token = llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+class RateLimited(Exception):
+    """No slot could be had (or no retry fit) before the caller's deadline."""
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now_ts())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class LLMScheduler:
+    """
+    Client-side admission for AiPipe calls.
+    A call needs a free slot (at most `max_in_flight` at once) and a token from a bucket
+    refilled at `rate` per second (up to `burst`). Waiters are served by priority, then
+    earliest deadline. A 429 halves the rate and pauses admission for Retry-After (or the
+    backoff); every success wins back a tenth of the configured rate. 429, 5xx and transport
+    errors are retried with full-jitter exponential backoff while the wait still fits the deadline.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, rate: float = LLM_RATE_PER_SEC,
+                 burst: int = LLM_BURST, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX):
+        self.max_in_flight = max(1, max_in_flight)
+        self.base_rate = max(0.01, rate)
+        self.rate = self.base_rate
+        self.burst = max(1, burst)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0  # monotonic
+        self._in_flight = 0
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0,
+                         "transport_errors": 0, "gave_up": 0}
+
+    # --- admission ---
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _pump(self):
+        self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._heap and self._heap[0][-1].done():  # waiters that gave up
+            heapq.heappop(self._heap)
+        while self._heap and self._in_flight < self.max_in_flight:
+            if now < self._blocked_until:
+                self._schedule(self._blocked_until - now)
+                return
+            if self._tokens < 1:
+                self._schedule((1 - self._tokens) / self.rate)
+                return
+            fut = heapq.heappop(self._heap)[-1]
+            if fut.done():
+                continue
+            self._tokens -= 1
+            self._in_flight += 1
+            fut.set_result(None)
+
+    def _schedule(self, delay: float):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(max(0.001, delay), self._pump)
+
+    async def _acquire(self, priority: int, deadline_ts: Optional[float]):
+        fut = asyncio.get_running_loop().create_future()
+        key = deadline_ts if deadline_ts is not None else float("inf")
+        heapq.heappush(self._heap, (priority, key, next(self._seq), fut))
+        self._pump()
+        started = time.monotonic()
+        name = _PRIORITY_NAMES.get(priority, str(priority))
+        try:
+            timeout = None if deadline_ts is None else max(0.0, deadline_ts - now_ts())
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            observe("llm_queue", time.monotonic() - started, worker=name, outcome="timeout")
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise RateLimited("no LLM slot before the deadline")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        observe("llm_queue", time.monotonic() - started, worker=name)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._pump()
+
+    # --- feedback ---
+
+    def _throttled(self, pause: float):
+        self.counters["throttled"] += 1
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning("LLM rate limited: pausing %.1fs, rate now %.2f/s", pause, self.rate)
+
+    def _succeeded(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, send: Callable[[], Awaitable[httpx.Response]], priority: Optional[int] = None,
+                      deadline_ts: Optional[float] = None) -> httpx.Response:
+        """
+        Run send() once admitted, retrying 429/5xx/transport errors within deadline_ts.
+        Returns the last response (the caller checks its status); raises the last transport
+        error, or RateLimited when the deadline passes while waiting for a slot.
+        """
+        priority = llm_priority.get() if priority is None else priority
+        attempt = 0
+        while True:
+            await self._acquire(priority, deadline_ts)
+            self.counters["requests"] += 1
+            try:
+                response = await send()
+                error = None
+            except httpx.TransportError as e:
+                response, error = None, e
+            finally:
+                self._release()
+
+            if response is not None and not _retryable(response.status_code):
+                self._succeeded()
+                return response
+            pause = self._backoff(attempt)
+            if response is not None and response.status_code == 429:
+                pause = max(pause, retry_after_seconds(response) or 0.0)
+                self._throttled(pause)
+            elif response is not None:
+                self.counters["server_errors"] += 1
+            else:
+                self.counters["transport_errors"] += 1
+
+            attempt += 1
+            if attempt > self.max_retries or (deadline_ts is not None and now_ts() + pause >= deadline_ts):
+                self.counters["gave_up"] += 1
+                if error is not None:
+                    raise error
+                return response
+            self.counters["retries"] += 1
+            logger.info("Retrying LLM call in %.2fs (attempt %d, %s)", pause, attempt + 1,
+                        response.status_code if response is not None else type(error).__name__)
+            await asyncio.sleep(pause)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self._in_flight, "queued": sum(1 for w in self._heap if not w[-1].done()),
+                "max_in_flight": self.max_in_flight, "rate": round(self.rate, 3), "base_rate": self.base_rate,
+                "paused_for": round(max(0.0, self._blocked_until - time.monotonic()), 3), **self.counters}
+
+
+llm_scheduler = LLMScheduler()
@@ -1,12 +1,65 @@
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .schemas import QuizRequest
-from .config import SECRET
+from .config import SECRET, PREWARM, JOB_BACKEND
+from .scheduler import JobScheduler, QueueFull
 from .worker import orchestrator_start
 from .utils import logger
+from .browser.browser_pool import browser_pool
+from .browser.resource_policy import resource_policy
+from .http_client import open_client, close_client, http_stats
+from .browser.download_cache import download_cache
+from .executors import loop_monitor, executor_stats, shutdown as shutdown_executors
+from .workers import prewarm as prewarm_workers
+from .llm_cache import llm_cache
+from .llm_scheduler import llm_scheduler
+from . import llm_context
+from .metrics import registry
 
-app = FastAPI(title="Quiz Solver Endpoint")
+
+async def _prewarm():
+    """Import worker modules and launch the browser after startup instead of before it."""
+    try:
+        await prewarm_workers()
+        await browser_pool.start()
+    except Exception as e:
+        # a failed browser launch is retried lazily on first render
+        logger.warning("Prewarm failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_client()
+    loop_monitor.start()
+    scheduler.start()
+    if supervisor is not None:
+        supervisor.start()
+    # with worker processes the API never renders or solves, so there is nothing to warm up here
+    warm = asyncio.create_task(_prewarm()) if PREWARM and supervisor is None else None
+    yield
+    if warm is not None:
+        warm.cancel()
+    if supervisor is not None:
+        await supervisor.stop()
+    await scheduler.stop()
+    await browser_pool.stop()
+    await close_client()
+    await loop_monitor.stop()
+    shutdown_executors()
+
+
+if JOB_BACKEND == "sqlite":
+    # the API only enqueues; separate worker processes (app/job_worker.py) claim and run the jobs
+    from .job_queue import DurableQueue
+    from .job_worker import WorkerSupervisor
+    scheduler = DurableQueue()
+    supervisor = WorkerSupervisor()
+else:
+    scheduler = JobScheduler(orchestrator_start)
+    supervisor = None
+app = FastAPI(title="Quiz Solver Endpoint", lifespan=lifespan)
 
 @app.get("/")
 def root():
@@ -16,6 +69,32 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/stats")
+def stats():
+    from .data.frame_cache import frame_cache
+    return {"http": http_stats(), "browser_pool": browser_pool.stats(),
+            "browser_resources": resource_policy.stats(), "download_cache": download_cache.stats(),
+            "frame_cache": frame_cache.stats(), "executors": executor_stats(),
+            "event_loop": loop_monitor.stats(), "llm_cache": llm_cache.stats(),
+            "llm": llm_scheduler.stats(), "llm_context": llm_context.stats(),
+            "jobs": scheduler.stats(), "job_workers": supervisor.stats() if supervisor is not None else None,
+            "stages": registry.stage_quantiles(_worker_snapshots())}
+
+
+def _worker_snapshots():
+    """Metrics published by separate job worker processes (sqlite backend), else none."""
+    return scheduler.metrics_snapshots() if JOB_BACKEND == "sqlite" else []
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    jobs = scheduler.stats()
+    extra = [
+        ("quiz_jobs_in_flight", "gauge", "Quiz jobs running.", {}, jobs["running"]),
+        ("quiz_job_queue_depth", "gauge", "Quiz jobs waiting to run.", {}, jobs["queued"]),
+    ]
+    return PlainTextResponse(registry.render(_worker_snapshots(), extra), media_type="text/plain; version=0.0.4")
+
 
 @app.post("/quiz")
 async def receive_quiz(request: Request):
@@ -33,9 +112,23 @@ async def receive_quiz(request: Request):
     if req.secret != SECRET:
         raise HTTPException(status_code=403, detail="Invalid secret")
 
-    # accepted — start orchestrator in background and return 200 immediately
+    # accepted — queue the orchestrator run and return 200 immediately
     logger.info("Received quiz request for url=%s email=%s", req.url, req.email)
-    # spawn background task
-    asyncio.create_task(orchestrator_start(req.dict()))
-    return JSONResponse(status_code=200, content={"status": "accepted", "note": "processing started"})
+    try:
+        job = scheduler.submit(req.dict())
+    except QueueFull as e:
+        logger.warning("Job queue full; rejecting quiz request for url=%s", req.url)
+        return JSONResponse(status_code=429, content={"status": "busy", "note": "job queue is full"},
+                            headers={"Retry-After": str(e.retry_after)})
+    status = scheduler.status(job.id)
+    return JSONResponse(status_code=200, content={"status": "accepted", "note": "processing started", "job_id": job.id,
+                                                  "queue_position": status["queue_position"]})
+
+
+@app.get("/quiz/{job_id}")
+def quiz_status(job_id: str):
+    status = scheduler.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return status
 
@@ -0,0 +1,202 @@
+import bisect, os, sys, threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Histogram buckets (seconds) for stage spans, and the quantiles reported per stage
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+QUANTILES = (0.5, 0.95, 0.99)
+# recent durations kept per series for the quantiles
+WINDOW = 512
+
+# host of the quiz page being solved; set by the orchestrator, inherited by the tasks it starts
+quiz_host: ContextVar[str] = ContextVar("quiz_host", default="")
+
+
+def set_quiz_host(url: Optional[str]):
+    quiz_host.set(urlparse(url or "").hostname or "")
+
+
+class _Series:
+    __slots__ = ("buckets", "sum", "count", "samples")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples: deque = deque(maxlen=WINDOW)
+
+    def add(self, seconds: float):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.samples.append(seconds)
+
+
+def _quantile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _labels(**labels) -> str:
+    def esc(v) -> str:
+        return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}" if labels else ""
+
+
+class Registry:
+    """
+    Stage spans keyed by (stage, worker, outcome, host): a cumulative histogram for
+    Prometheus plus a window of recent durations for p50/p95/p99.
+    Snapshots are plain JSON so worker processes can hand theirs to the API process.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, worker: str = "", outcome: str = "ok", host: Optional[str] = None):
+        key = (stage, worker or "", outcome or "", quiz_host.get() if host is None else host)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.add(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series = [[*key, list(s.buckets), s.sum, s.count, list(s.samples)] for key, s in self._series.items()]
+        # component metrics stay per process (pid label); only the stage histograms are merged
+        pid = str(os.getpid())
+        metrics = [(name, kind, help_text, {**labels, "pid": pid}, value)
+                   for name, kind, help_text, labels, value in component_metrics()]
+        return {"series": series, "metrics": metrics}
+
+    def stage_quantiles(self, snapshots: Iterable[Dict[str, Any]] = ()) -> Dict[str, Dict[str, Any]]:
+        """{stage: {"count", "p50", "p95", "p99"}} over this process and the given snapshots."""
+        samples: Dict[str, List[float]] = {}
+        counts: Dict[str, int] = {}
+        for snap in [self.snapshot(), *snapshots]:
+            for stage, _w, _o, _h, _b, _s, count, window in snap["series"]:
+                samples.setdefault(stage, []).extend(window)
+                counts[stage] = counts.get(stage, 0) + count
+        return {stage: {"count": counts[stage],
+                        **{f"p{int(q * 100)}": round(_quantile(vals, q), 4) for q in QUANTILES}}
+                for stage, vals in sorted(samples.items())}
+
+    def render(self, snapshots: Iterable[Dict[str, Any]] = (), extra: Iterable[Tuple] = ()) -> str:
+        """Prometheus text exposition of this process, the given snapshots and extra metrics."""
+        merged: Dict[Tuple, List] = {}
+        metrics: Dict[Tuple, List] = {}
+        for snap in [self.snapshot(), *snapshots]:
+            for stage, worker, outcome, host, buckets, total, count, window in snap["series"]:
+                m = merged.setdefault((stage, worker, outcome, host), [[0] * len(buckets), 0.0, 0, []])
+                m[0] = [a + b for a, b in zip(m[0], buckets)]
+                m[1] += total
+                m[2] += count
+                m[3].extend(window)
+            for name, kind, help_text, labels, value in snap["metrics"]:
+                key = (name, kind, help_text, tuple(sorted(labels.items())))
+                metrics.setdefault(key, [0])[0] += value
+        for name, kind, help_text, labels, value in extra:
+            metrics.setdefault((name, kind, help_text, tuple(sorted(labels.items()))), [0])[0] += value
+
+        lines = ["# HELP quiz_stage_duration_seconds Duration of instrumented stages.",
+                 "# TYPE quiz_stage_duration_seconds histogram"]
+        for (stage, worker, outcome, host), (buckets, total, count, _) in sorted(merged.items()):
+            labels = dict(stage=stage, worker=worker, outcome=outcome, host=host)
+            cumulative = 0
+            for bound, n in zip([*BUCKETS, "+Inf"], buckets):
+                cumulative += n
+                lines.append(f"quiz_stage_duration_seconds_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"quiz_stage_duration_seconds_sum{_labels(**labels)} {total:.6f}")
+            lines.append(f"quiz_stage_duration_seconds_count{_labels(**labels)} {count}")
+
+        per_stage: Dict[Tuple[str, str], List] = {}
+        for (stage, worker, _o, _h), (_b, total, count, window) in merged.items():
+            s = per_stage.setdefault((stage, worker), [0.0, 0, []])
+            s[0] += total
+            s[1] += count
+            s[2].extend(window)
+        lines += ["# HELP quiz_stage_latency_seconds Recent stage latency quantiles per stage and worker.",
+                  "# TYPE quiz_stage_latency_seconds summary"]
+        for (stage, worker), (total, count, window) in sorted(per_stage.items()):
+            for q in QUANTILES:
+                lines.append(f"quiz_stage_latency_seconds{_labels(stage=stage, worker=worker, quantile=q)} "
+                             f"{_quantile(window, q):.6f}")
+            lines.append(f"quiz_stage_latency_seconds_sum{_labels(stage=stage, worker=worker)} {total:.6f}")
+            lines.append(f"quiz_stage_latency_seconds_count{_labels(stage=stage, worker=worker)} {count}")
+
+        seen = set()
+        for (name, kind, help_text, labels), (value,) in sorted(metrics.items()):
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines.append(f"{name}{_labels(**dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def component_metrics() -> List[Tuple[str, str, str, Dict[str, str], float]]:
+    """
+    Counters and gauges of the caches, pools and executors loaded in this process,
+    as (name, type, help, labels, value). Modules that were never imported are skipped.
+    """
+    out = []
+    mods = sys.modules
+    if "app.http_client" in mods:
+        s = mods["app.http_client"].http_stats()
+        out.append(("quiz_http_requests_total", "counter", "Outbound HTTP requests.", {}, s["requests"]))
+        out.append(("quiz_http_connections_total", "counter", "New outbound TCP connections.", {}, s["tcp_connects"]))
+    if "app.browser.browser_pool" in mods:
+        s = mods["app.browser.browser_pool"].browser_pool.stats()
+        out.append(("quiz_browser_contexts_active", "gauge", "Browser contexts in use.", {}, s["active_contexts"]))
+        out.append(("quiz_browser_contexts_max", "gauge", "Browser context limit.", {}, s["max_contexts"]))
+        out.append(("quiz_browser_launches_total", "counter", "Browser launches.", {}, s["launches"]))
+    if "app.browser.resource_policy" in mods:
+        s = mods["app.browser.resource_policy"].resource_policy.stats()
+        for outcome in ("blocked", "cached"):
+            out.append(("quiz_browser_requests_saved_total", "counter", "Render subresource requests blocked or served from the asset cache.",
+                        {"outcome": outcome}, s[outcome]))
+        out.append(("quiz_browser_requests_total", "counter", "Render subresource requests routed.", {}, s["requests"]))
+        out.append(("quiz_browser_bytes_saved_total", "counter", "Bytes not downloaded by renders (blocked ones estimated).",
+                    {}, s["bytes_saved"]))
+    caches = []
+    if "app.browser.download_cache" in mods:
+        c = mods["app.browser.download_cache"].download_cache.counters
+        caches.append(("download", c["hits"] + c["revalidated"] + c["shared"], c["misses"]))
+    if "app.llm_cache" in mods:
+        c = mods["app.llm_cache"].llm_cache.counters
+        caches.append(("llm", c["memory_hits"] + c["disk_hits"], c["misses"]))
+    if "app.data.frame_cache" in mods:
+        c = mods["app.data.frame_cache"].frame_cache.counters
+        caches.append(("frame", c["memory_hits"] + c["disk_hits"], c["parses"]))
+    for cache, hits, misses in caches:
+        out.append(("quiz_cache_hits_total", "counter", "Cache hits.", {"cache": cache}, hits))
+        out.append(("quiz_cache_misses_total", "counter", "Cache misses.", {"cache": cache}, misses))
+    if "app.llm_scheduler" in mods:
+        s = mods["app.llm_scheduler"].llm_scheduler.stats()
+        out.append(("quiz_llm_in_flight", "gauge", "LLM calls in flight.", {}, s["in_flight"]))
+        out.append(("quiz_llm_queued", "gauge", "LLM calls waiting for admission.", {}, s["queued"]))
+        out.append(("quiz_llm_rate_per_second", "gauge", "Current adaptive LLM request rate.", {}, s["rate"]))
+        for event in ("retries", "throttled", "server_errors", "transport_errors", "gave_up"):
+            out.append(("quiz_llm_events_total", "counter", "LLM retries, 429s, errors and abandoned calls.",
+                        {"event": event}, s[event]))
+    if "app.llm_context" in mods:
+        s = mods["app.llm_context"].stats()
+        for kind in ("used", "saved"):
+            out.append(("quiz_llm_context_tokens_total", "counter",
+                        "Estimated prompt context tokens sent, and saved against the raw page.", {"kind": kind},
+                        s[f"tokens_{kind}"]))
+    if "app.executors" in mods:
+        ex = mods["app.executors"]
+        out.append(("quiz_cpu_stages_running", "gauge", "CPU-bound stages running.", {}, ex.executor_stats()["running"]))
+        out.append(("quiz_event_loop_max_lag_seconds", "gauge", "Largest event-loop stall seen.", {},
+                    ex.loop_monitor.stats()["max_lag"]))
+    return out
+
+
+registry = Registry()
+observe = registry.observe
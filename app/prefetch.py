@@ -0,0 +1,62 @@
+import asyncio
+from typing import Dict, Any, Optional
+from .config import PREFETCH_CONCURRENCY
+from .utils import logger, now_ts
+from .budget import time_left
+from .browser.download_cache import download_cache
+
+
+def _log_failure(url: str, task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Prefetch of %s failed: %s", url, task.exception())
+
+
+def start_prefetch(page_info: Dict[str, Any], deadline_ts: float):
+    """
+    Start downloading every data_url of page_info in the background (at most
+    PREFETCH_CONCURRENCY at once, never past deadline_ts) and record the tasks
+    under page_info["data_files"] so workers can await ready local paths.
+    """
+    urls = page_info.get("data_urls") or []
+    sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+    async def fetch(url: str) -> str:
+        async with sem:
+            remaining = deadline_ts - now_ts()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"no time left to fetch {url}")
+            return await asyncio.wait_for(download_cache.get(url, timeout=remaining), remaining)
+
+    tasks = {}
+    for url in urls:
+        task = asyncio.ensure_future(fetch(url))
+        task.add_done_callback(lambda t, u=url: _log_failure(u, t))
+        tasks[url] = task
+    page_info["data_files"] = tasks
+    if tasks:
+        logger.info("Prefetching %d data file(s)", len(tasks))
+
+
+def cancel_prefetch(page_info: Dict[str, Any]):
+    """Stop waiting for downloads of a page the orchestrator has moved past."""
+    for task in (page_info.get("data_files") or {}).values():
+        task.cancel()
+
+
+async def data_file(page_info: Dict[str, Any], url: str, deadline_ts: Optional[float] = None) -> str:
+    """
+    Local path for url: the prefetched download if one was started, else a direct cache fetch bounded by deadline_ts.
+    A prefetch that failed, timed out or was cancelled (e.g. bound to an earlier attempt's deadline) is fetched again.
+    """
+    files = page_info.get("data_files") or {}
+    task = files.get(url)
+    if task is not None and not (task.done() and (task.cancelled() or task.exception() is not None)):
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # this caller was cancelled, not the prefetch
+        except Exception as e:
+            logger.info("Prefetch of %s failed (%s); fetching it directly", url, e)
+    files.pop(url, None)
+    return await download_cache.get(url, timeout=time_left(deadline_ts))
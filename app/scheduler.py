@@ -0,0 +1,163 @@
+import asyncio, heapq, itertools, math, uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from .config import GLOBAL_TIMEOUT, JOB_CONCURRENCY, JOB_QUEUE_SIZE, JOB_HISTORY
+from .utils import logger, now_ts
+from .metrics import observe
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    """One /quiz submission and its progress."""
+
+    def __init__(self, payload: Dict[str, Any], deadline: float):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.deadline = deadline
+        self.state = "queued"
+        self.step: Optional[str] = None
+        self.url = payload.get("url")
+        self.steps_done = 0
+        self.created = now_ts()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._key = None
+
+    def set_step(self, step: str, url: Optional[str] = None):
+        self.step = step
+        if url:
+            self.url = url
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id, "state": self.state, "step": self.step, "url": self.url,
+            "steps_done": self.steps_done, "created": self.created, "started": self.started,
+            "finished": self.finished, "deadline": self.deadline, "error": self.error,
+        }
+
+
+class JobScheduler:
+    """
+    In-process job scheduler for quiz runs.
+    At most `concurrency` jobs run at once; up to `max_queue` more wait, earliest deadline first.
+    Submissions beyond that are refused with a Retry-After estimate. A job is cancelled when it
+    reaches its deadline (GLOBAL_TIMEOUT after it was received), wherever it is.
+    """
+
+    def __init__(self, runner: Callable[..., Awaitable[Any]], concurrency: int = JOB_CONCURRENCY,
+                 max_queue: int = JOB_QUEUE_SIZE, timeout: float = GLOBAL_TIMEOUT):
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._history: deque = deque()
+        self._running: Dict[str, Job] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._durations: deque = deque(maxlen=50)
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for t in self._workers:
+            t.cancel()
+        for job in list(self._running.values()):
+            if job._task is not None:
+                job._task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _retry_after(self) -> int:
+        avg = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        return max(1, math.ceil(avg * (len(self._heap) + 1) / self.concurrency))
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        self.start()
+        self._expire_queued()
+        if len(self._heap) >= self.max_queue:
+            raise QueueFull(self._retry_after())
+        job = Job(payload, now_ts() + self.timeout)
+        job._key = (job.deadline, next(self._seq))
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (*job._key, job))
+        self._wakeup.set()
+        return job
+
+    def _expire_queued(self):
+        now = now_ts()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            self._finish(job, "timeout", "deadline reached while queued")
+
+    def _finish(self, job: Job, state: str, error: Optional[str] = None):
+        job.state = state
+        job.error = error
+        job.finished = now_ts()
+        if job.started is not None:
+            self._durations.append(job.finished - job.started)
+            observe("job", job.finished - job.started, outcome=state, host=urlparse(job.payload.get("url") or "").hostname or "")
+        self._history.append(job.id)
+        while len(self._history) > JOB_HISTORY:
+            self._jobs.pop(self._history.popleft(), None)
+
+    async def _work(self):
+        while True:
+            self._expire_queued()
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, _, job = heapq.heappop(self._heap)
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.state = "running"
+        job.started = now_ts()
+        self._running[job.id] = job
+        job._task = asyncio.ensure_future(self.runner(job.payload, deadline=job.deadline, job=job))
+        try:
+            await asyncio.wait_for(asyncio.shield(job._task), max(0.0, job.deadline - now_ts()))
+            self._finish(job, "done")
+        except asyncio.TimeoutError:
+            job._task.cancel()
+            logger.warning("Job %s cancelled at its deadline (step=%s)", job.id, job.step)
+            self._finish(job, "timeout", "deadline reached")
+        except asyncio.CancelledError:
+            job._task.cancel()
+            self._finish(job, "cancelled")
+            raise
+        except Exception as e:
+            self._finish(job, "failed", str(e))
+        finally:
+            self._running.pop(job.id, None)
+
+    def position(self, job: Job) -> Optional[int]:
+        """1-based place of a queued job in run order, None once it has started."""
+        if job.state != "queued":
+            return None
+        return 1 + sum(1 for d, s, _ in self._heap if (d, s) < job._key)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job.to_dict(), "queue_position": self.position(job)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": len(self._running), "queued": len(self._heap), "concurrency": self.concurrency,
+                "max_queue": self.max_queue}
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import SPECULATION_GRACE
+from .utils import logger, now_ts
+from .workers import dispatch
+from .llm_scheduler import PRIORITY_SPECULATIVE, llm_priority
+
+
+def has_answer(res: Optional[Dict[str, Any]]) -> bool:
+    if not isinstance(res, dict):
+        return False
+    ans = res.get("answer")
+    return ans is not None and str(ans).strip() != ""
+
+
+async def _speculative(name: str, page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float):
+    # runs in its own task context, so the lower LLM priority only applies to this candidate
+    llm_priority.set(PRIORITY_SPECULATIVE)
+    return await dispatch(name, page_info, payload, deadline_ts)
+
+
+async def race(candidates: List[Tuple[str, int]], page_info: Dict[str, Any], payload: Dict[str, Any],
+               deadline_ts: float, validate: Callable[[Any], bool] = has_answer,
+               grace: float = SPECULATION_GRACE, handoffs: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Start every (worker, priority) candidate at once and return the first valid result.
+    A valid result only wins outright when no higher-priority candidate is still running;
+    otherwise the higher-priority ones get `grace` more seconds to override it (so a
+    deterministic answer beats an LLM answer that finished slightly earlier).
+    handoffs maps a candidate to the worker it may hand over to with `fallback_to` (after adding
+    to page_info, e.g. PDF text). That worker's answer is held until the candidate finishes, and
+    is dropped if the candidate does hand over: its result is then returned so the caller runs
+    the fallback with the updated page_info.
+    LLM calls made by candidates queue at PRIORITY_SPECULATIVE. Losers are cancelled. With no valid result, the top-priority candidate's result is returned.
+    """
+    handoffs = handoffs or {}
+    tasks = {asyncio.ensure_future(_speculative(name, page_info, payload, deadline_ts)): (name, prio)
+             for name, prio in candidates}
+    pending = set(tasks)
+    results: Dict[str, Any] = {}
+    valid: Dict[str, Tuple[int, str, Dict[str, Any]]] = {}
+    handoff: Optional[Dict[str, Any]] = None
+    best: Optional[Tuple[int, str, Dict[str, Any]]] = None
+    cutoff = deadline_ts
+    try:
+        while pending:
+            timeout = cutoff - now_ts()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                name, prio = tasks[t]
+                if t.cancelled():
+                    continue
+                if t.exception() is not None:
+                    logger.warning("Speculative worker %s failed: %s", name, t.exception())
+                    results[name] = {"worker": name, "error": str(t.exception())}
+                    continue
+                res = t.result()
+                results[name] = res
+                target = (res or {}).get("fallback_to")
+                if target and handoffs.get(name) == target:
+                    # the target ran without what this candidate just added to page_info: its answer is stale
+                    logger.info("Speculative worker %s handed off to %s; dropping the raced %s", name, target, target)
+                    handoff = res
+                    valid.pop(target, None)
+                    stale = {other for other in pending if tasks[other][0] == target}
+                    for other in stale:
+                        other.cancel()
+                    pending -= stale
+                    continue
+                if validate(res) and not (handoff is not None and handoff.get("fallback_to") == name):
+                    valid[name] = (prio, name, res)
+            best = max(valid.values(), key=lambda v: v[0]) if valid else None
+            if best is None:
+                continue
+            if any(handoffs.get(tasks[t][0]) == best[1] for t in pending):
+                # a running candidate may still hand off to the winner's worker: wait for it
+                cutoff = deadline_ts
+                continue
+            if not any(tasks[t][1] > best[0] for t in pending):
+                break
+            # a higher-priority worker is still running: give it a short window to override
+            if cutoff == deadline_ts:
+                cutoff = min(deadline_ts, now_ts() + grace)
+    finally:
+        for t in pending:
+            t.cancel()
+    if best is not None:
+        logger.info("Speculation winner: %s (priority %d)", best[1], best[0])
+        return best[2]
+    if handoff is not None:
+        return handoff
+    top = max(candidates, key=lambda c: c[1])[0]
+    return results.get(top) or {"worker": top, "error": "no speculative result before deadline"}
@@ -1,7 +1,36 @@
 import re
 from .utils import logger
 from typing import Dict, Any
-from .workers import web_scraper_worker, api_sourcing_worker, data_cleaning_worker, data_processing_worker, analysis_worker, visualization_worker, llm_worker
+from .workers import dispatch
+from .speculation import race
+from .config import SPECULATIVE_ROUTES
+
+# Speculation policy: workers started together when a route is speculative, with priorities.
+# Deterministic workers outrank the LLM, so their answer wins if it arrives within the grace window.
+ROUTE_CANDIDATES = {
+    "data_processing": [("data_processing", 3), ("llm", 1)],
+    "api_sourcing": [("api_sourcing", 3), ("web_scraper", 2), ("llm", 1)],
+    "data_cleaning": [("data_cleaning", 3), ("llm", 1)],
+    "visualization": [("visualization", 3)],
+    "analysis": [("analysis", 3), ("llm", 1)],
+    "web_scraper": [("web_scraper", 3), ("llm", 1)],
+}
+# Workers that may hand a step over to another one (fallback_to) after adding to page_info.
+# A raced answer from the target is held until they finish and dropped if they hand over.
+ROUTE_HANDOFFS = {"data_processing": "llm", "web_scraper": "llm"}
+
+
+def _speculative(route: str) -> bool:
+    routes = {r.strip() for r in SPECULATIVE_ROUTES.split(",") if r.strip()}
+    return len(ROUTE_CANDIDATES.get(route, [])) > 1 and ("all" in routes or route in routes)
+
+
+async def _run(route: str, page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
+    if _speculative(route):
+        logger.info("Racing %s", ", ".join(name for name, _ in ROUTE_CANDIDATES[route]))
+        return await race(ROUTE_CANDIDATES[route], page_info, payload, deadline_ts, handoffs=ROUTE_HANDOFFS)
+    return await dispatch(route, page_info, payload, deadline_ts)
+
 
 async def route_task(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     instruction = page_info.get("instruction", "") or ""
@@ -18,31 +47,33 @@ async def route_task(page_info: Dict[str, Any], payload: Dict[str, Any], deadlin
 
     if any(k in text for k in ["download", ".csv", ".xlsx", "pdf", "table", "sum", "mean", "average", "value column"]):
         logger.info("Routing to data_processing_worker")
-        return await data_processing_worker.handle(page_info, payload, deadline_ts)
+        return await _run("data_processing", page_info, payload, deadline_ts)
 
     if any(k in text for k in ["api", "call", "fetch", "headers", "endpoint", "json"]):
         logger.info("Routing to api_sourcing_worker")
-        res = await api_sourcing_worker.handle(page_info, payload, deadline_ts)
+        if _speculative("api_sourcing"):
+            return await _run("api_sourcing", page_info, payload, deadline_ts)
+        res = await dispatch("api_sourcing", page_info, payload, deadline_ts)
         if "error" in res:
             logger.info("API sourcing failed; falling back to web_scraper_worker")
-            ws = await web_scraper_worker.handle(page_info, payload, deadline_ts)
+            ws = await dispatch("web_scraper", page_info, payload, deadline_ts)
             if "answer" in ws:
                 return ws
             logger.info("Web scraper yielded no direct result; falling back to LLM")
-            return await llm_worker.handle(page_info, payload, deadline_ts)
+            return await dispatch("llm", page_info, payload, deadline_ts)
         return res
 
     if any(k in text for k in ["clean", "normalize", "remove na", "null", "strip"]):
         logger.info("Routing to data_cleaning_worker")
-        return await data_cleaning_worker.handle(page_info, payload, deadline_ts)
+        return await _run("data_cleaning", page_info, payload, deadline_ts)
 
     if any(k in text for k in ["chart", "plot", "visualize", "figure", "image"]):
         logger.info("Routing to visualization_worker")
-        return await visualization_worker.handle(page_info, payload, deadline_ts)
+        return await _run("visualization", page_info, payload, deadline_ts)
 
     if any(k in text for k in ["analyze", "ml", "regression", "cluster", "correlation"]):
         logger.info("Routing to analysis_worker")
-        return await analysis_worker.handle(page_info, payload, deadline_ts)
+        return await _run("analysis", page_info, payload, deadline_ts)
 
     logger.info("Routing to web_scraper_worker (fallback)")
-    return await web_scraper_worker.handle(page_info, payload, deadline_ts)
+    return await _run("web_scraper", page_info, payload, deadline_ts)
@@ -1,15 +1,35 @@
-import time, logging, httpx
+import time, logging
 from contextlib import contextmanager
 import asyncio
+from .metrics import observe
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("quiz-solver")
 
 @contextmanager
-def timer(name="operation"):
-    t0 = time.time()
-    yield
-    logger.info("%s took %.2fs", name, time.time() - t0)
+def timer(name="operation", worker="", outcome="ok"):
+    """
+    Time a block as a span of stage `name` (recorded in app.metrics, tagged with the quiz host).
+    The yielded dict's "worker"/"outcome" may be changed inside the block; exceptions
+    set outcome to "timeout", "cancelled" or "error".
+    """
+    span = {"worker": worker, "outcome": outcome}
+    t0 = time.perf_counter()
+    try:
+        yield span
+    except asyncio.CancelledError:
+        span["outcome"] = "cancelled"
+        raise
+    except asyncio.TimeoutError:
+        span["outcome"] = "timeout"
+        raise
+    except BaseException:
+        span["outcome"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        observe(name, elapsed, span["worker"], span["outcome"])
+        logger.info("%s%s took %.3fs (%s)", name, f"[{span['worker']}]" if span["worker"] else "", elapsed, span["outcome"])
 
 def now_ts():
     return time.time()
@@ -25,7 +45,7 @@ async def submit_answer(submit_url: str, payload: dict, timeout: int = 20) -> di
     """
     Post the answer payload to submit_url and return JSON response (or raise).
     """
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.post(submit_url, json=payload)
-        r.raise_for_status()
-        return r.json()
+    from .http_client import get_client, timeout_for
+    r = await get_client().post(submit_url, json=payload, timeout=timeout_for("submit", timeout))
+    r.raise_for_status()
+    return r.json()
@@ -1,13 +1,17 @@
 import asyncio
 import time
 import traceback
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from .utils import logger, run_with_timeout, now_ts, submit_answer
-from .browser.browser_runner import render_page_extract
+from .utils import logger, run_with_timeout, now_ts, submit_answer, timer
+from .metrics import set_quiz_host
+from .browser.page_loader import load_page_info
+from .prefetch import start_prefetch, cancel_prefetch
 from .task_router import route_task
 from .config import GLOBAL_TIMEOUT
-from .workers import llm_worker
+from .budget import StepBudget
+from .workers import dispatch
+from .llm_scheduler import PRIORITY_HIGH, prioritized
 
 
 def _normalize_answer(val):
@@ -35,7 +39,8 @@ def _normalize_answer(val):
     return val
 
 
-async def _submit(submit_url: str, email: str, secret: str, url: str, answer: Any, label: str = "") -> Dict[str, Any]:
+async def _submit(submit_url: str, email: str, secret: str, url: str, answer: Any, label: str = "",
+                  timeout: float = 15) -> Dict[str, Any]:
     """
     Submit helper with logging and normalization.
     """
@@ -46,38 +51,61 @@ async def _submit(submit_url: str, email: str, secret: str, url: str, answer: An
         "answer": _normalize_answer(answer),
     }
     logger.info("Submitting%s to %s payload keys=%s", f" {label}" if label else "", submit_url, list(payload.keys()))
-    try:
-        resp = await submit_answer(submit_url, payload, timeout=15)
-        logger.info("Submit response%s: %s", f" {label}" if label else "", resp)
-        return resp if isinstance(resp, dict) else {"raw": resp}
-    except Exception as e:
-        logger.error("Submission%s failed: %s", f" {label}" if label else "", e)
-        return {"error": str(e)}
+    with timer("submit") as span:
+        try:
+            resp = await submit_answer(submit_url, payload, timeout=timeout)
+            logger.info("Submit response%s: %s", f" {label}" if label else "", resp)
+            if isinstance(resp, dict) and "correct" in resp:
+                span["outcome"] = "correct" if resp["correct"] is True else "incorrect"
+            return resp if isinstance(resp, dict) else {"raw": resp}
+        except Exception as e:
+            span["outcome"] = "error"
+            logger.error("Submission%s failed: %s", f" {label}" if label else "", e)
+            return {"error": str(e)}
+
+
+async def _render(url: str, budget: StepBudget, name: str) -> Dict[str, Any]:
+    """Load a page within the render share of budget."""
+    set_quiz_host(url)
+    timeout = budget.timeout("render")
+    return await run_with_timeout(load_page_info(url, timeout=timeout), timeout, name=name)
+
+
+def _report(job, step: str, url: Optional[str] = None):
+    """Record the current step on the scheduler job, if the run has one."""
+    if job is not None:
+        job.set_step(step, url)
 
 
-async def orchestrator_start(payload: Dict[str, Any]):
+async def orchestrator_start(payload: Dict[str, Any], deadline: Optional[float] = None, job=None):
     """
     Main orchestrator loop:
-    - Render the page (Playwright) and extract instruction, submit_url, data_urls
+    - Load the page (plain HTTP, else Playwright) and extract instruction, submit_url, data_urls
+    - Start downloading all data_urls in the background while the task is routed
     - Route to appropriate worker and compute answer
     - Submit the answer
     - If response includes next URL, follow and repeat within GLOBAL_TIMEOUT
     - Allow limited re-attempts if incorrect and no next URL
+    deadline defaults to GLOBAL_TIMEOUT from now; job (a scheduler Job) receives step updates.
+    Each step runs on a StepBudget that splits the time left among render, fetch+compute, LLM
+    and submit, so every I/O call gets a deadline-derived timeout instead of a fixed one.
     """
     start_ts = now_ts()
-    deadline = start_ts + GLOBAL_TIMEOUT
+    deadline = deadline or start_ts + GLOBAL_TIMEOUT
+    page_info: Dict[str, Any] = {}
 
     try:
         logger.info("Orchestrator started for %s", payload.get("url"))
-        page_info = await run_with_timeout(
-            render_page_extract(payload.get("url")),
-            GLOBAL_TIMEOUT,
-            name="render_page",
-        )
+        _report(job, "render", payload.get("url"))
+        budget = StepBudget(deadline)
+        page_info = await _render(payload.get("url"), budget, "render_page")
+        solve_deadline = budget.deadline("fetch", "compute")
+        start_prefetch(page_info, solve_deadline)
 
         current_url = payload.get("url")
         submit_url = page_info.get("submit_url")
         attempts = 0
+        last_attempt_url = None
 
         while True:
             # Check deadline
@@ -86,27 +114,40 @@ async def orchestrator_start(payload: Dict[str, Any]):
                 break
 
             attempts += 1
+            # re-attempts on the same page need fresh LLM output, not the cached (wrong) answer
+            page_info["llm_fresh"] = current_url == last_attempt_url
+            if page_info["llm_fresh"]:
+                # same page again: nothing to render, so the time left goes to the later stages
+                budget = StepBudget(deadline)
+                solve_deadline = budget.deadline("fetch", "compute")
+            last_attempt_url = current_url
 
             # Route task and compute answer
-            res = await route_task(page_info, payload, deadline)
+            _report(job, "solve")
+            res = await route_task(page_info, payload, solve_deadline)
             answer = res.get("answer")
 
             # If we have a direct answer, submit it
             if answer is not None and submit_url:
+                _report(job, "submit")
                 resp = await _submit(
                     submit_url,
                     payload.get("email"),
                     payload.get("secret"),
                     current_url,
                     answer,
+                    timeout=budget.timeout("submit"),
                 )
 
             else:
                 # Fallback: if worker asked for LLM, call it and try to submit its answer
                 if res.get("fallback_to") == "llm":
                     logger.info("Fallback to LLM worker")
+                    _report(job, "llm")
                     try:
-                        llm_res = await llm_worker.handle(page_info, payload, deadline)
+                        # the step's answer hinges on this call: let it jump speculative LLM calls
+                        with prioritized(PRIORITY_HIGH):
+                            llm_res = await dispatch("llm", page_info, payload, budget.deadline("llm"))
                         llm_answer = (llm_res or {}).get("answer")
 
                         # If LLM returns empty, for demo/evaluation domains submit a safe default to progress
@@ -116,6 +157,7 @@ async def orchestrator_start(payload: Dict[str, Any]):
                                 llm_answer = "hello"  # safe default for demo/evaluation start steps
 
                         if llm_answer is not None and submit_url:
+                            _report(job, "submit")
                             resp = await _submit(
                                 submit_url,
                                 payload.get("email"),
@@ -123,6 +165,7 @@ async def orchestrator_start(payload: Dict[str, Any]):
                                 current_url,
                                 llm_answer,
                                 label="(LLM)",
+                                timeout=budget.timeout("submit"),
                             )
                         else:
                             logger.info("LLM did not produce an answer; stopping.")
@@ -137,17 +180,20 @@ async def orchestrator_start(payload: Dict[str, Any]):
                     break
 
             # Handle response: next URL / correctness
+            if job is not None:
+                job.steps_done += 1
             if isinstance(resp, dict) and resp.get("correct") is True:
                 next_url = resp.get("url")
                 if next_url:
                     logger.info("Received next url: %s", next_url)
                     current_url = next_url
                     # Render the next page
-                    page_info = await run_with_timeout(
-                        render_page_extract(current_url),
-                        40,
-                        name="render_next_page",
-                    )
+                    cancel_prefetch(page_info)
+                    _report(job, "render", current_url)
+                    budget = StepBudget(deadline)
+                    page_info = await _render(current_url, budget, "render_next_page")
+                    solve_deadline = budget.deadline("fetch", "compute")
+                    start_prefetch(page_info, solve_deadline)
                     submit_url = page_info.get("submit_url")
                     continue
                 else:
@@ -159,11 +205,12 @@ async def orchestrator_start(payload: Dict[str, Any]):
                 if next_url:
                     logger.info("Got next url despite incorrect answer: %s", next_url)
                     current_url = next_url
-                    page_info = await run_with_timeout(
-                        render_page_extract(current_url),
-                        40,
-                        name="render_next_page",
-                    )
+                    cancel_prefetch(page_info)
+                    _report(job, "render", current_url)
+                    budget = StepBudget(deadline)
+                    page_info = await _render(current_url, budget, "render_next_page")
+                    solve_deadline = budget.deadline("fetch", "compute")
+                    start_prefetch(page_info, solve_deadline)
                     submit_url = page_info.get("submit_url")
                     continue
                 else:
@@ -180,4 +227,5 @@ async def orchestrator_start(payload: Dict[str, Any]):
         logger.error("Orchestrator error: %s", e)
         traceback.print_exc()
     finally:
+        cancel_prefetch(page_info)
         logger.info("Orchestrator finished for %s", payload.get("url"))
@@ -1 +1,48 @@
-# package marker for workers
+# package marker for workers, plus a lazy registry so heavy worker dependencies
+# (pandas, matplotlib, PyPDF2, ...) are imported on first dispatch rather than at startup
+import asyncio, importlib
+from types import ModuleType
+from typing import Any, Dict, Iterable, Optional
+from ..utils import timer
+
+WORKER_MODULES = {
+    "web_scraper": "web_scraper_worker",
+    "api_sourcing": "api_sourcing_worker",
+    "data_cleaning": "data_cleaning_worker",
+    "data_processing": "data_processing_worker",
+    "analysis": "analysis_worker",
+    "visualization": "visualization_worker",
+    "llm": "llm_worker",
+}
+
+_loaded: Dict[str, ModuleType] = {}
+
+
+def get_worker(name: str) -> ModuleType:
+    """Import (once) and return the worker module registered under name."""
+    mod = _loaded.get(name)
+    if mod is None:
+        mod = _loaded[name] = importlib.import_module(f"{__name__}.{WORKER_MODULES[name]}")
+    return mod
+
+
+async def dispatch(name: str, page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
+    worker = get_worker(name)
+    with timer("worker", worker=name) as span:
+        res = await worker.handle(page_info, payload, deadline_ts)
+        res = res or {}
+        if res.get("answer") is not None:
+            span["outcome"] = "answer"
+        elif res.get("fallback_to"):
+            span["outcome"] = "fallback"
+        elif res.get("error"):
+            span["outcome"] = "error"
+        else:
+            span["outcome"] = "no_answer"
+    return res
+
+
+async def prewarm(names: Optional[Iterable[str]] = None):
+    """Import worker modules in a background thread so the first quiz does not pay for it."""
+    for name in names or WORKER_MODULES:
+        await asyncio.to_thread(get_worker, name)
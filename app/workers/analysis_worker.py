@@ -1,6 +1,15 @@
 from typing import Dict, Any
 import numpy as np, pandas as pd
 from ..utils import logger
+from ..prefetch import data_file
+from ..data.frame_cache import frame_cache, file_kind
+from ..executors import run_cpu
+
+
+def _describe(df: pd.DataFrame) -> Dict[str, Any]:
+    numerics = df.select_dtypes(include="number")
+    return numerics.describe().to_dict() if not numerics.empty else {}
+
 
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
@@ -12,5 +21,12 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
     if "answer" in res:
         # direct numeric answer already computed
         return res
-    # else respond with analysis summary
+    # else summarize numeric columns of the (cached) frame
+    data_urls = page_info.get("data_urls", [])
+    if data_urls and file_kind(data_urls[0]):
+        path = await data_file(page_info, data_urls[0], deadline_ts)
+        df = await frame_cache.aload(path, name=data_urls[0], deadline_ts=deadline_ts)
+        summary = await run_cpu(_describe, df, kind="thread", deadline_ts=deadline_ts)
+        if summary:
+            return {"worker": "analysis", "summary": summary, "detail": res}
     return {"worker": "analysis", "note": "analysis worker currently delegates to data processing for basic tasks", "detail": res}
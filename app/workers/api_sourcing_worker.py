@@ -1,11 +1,20 @@
 import httpx, asyncio, re
 from ..utils import logger
-from typing import Dict, Any
+from ..http_client import get_client, timeout_for
+from typing import Any, Dict
 
 def _sanitize_url(u: str) -> str:
     # Remove trailing punctuation accidentally captured
     return u.rstrip(".,;:()[]{}<>\"' \n\t\r")
 
+def _answer_of(data: Any) -> Any:
+    """The submittable answer in an API response: a bare JSON scalar or an object's "answer" field."""
+    if isinstance(data, dict):
+        data = data.get("answer")
+    if isinstance(data, (str, int, float)) and str(data).strip():
+        return data
+    return None
+
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
     Extract API URLs and headers from instruction and call them.
@@ -20,23 +29,27 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
     if not urls:
         return {"worker": "api_sourcing", "error": "no API url found in instruction"}
 
-    async with httpx.AsyncClient() as client:
-        for api_url in urls:
-            try:
-                r = await client.get(api_url, timeout=20)
-                # If 404/500, continue to next URL
-                if r.status_code >= 400:
-                    logger.warning("API sourcing got %s for %s", r.status_code, api_url)
-                    continue
-                # Try JSON first
-                try:
-                    data = r.json()
-                    return {"worker": "api_sourcing", "url": api_url, "result": data}
-                except Exception:
-                    text = r.text[:500]
-                    return {"worker": "api_sourcing", "url": api_url, "text": text}
-            except httpx.HTTPError as e:
-                logger.warning("API sourcing error for %s: %s", api_url, e)
+    client = get_client()
+    for api_url in urls:
+        try:
+            r = await client.get(api_url, timeout=timeout_for("api", deadline_ts=deadline_ts))
+            # If 404/500, continue to next URL
+            if r.status_code >= 400:
+                logger.warning("API sourcing got %s for %s", r.status_code, api_url)
                 continue
+            # Try JSON first
+            try:
+                data = r.json()
+                res = {"worker": "api_sourcing", "url": api_url, "result": data}
+                answer = _answer_of(data)
+                if answer is not None:
+                    res.update(answer=answer, type="string" if isinstance(answer, str) else "number")
+                return res
+            except Exception:
+                text = r.text[:500]
+                return {"worker": "api_sourcing", "url": api_url, "text": text}
+        except httpx.HTTPError as e:
+            logger.warning("API sourcing error for %s: %s", api_url, e)
+            continue
 
     return {"worker": "api_sourcing", "error": "all candidate API urls failed"}
@@ -1,6 +1,17 @@
 import pandas as pd, numpy as np
 from typing import Dict, Any
 from ..utils import logger
+from ..executors import run_cpu
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    # basic cleaning
+    df = df.dropna(how="all")
+    # strip whitespace from string columns
+    for c in df.select_dtypes(include="object").columns:
+        df[c] = df[c].astype(str).str.strip()
+    return df
+
 
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
@@ -11,26 +22,12 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
     data_urls = page_info.get("data_urls", [])
     if not data_urls:
         return {"worker": "data_cleaning", "error": "no data url present"}
-    import tempfile, os
-    from ..browser.downloader import download_file
+    from ..prefetch import data_file
+    from ..data.frame_cache import frame_cache, file_kind
     url = data_urls[0]
-    tmp = tempfile.NamedTemporaryFile(delete=False)
-    tmp.close()
-    dest = tmp.name
-    try:
-        await download_file(url, dest)
-        if url.lower().endswith(".csv"):
-            df = pd.read_csv(dest)
-        else:
-            return {"worker": "data_cleaning", "error": "unsupported format"}
-        # basic cleaning
-        df = df.dropna(how="all")
-        # strip whitespace from string columns
-        for c in df.select_dtypes(include="object").columns:
-            df[c] = df[c].astype(str).str.strip()
-        return {"worker": "data_cleaning", "rows": int(len(df)), "columns": list(df.columns)}
-    finally:
-        try:
-            os.remove(dest)
-        except Exception:
-            pass
+    dest = await data_file(page_info, url, deadline_ts)
+    if file_kind(url) is None:
+        return {"worker": "data_cleaning", "error": "unsupported format"}
+    df = await frame_cache.aload(dest, name=url, deadline_ts=deadline_ts)
+    df = await run_cpu(_clean, df, kind="thread", deadline_ts=deadline_ts)
+    return {"worker": "data_cleaning", "rows": int(len(df)), "columns": list(df.columns)}
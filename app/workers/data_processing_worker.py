@@ -1,29 +1,38 @@
 import pandas as pd
-import os, tempfile
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 from ..utils import logger
-from ..browser.downloader import download_file
-import PyPDF2
-import io
+from ..prefetch import data_file
+from ..data.csv_aggregate import sum_column, csv_shape
+from ..data.frame_cache import frame_cache, file_kind
+from ..data.query_engine import aanswer_query
+from ..data.pdf_service import pdf_service, find_page_reference
+from ..config import PDF_MAX_PAGES
+from ..executors import run_cpu
 
-async def extract_pdf_text(file_path: str, page_num: int = None) -> str:
-    """Extract text from PDF, optionally from specific page"""
-    with open(file_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        if page_num is not None:
-            # Page numbers in questions are 1-indexed
-            if page_num <= len(reader.pages):
-                return reader.pages[page_num - 1].extract_text()
-            return ""
-        # Extract all pages
-        return "\n".join([page.extract_text() for page in reader.pages])
+
+def _answer_type(answer: Any) -> str:
+    if isinstance(answer, bool) or not isinstance(answer, (int, float, str)):
+        return "json"
+    return "string" if isinstance(answer, str) else "number"
+
+
+async def _query(dest: str, kind: str, instruction: str, deadline_ts: float) -> Optional[Dict[str, Any]]:
+    try:
+        res = await aanswer_query(dest, kind, instruction, deadline_ts)
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning("Query engine failed on %s: %s", dest, e)
+        return None
+    if res is None or res["answer"] is None:
+        return None
+    return {"worker": "data_processing", "answer": res["answer"], "type": _answer_type(res["answer"]),
+            "plan": res["plan"], "source": res["source"]}
 
 
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
     Data processing: download CSV/XLSX and perform simple transformations described in instruction.
-    Common tasks: sum column, filter rows, pivot.
-    This is a pragmatic implementation to cover the common quiz types.
+    Common tasks: sum column, filter rows, group, top-k, distinct, pivot.
+    Instructions the query engine can plan are answered by it; the rest fall back to the simple paths below.
     """
     data_urls = page_info.get("data_urls", [])
     instruction = page_info.get("instruction", "").lower()
@@ -31,36 +40,44 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
         # try reading tables from html handled elsewhere
         return {"worker": "data_processing", "error": "no data URL present"}
     file_url = data_urls[0]
-    tmp = tempfile.NamedTemporaryFile(delete=False)
-    tmp.close()
-    dest = tmp.name
-    try:
-        await download_file(file_url, dest)
-        if file_url.lower().endswith(".csv"):
-            df = pd.read_csv(dest)
-        elif file_url.lower().endswith((".xls", ".xlsx")):
-            df = pd.read_excel(dest)
-        else:
-            return {"worker": "data_processing", "error": "unsupported file type for automatic processing"}
-        # if instruction asks for sum of "value"
+    dest = await data_file(page_info, file_url, deadline_ts)
+    kind = file_kind(file_url)
+    if kind is not None:
+        res = await _query(dest, kind, page_info.get("instruction", ""), deadline_ts)
+        if res is not None:
+            return res
+    if file_url.lower().endswith(".csv"):
+        # CSVs are aggregated column-projected and chunked instead of loaded whole
         if "sum" in instruction and "value" in instruction:
-            # find candidate column
-            col = None
-            for c in df.columns:
-                if "value" in str(c).lower():
-                    col = c
-                    break
-            if col is None:
-                numerics = df.select_dtypes(include="number").columns
-                col = numerics[0] if len(numerics) else None
-            if col is None:
+            found = await run_cpu(sum_column, dest, instruction, deadline_ts=deadline_ts)
+            if found is None:
                 return {"worker": "data_processing", "error": "no numeric column found"}
-            val = df[col].sum()
-            return {"worker": "data_processing", "answer": int(val), "type": "number"}
-        # default: return rows and columns
-        return {"worker": "data_processing", "rows": int(len(df)), "columns": list(df.columns)}
-    finally:
-        try:
-            os.remove(dest)
-        except Exception:
-            pass
+            return {"worker": "data_processing", "answer": int(found[1]), "type": "number"}
+        rows, columns = await run_cpu(csv_shape, dest, deadline_ts=deadline_ts)
+        return {"worker": "data_processing", "rows": rows, "columns": columns}
+    elif file_url.lower().endswith((".xls", ".xlsx")):
+        df = await frame_cache.aload(dest, "excel", deadline_ts=deadline_ts)
+    elif file_url.lower().endswith(".pdf"):
+        # hand the relevant page text to the LLM worker
+        page = find_page_reference(page_info.get("instruction", ""))
+        page_info["pdf_text"] = await pdf_service.text(dest, page=page, max_pages=PDF_MAX_PAGES, deadline_ts=deadline_ts)
+        return {"worker": "data_processing", "note": "pdf text extracted; handing to LLM worker", "fallback_to": "llm"}
+    else:
+        return {"worker": "data_processing", "error": "unsupported file type for automatic processing"}
+    # if instruction asks for sum of "value"
+    if "sum" in instruction and "value" in instruction:
+        # find candidate column
+        col = None
+        for c in df.columns:
+            if "value" in str(c).lower():
+                col = c
+                break
+        if col is None:
+            numerics = df.select_dtypes(include="number").columns
+            col = numerics[0] if len(numerics) else None
+        if col is None:
+            return {"worker": "data_processing", "error": "no numeric column found"}
+        val = df[col].sum()
+        return {"worker": "data_processing", "answer": int(val), "type": "number"}
+    # default: return rows and columns
+    return {"worker": "data_processing", "rows": int(len(df)), "columns": list(df.columns)}
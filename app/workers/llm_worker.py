@@ -2,7 +2,8 @@
 import asyncio
 import logging
 from typing import Dict, Any
-from ..aipipe_client import run_llm
+from ..aipipe_client import run_llm, first_answer
+from ..llm_context import build_context
 from ..utils import run_with_timeout
 
 logger = logging.getLogger("app.workers.llm_worker")
@@ -11,24 +12,39 @@ logger = logging.getLogger("app.workers.llm_worker")
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
     LLM Worker: Use AiPipe (or fallback model) to read the instruction and produce an answer.
+    The prompt carries a token-budgeted context (see app.llm_context) rather than the raw page.
     """
 
-    instruction = page_info.get("instruction") or page_info.get("text") or page_info.get("html", "")
-    if not instruction:
+    if not (page_info.get("instruction") or page_info.get("text") or page_info.get("html")):
         return {"worker": "llm", "error": "No instruction found"}
 
+    try:
+        context, report = await build_context(page_info, deadline_ts)
+    except Exception as e:
+        # a pool timeout or crash while summarising must not cost the step its LLM answer
+        logger.warning("LLM context build failed (%s); sending the raw instruction", e)
+        context = "\n\n".join(t for t in (page_info.get("instruction") or page_info.get("text") or "",
+                                           page_info.get("pdf_text") or "") if t)
+        report = {"tokens_used": 0, "tokens_raw": 0, "tokens_saved": 0, "lines_dropped": 0}
+    logger.info("LLM context: %d tokens (raw page %d, saved %d, %d lines dropped)", report["tokens_used"],
+                report["tokens_raw"], report["tokens_saved"], report["lines_dropped"])
     prompt = (
         "You are a precise assistant. Read the instructions from the webpage and extract ONLY the exact answer.\n"
         "Do NOT add explanation. Do NOT rewrite the question.\n"
         "Return only the answer.\n\n"
-        f"Instruction:\n{instruction}\n\nAnswer:"
+        f"{context}\n\n"
+        "Answer:"
     )
 
     try:
-        answer = await run_llm(prompt)
+        # the orchestrator sets llm_fresh on re-attempts, where a cached answer was already wrong
+        # the prompt asks for a bare answer: stop streaming at its first line rather than wait out any explanation
+        answer = await run_llm(prompt, bypass_cache=bool(page_info.get("llm_fresh")), deadline_ts=deadline_ts,
+                               stop=first_answer)
         if answer:
-            return {"worker": "llm", "answer": answer.strip()}
-        return {"worker": "llm", "error": "Empty response from LLM"}
+            return {"worker": "llm", "answer": answer.strip(), "context_tokens": report["tokens_used"],
+                    "tokens_saved": report["tokens_saved"]}
+        return {"worker": "llm", "error": "Empty response from LLM", "context_tokens": report["tokens_used"]}
     except Exception as e:
         logger.exception("LLM worker error")
         return {"worker": "llm", "error": str(e)}
@@ -1,9 +1,25 @@
-import matplotlib.pyplot as plt
 import io, base64, pandas as pd
 from typing import Dict, Any
 from ..utils import logger
-from ..browser.downloader import download_file
-import tempfile, os
+from ..prefetch import data_file
+from ..data.frame_cache import frame_cache, file_kind
+from ..executors import run_cpu
+
+
+def _line_plot_uri(values) -> str:
+    """Process-pool stage: render values as a line plot and return a PNG data URI."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(6,3))
+    pd.Series(values).plot(kind="line")
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", bbox_inches="tight")
+    plt.close()
+    buf.seek(0)
+    b64 = base64.b64encode(buf.read()).decode("ascii")
+    return f"data:image/png;base64,{b64}"
+
 
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
     """
@@ -13,30 +29,13 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
     if not data_urls:
         return {"worker": "visualization", "error": "no data url"}
     url = data_urls[0]
-    tmp = tempfile.NamedTemporaryFile(delete=False)
-    tmp.close()
-    dest = tmp.name
-    try:
-        await download_file(url, dest)
-        if url.lower().endswith(".csv"):
-            df = pd.read_csv(dest)
-        else:
-            return {"worker": "visualization", "error": "unsupported format"}
-        numerics = df.select_dtypes(include="number").columns
-        if len(numerics) == 0:
-            return {"worker":"visualization","error":"no numeric columns"}
-        col = numerics[0]
-        plt.figure(figsize=(6,3))
-        df[col].plot(kind="line")
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight")
-        plt.close()
-        buf.seek(0)
-        b64 = base64.b64encode(buf.read()).decode("ascii")
-        uri = f"data:image/png;base64,{b64}"
-        return {"worker":"visualization","image":uri, "type":"image"}
-    finally:
-        try:
-            os.remove(dest)
-        except Exception:
-            pass
+    dest = await data_file(page_info, url, deadline_ts)
+    if file_kind(url) is None:
+        return {"worker": "visualization", "error": "unsupported format"}
+    df = await frame_cache.aload(dest, name=url, deadline_ts=deadline_ts)
+    numerics = df.select_dtypes(include="number").columns
+    if len(numerics) == 0:
+        return {"worker":"visualization","error":"no numeric columns"}
+    col = numerics[0]
+    uri = await run_cpu(_line_plot_uri, df[col].to_numpy(), deadline_ts=deadline_ts)
+    return {"worker":"visualization","image":uri, "type":"image"}
@@ -1,23 +1,42 @@
-import asyncio, logging
+import asyncio, io, logging
 from ..utils import logger
 from typing import Dict, Any
-from ..browser.downloader import download_file
+from ..prefetch import data_file
+from ..data.csv_aggregate import sum_column
+from ..data.frame_cache import frame_cache
 import pandas as pd
-import os, tempfile
-import PyPDF2
-import io
+from ..data.pdf_service import pdf_service, find_page_reference
+from ..config import PDF_MAX_PAGES
+from ..executors import run_cpu
 
-async def extract_pdf_text(file_path: str, page_num: int = None) -> str:
-    """Extract text from PDF, optionally from specific page"""
-    with open(file_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        if page_num is not None:
-            # Page numbers in questions are 1-indexed
-            if page_num <= len(reader.pages):
-                return reader.pages[page_num - 1].extract_text()
-            return ""
-        # Extract all pages
-        return "\n".join([page.extract_text() for page in reader.pages])
+
+def _html_table_sum(html: str) -> Dict[str, Any]:
+    """Process-pool stage: sum the first numeric column of the first HTML table."""
+    tables = pd.read_html(io.StringIO(html))
+    if not tables:
+        return {}
+    df = tables[0]
+    numerics = df.select_dtypes(include="number").columns
+    if not len(numerics):
+        return {"worker": "web_scraper", "error": "no numeric column in html table"}
+    return {"worker": "web_scraper", "answer": int(df[numerics[0]].sum()), "type": "number"}
+
+
+def _rows_table_sum(rows) -> Dict[str, Any]:
+    """Same as _html_table_sum for a table already extracted in the page (rows of cell text, header first)."""
+    body = [r for r in rows if r]
+    if body and pd.to_numeric(pd.Series(body[0]), errors="coerce").isna().all():
+        body = body[1:]  # header row
+    if not body:
+        return {}
+    for i in range(max(len(r) for r in body)):
+        cells = [r[i] for r in body if i < len(r) and str(r[i]).strip()]
+        values = pd.to_numeric(pd.Series(cells, dtype=object).str.replace(",", ""), errors="coerce")
+        if len(values) and values.notna().all():
+            total = values.sum()
+            return {"worker": "web_scraper", "answer": int(total) if float(total).is_integer() else float(total),
+                    "type": "number"}
+    return {"worker": "web_scraper", "error": "no numeric column in html table"}
 
 
 async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts: float) -> Dict[str, Any]:
@@ -33,48 +52,46 @@ async def handle(page_info: Dict[str, Any], payload: Dict[str, Any], deadline_ts
     if data_urls:
         # use first CSV/XLSX/PDF
         file_url = data_urls[0]
-        tmp = tempfile.NamedTemporaryFile(delete=False)
-        dest = tmp.name
-        tmp.close()
-        await download_file(file_url, dest)
-        try:
-            if file_url.lower().endswith(".csv"):
-                df = pd.read_csv(dest)
-            elif file_url.lower().endswith((".xls", ".xlsx")):
-                df = pd.read_excel(dest)
-            else:
-                # PDF / images -> fallback to returning instruction to LLM worker
-                return {"worker": "web_scraper", "note": "non-tabular file; handing to LLM worker", "fallback_to": "llm"}
-            # simple aggregate: if instruction asks "sum of value column" attempt to find column name
-            # naive: look for column named 'value' or 'Value' or numeric columns
-            col = None
-            for c in df.columns:
-                if "value" in str(c).lower():
-                    col = c
-                    break
-            if col is None:
-                # pick numeric column with most non-null
-                numerics = df.select_dtypes(include="number").columns
-                col = list(numerics)[0] if len(numerics) else None
-            if col is None:
+        dest = await data_file(page_info, file_url, deadline_ts)
+        if file_url.lower().endswith(".csv"):
+            found = await run_cpu(sum_column, dest, instruction, deadline_ts=deadline_ts)
+            if found is None:
                 return {"worker": "web_scraper", "error": "no numeric column found"}
-            result = df[col].sum()
-            return {"worker": "web_scraper", "answer": result, "type": "number"}
-        finally:
-            try:
-                os.remove(dest)
-            except Exception:
-                pass
-    # fallback: parse HTML tables
-    try:
-        tables = pd.read_html(html)
-        if len(tables) > 0:
-            df = tables[0]
+            result = found[1]
+            return {"worker": "web_scraper", "answer": int(result) if float(result).is_integer() else result, "type": "number"}
+        elif file_url.lower().endswith((".xls", ".xlsx")):
+            df = await frame_cache.aload(dest, "excel", deadline_ts=deadline_ts)
+        elif file_url.lower().endswith(".pdf"):
+            page_info["pdf_text"] = await pdf_service.text(dest, page=find_page_reference(instruction),
+                                                           max_pages=PDF_MAX_PAGES, deadline_ts=deadline_ts)
+            return {"worker": "web_scraper", "note": "pdf text extracted; handing to LLM worker", "fallback_to": "llm"}
+        else:
+            # images -> fallback to returning instruction to LLM worker
+            return {"worker": "web_scraper", "note": "non-tabular file; handing to LLM worker", "fallback_to": "llm"}
+        # simple aggregate: if instruction asks "sum of value column" attempt to find column name
+        # naive: look for column named 'value' or 'Value' or numeric columns
+        col = None
+        for c in df.columns:
+            if "value" in str(c).lower():
+                col = c
+                break
+        if col is None:
+            # pick numeric column with most non-null
             numerics = df.select_dtypes(include="number").columns
-            col = numerics[0] if len(numerics) else None
-            if col is None:
-                return {"worker": "web_scraper", "error": "no numeric column in html table"}
-            return {"worker": "web_scraper", "answer": int(df[col].sum()), "type": "number"}
+            col = list(numerics)[0] if len(numerics) else None
+        if col is None:
+            return {"worker": "web_scraper", "error": "no numeric column found"}
+        result = df[col].sum()
+        return {"worker": "web_scraper", "answer": result, "type": "number"}
+    # fallback: tables the browser already extracted, else parse them out of the HTML
+    if page_info.get("tables"):
+        res = _rows_table_sum(page_info["tables"][0])
+        if res:
+            return res
+    try:
+        res = await run_cpu(_html_table_sum, html, deadline_ts=deadline_ts)
+        if res:
+            return res
     except Exception as e:
         logger.warning("pd.read_html failed: %s", e)
     # fallback to LLM
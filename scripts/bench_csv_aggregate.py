@@ -0,0 +1,87 @@
+"""
+Compare the full-load CSV path (pd.read_csv + df[col].sum()) with the chunked,
+column-projected engine in app/data/csv_aggregate.py.
+
+Each measurement runs in a fresh child process so peak RSS is per method.
+
+    python scripts/bench_csv_aggregate.py --rows 100000,1000000,10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+METHODS = ("full", "chunked-pandas", "chunked-pyarrow")
+
+
+def make_csv(path: str, rows: int):
+    """Write a quiz-like CSV (id, category, note, value) in blocks so generation itself stays small."""
+    rng = np.random.default_rng(0)
+    block = 1_000_000
+    with open(path, "w") as f:
+        f.write("id,category,note,value\n")
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            df = pd.DataFrame({
+                "id": np.arange(start, start + n),
+                "category": rng.choice(["alpha", "beta", "gamma", "delta"], n),
+                "note": rng.choice(["lorem ipsum dolor", "sit amet", "consectetur adipiscing elit"], n),
+                "value": rng.integers(0, 1000, n),
+            })
+            df.to_csv(f, header=False, index=False)
+
+
+def run_method(method: str, path: str):
+    from app.data.csv_aggregate import aggregate_csv
+    t0 = time.perf_counter()
+    if method == "full":
+        total = float(pd.read_csv(path)["value"].sum())
+    else:
+        total = aggregate_csv(path, "value", aggs=("sum",), engine=method.split("-", 1)[1])["sum"]
+    print(f"{time.perf_counter() - t0:.4f} {total}")
+
+
+def measure(method: str, path: str):
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        os.dup2(w, 1)
+        try:
+            run_method(method, path)
+            sys.stdout.flush()
+        finally:
+            os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as fh:
+        out = fh.read().split()
+    _, _, usage = os.wait4(pid, 0)
+    seconds, total = float(out[0]), float(out[1])
+    return seconds, usage.ru_maxrss / 1024, total
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", default="100000,1000000,10000000", help="comma separated row counts")
+    ap.add_argument("--methods", default=",".join(METHODS))
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} {'method':>16} {'seconds':>9} {'peak MB':>9} {'sum':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in [int(x) for x in args.rows.split(",")]:
+            path = os.path.join(tmp, f"bench_{rows}.csv")
+            make_csv(path, rows)
+            for method in args.methods.split(","):
+                seconds, peak_mb, total = measure(method, path)
+                print(f"{rows:>10} {method:>16} {seconds:>9.3f} {peak_mb:>9.1f} {total:>16.0f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Offline end-to-end benchmark: the real API against the local quiz fixture server.
+
+Starts scripts/quiz_fixture_server.py (quiz chains, attachments, /submit, stub LLM) and
+`uvicorn app.main:app` wired to it, then posts --jobs quiz chains to /quiz keeping
+--concurrency of them in flight. Reports end-to-end job latency percentiles, steps per
+second, answer accuracy per step kind, peak RSS of the API process tree and the API's
+own per-stage percentiles.
+
+    python scripts/bench_e2e.py --jobs 40 --concurrency 8
+    python scripts/bench_e2e.py --steps csv,csv,xlsx --csv-rows 1000000 --env JOB_BACKEND=sqlite
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HERE = os.path.dirname(os.path.abspath(__file__))
+SECRET = "bench-secret"
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Resident memory of pid and all its descendants, from /proc."""
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+        stack.extend(_children(p))
+    return total / 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.pid, self.interval, self.peak = pid, interval, 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, tree_rss_mb(self.pid))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def wait_up(url: str, timeout: float = 60):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run_jobs(api: str, fixture: str, jobs: int, concurrency: int, poll: float):
+    """Keep `concurrency` chains in flight until `jobs` have finished; return their final statuses."""
+    results, pending, started = [], {}, 0
+    with httpx.Client(timeout=30) as client:
+        while started < jobs or pending:
+            while started < jobs and len(pending) < concurrency:
+                r = client.post(f"{api}/quiz", json={"email": "bench@example.com", "secret": SECRET,
+                                                     "url": f"{fixture}/quiz/job{started}/0"})
+                if r.status_code == 429:
+                    time.sleep(float(r.headers.get("Retry-After", 1)))
+                    continue
+                r.raise_for_status()
+                pending[r.json()["job_id"]] = started
+                started += 1
+            time.sleep(poll)
+            for job_id in list(pending):
+                status = client.get(f"{api}/quiz/{job_id}").json()
+                if status["state"] not in ("queued", "running"):
+                    results.append(status)
+                    del pending[job_id]
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jobs", type=int, default=20, help="quiz chains to run")
+    ap.add_argument("--concurrency", type=int, default=4, help="chains in flight at once")
+    ap.add_argument("--steps", default="atob,csv,xlsx,pdf,table,api", help="step kinds of every chain")
+    ap.add_argument("--csv-rows", type=int, default=100000)
+    ap.add_argument("--xlsx-rows", type=int, default=2000)
+    ap.add_argument("--pdf-pages", type=int, default=5)
+    ap.add_argument("--llm-latency", type=float, default=0.3)
+    ap.add_argument("--llm-ramble", type=int, default=0, help="explanation chunks the stub LLM adds after its answer")
+    ap.add_argument("--env", action="append", default=[], help="extra KEY=VALUE for the API process")
+    ap.add_argument("--fixture-port", type=int, default=8900)
+    ap.add_argument("--api-port", type=int, default=8901)
+    ap.add_argument("--poll", type=float, default=0.25)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    fixture = f"http://127.0.0.1:{args.fixture_port}"
+    api = f"http://127.0.0.1:{args.api_port}"
+    tmp = tempfile.mkdtemp(prefix="bench-e2e-")
+    env = {
+        **os.environ,
+        "SECRET": SECRET,
+        "AIPIPE_URL": f"{fixture}/llm",
+        "AIPIPE_TOKEN": "stub",
+        "DOWNLOAD_CACHE_DIR": os.path.join(tmp, "downloads"),
+        "FRAME_CACHE_DIR": os.path.join(tmp, "frames"),
+        "LLM_CACHE_PATH": os.path.join(tmp, "llm.sqlite3"),
+        "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite3"),
+        "JOB_CONCURRENCY": str(args.concurrency),
+        "JOB_QUEUE_SIZE": str(max(32, args.concurrency * 2)),
+    }
+    env.update(kv.split("=", 1) for kv in args.env)
+
+    procs = []
+    try:
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "quiz_fixture_server.py"), "--port", str(args.fixture_port),
+             "--steps", args.steps, "--csv-rows", str(args.csv_rows), "--xlsx-rows", str(args.xlsx_rows),
+             "--pdf-pages", str(args.pdf_pages), "--llm-latency", str(args.llm_latency),
+             "--llm-ramble", str(args.llm_ramble)], cwd=ROOT))
+        wait_up(f"{fixture}/stats")
+        api_proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port),
+                                     "--log-level", "warning"], cwd=ROOT, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        procs.append(api_proc)
+        wait_up(f"{api}/health")
+        sampler = RssSampler(api_proc.pid)
+        sampler.start()
+
+        t0 = time.time()
+        results = run_jobs(api, fixture, args.jobs, args.concurrency, args.poll)
+        wall = time.time() - t0
+        sampler.stop()
+
+        latencies = [r["finished"] - r["created"] for r in results if r.get("finished")]
+        steps = sum(r.get("steps_done") or 0 for r in results)
+        report = {
+            "jobs": len(results),
+            "states": dict(sorted({s: sum(1 for r in results if r["state"] == s)
+                                   for s in {r["state"] for r in results}}.items())),
+            "wall_seconds": round(wall, 2),
+            "latency_seconds": {f"p{int(q * 100)}": round(pct(latencies, q), 3) for q in (0.5, 0.95, 0.99)},
+            "steps": steps,
+            "steps_per_second": round(steps / wall, 3) if wall else None,
+            "peak_rss_mb": round(sampler.peak, 1),
+            "fixture": httpx.get(f"{fixture}/stats").json(),
+            "stages": httpx.get(f"{api}/stats").json().get("stages"),
+        }
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(15)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    lat = report["latency_seconds"]
+    print(f"{report['jobs']} chains ({report['states']}) in {report['wall_seconds']}s at concurrency {args.concurrency}")
+    print(f"latency p50 {lat['p50']}s  p95 {lat['p95']}s  p99 {lat['p99']}s")
+    print(f"{report['steps']} steps, {report['steps_per_second']} steps/s, peak RSS {report['peak_rss_mb']} MB")
+    fx = report["fixture"]
+    kinds = sorted({k.split("_", 1)[1] for k in fx if k.startswith(("correct_", "wrong_"))})
+    print("accuracy: " + ", ".join(f"{k} {fx.get('correct_' + k, 0)}/{fx.get('correct_' + k, 0) + fx.get('wrong_' + k, 0)}"
+                                   for k in kinds) + f"; stub LLM calls {fx.get('llm_calls', 0)}")
+    for stage, q in (report["stages"] or {}).items():
+        print(f"  {stage:<9} n={q['count']:<5} p50 {q['p50']:.3f}s  p95 {q['p95']:.3f}s  p99 {q['p99']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
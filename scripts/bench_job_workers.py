@@ -0,0 +1,159 @@
+"""
+Throughput benchmark for the durable job queue across worker-process counts.
+
+Starts a local fixture server (one CSV-sum quiz page per job, each with its own data
+file, and a /submit endpoint), then for each worker count enqueues --jobs jobs into a
+fresh SQLite queue, starts that many `python -m app.job_worker` processes and measures
+how long they take to drain it.
+
+    python scripts/bench_job_workers.py --workers 1,2,4,8 --jobs 64 --rows 200000
+
+Worker processes get CPU_PROCESS_WORKERS=--cpu-workers (default 1) so the process count,
+not the per-process executor pool, is what varies between runs.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+
+def serve_fixture(port: int, rows: int):
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import HTMLResponse, Response
+
+    base = "value\n" + "".join(f"{i % 1000}\n" for i in range(rows))
+    expected_base = sum(i % 1000 for i in range(rows))
+    fixture = FastAPI()
+    submitted = {"correct": 0, "wrong": 0}
+
+    @fixture.get("/q/{n}", response_class=HTMLResponse)
+    def quiz(n: int):
+        return (f"<p>Download <a href='/d/{n}.csv'>the CSV file</a> and sum the value column. "
+                f"Post your answer to http://127.0.0.1:{port}/submit</p>")
+
+    @fixture.get("/d/{n}.csv")
+    def data(n: int):
+        # one extra row per job so every file has its own content hash (no cross-job cache hits)
+        return Response(base + f"{n}\n", media_type="text/csv")
+
+    @fixture.post("/submit")
+    def submit(body: dict):
+        n = int(body["url"].rsplit("/", 1)[-1])
+        ok = body.get("answer") == expected_base + n
+        submitted["correct" if ok else "wrong"] += 1
+        return {"correct": ok}
+
+    @fixture.get("/counts")
+    def counts():
+        return submitted
+
+    uvicorn.run(fixture, host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_until(check, timeout: float, interval: float = 0.2):
+    end = time.time() + timeout
+    while time.time() < end:
+        if check():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def run(workers: int, args, port: int, offset: int) -> dict:
+    from app.job_queue import DurableQueue
+
+    tmp = tempfile.mkdtemp(prefix="bench-jobs-")
+    env = {
+        **os.environ,
+        "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite3"),
+        "DOWNLOAD_CACHE_DIR": os.path.join(tmp, "downloads"),
+        "FRAME_CACHE_DIR": os.path.join(tmp, "frames"),
+        "LLM_CACHE_TTL": "0",
+        "AIPIPE_TOKEN": "",
+        "CPU_PROCESS_WORKERS": str(args.cpu_workers),
+        "JOB_CONCURRENCY": str(args.slots),
+        "GLOBAL_TIMEOUT": str(args.timeout),
+    }
+    queue = DurableQueue(path=env["JOB_QUEUE_PATH"], max_queue=args.jobs, timeout=args.timeout)
+    procs = [subprocess.Popen([sys.executable, "-m", "app.job_worker"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+             for _ in range(workers)]
+    try:
+        if not wait_until(lambda: len(queue.stats()["workers"]) == workers, 60):
+            raise RuntimeError("worker processes did not start")
+        time.sleep(args.warmup)
+        t0 = time.time()
+        for n in range(offset, offset + args.jobs):
+            queue.submit({"email": "bench@example.com", "secret": "x", "url": f"http://127.0.0.1:{port}/q/{n}"})
+        drained = wait_until(lambda: queue.stats()["queued"] == 0 and queue.stats()["running"] == 0, args.timeout * 2)
+        elapsed = time.time() - t0
+        states = queue.stats()["states"]
+    finally:
+        for p in procs:
+            p.send_signal(signal.SIGTERM)
+        for p in procs:
+            try:
+                p.wait(15)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        queue.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"workers": workers, "seconds": elapsed, "jobs_per_sec": args.jobs / elapsed, "drained": drained,
+            "states": states}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4,8", help="comma separated worker process counts")
+    ap.add_argument("--jobs", type=int, default=64)
+    ap.add_argument("--rows", type=int, default=200000, help="rows in each job's CSV")
+    ap.add_argument("--slots", type=int, default=4, help="JOB_CONCURRENCY of each worker process")
+    ap.add_argument("--cpu-workers", type=int, default=1, help="CPU_PROCESS_WORKERS of each worker process")
+    ap.add_argument("--timeout", type=int, default=170, help="GLOBAL_TIMEOUT for each job")
+    ap.add_argument("--warmup", type=float, default=3.0, help="seconds to let workers prewarm before enqueueing")
+    ap.add_argument("--port", type=int, default=8799)
+    ap.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve:
+        serve_fixture(args.port, args.rows)
+        return
+
+    import httpx
+    fixture = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+                                "--rows", str(args.rows)], cwd=ROOT)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_until(lambda: _up(httpx, base_url), 30):
+            raise RuntimeError("fixture server did not start")
+        results = []
+        for i, w in enumerate(int(x) for x in args.workers.split(",")):
+            res = run(w, args, args.port, offset=i * args.jobs)
+            results.append(res)
+            speedup = res["jobs_per_sec"] / results[0]["jobs_per_sec"]
+            print(f"{w:>2} worker(s): {args.jobs} jobs in {res['seconds']:6.2f}s  {res['jobs_per_sec']:6.2f} jobs/s  "
+                  f"x{speedup:.2f}  states={json.dumps(res['states'])}", flush=True)
+        print("submissions:", httpx.get(base_url + "/counts").json())
+    finally:
+        fixture.terminate()
+        fixture.wait(10)
+
+
+def _up(httpx, base_url: str) -> bool:
+    try:
+        return httpx.get(base_url + "/counts", timeout=1).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Run common quiz instructions through the query engine in app/data/query_engine.py and
+compare with the naive path (pd.read_csv of the whole file, then pandas on the full frame).
+
+Each instruction is timed cold (nothing cached: streamed or scanned with the filter pushed into
+the CSV reader), warm-disk (the Arrow copy in the frame cache, scanned with pushdown) and
+warm-memory (the cached frame, sliced). Every answer is checked against the naive one.
+
+    python scripts/bench_query_engine.py --rows 100000,1000000
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# instruction -> naive pandas answer over the full frame
+QUERIES = {
+    "Sum the value column.": lambda df: df["value"].sum(),
+    "What is the average price where region is North?": lambda df: df[df.region == "North"].price.mean(),
+    "Compute the median value for rows with price greater than 5": lambda df: df[df.price > 5].value.median(),
+    "How many rows have value >= 900?": lambda df: int((df.value >= 900).sum()),
+    "Sum of value by region": lambda df: df.groupby("region").value.sum().to_dict(),
+    "Which region has the highest total value?": lambda df: df.groupby("region").value.sum().idxmax(),
+    "Top 2 products by average price": lambda df: list(df.groupby("product").price.mean().nlargest(2).index),
+    "List the distinct regions": lambda df: sorted(df.region.unique()),
+    "Pivot the sum of value with region and product":
+        lambda df: {r: row.to_dict() for r, row in df.pivot_table(index="region", columns="product", values="value",
+                                                                 aggfunc="sum").iterrows()},
+    "What is the standard deviation of price where region = 'East' and value > 500?":
+        lambda df: df[(df.region == "East") & (df.value > 500)].price.std(),
+}
+
+
+def make_csv(path: str, rows: int):
+    """Write a quiz-like CSV (id, region, product, note, value, price) in blocks."""
+    rng = np.random.default_rng(0)
+    block = 1_000_000
+    with open(path, "w") as f:
+        f.write("id,region,product,note,value,price\n")
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            pd.DataFrame({
+                "id": np.arange(start, start + n),
+                "region": rng.choice(["North", "South", "East", "West"], n),
+                "product": rng.choice(["apple", "pear", "fig"], n),
+                "note": rng.choice(["lorem ipsum dolor", "sit amet", "consectetur adipiscing elit"], n),
+                "value": rng.integers(0, 1000, n),
+                "price": rng.uniform(0, 10, n).round(2),
+            }).to_csv(f, header=False, index=False)
+
+
+def same(a, b) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)):
+        return math.isclose(float(a), float(b), rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", default="100000,1000000", help="comma separated row counts")
+    args = ap.parse_args()
+
+    from app.data import query_engine
+    from app.data.frame_cache import FrameCache
+
+    print(f"{'rows':>9} {'naive':>8} {'cold':>8} {'disk':>8} {'memory':>8}  {'source (cold)':<13} instruction")
+    with tempfile.TemporaryDirectory() as tmp:
+        # a private cache so earlier runs (or a live service) do not make "cold" warm
+        query_engine.frame_cache = FrameCache(root=os.path.join(tmp, "frames"))
+        failures = 0
+        for rows in [int(x) for x in args.rows.split(",")]:
+            path = os.path.join(tmp, f"bench_{rows}.csv")
+            make_csv(path, rows)
+            totals = [0.0, 0.0, 0.0, 0.0]
+            for instruction, naive in QUERIES.items():
+                t_naive, expected = timed(lambda: naive(pd.read_csv(path)))
+                cache = query_engine.frame_cache
+                query_engine.frame_cache = FrameCache(root=os.path.join(tmp, "frames_cold"))
+                t_cold, cold = timed(query_engine.answer_query, path, "csv", instruction)
+                query_engine.frame_cache = cache
+                cache.load(path, "csv")
+                cache._frames.clear()
+                cache._used = 0
+                t_disk, disk = timed(query_engine.answer_query, path, "csv", instruction)
+                cache.load(path, "csv")
+                t_mem, mem = timed(query_engine.answer_query, path, "csv", instruction)
+                for t, i in zip((t_naive, t_cold, t_disk, t_mem), range(4)):
+                    totals[i] += t
+                ok = all(r is not None and same(r["answer"], expected) for r in (cold, disk, mem))
+                failures += not ok
+                print(f"{rows:>9} {t_naive:>8.3f} {t_cold:>8.3f} {t_disk:>8.3f} {t_mem:>8.3f}  "
+                      f"{(cold or {}).get('source', '-'):<13} {instruction}{'' if ok else '  MISMATCH'}")
+            print(f"{rows:>9} {totals[0]:>8.3f} {totals[1]:>8.3f} {totals[2]:>8.3f} {totals[3]:>8.3f}  {'total':<13}")
+            os.remove(path)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
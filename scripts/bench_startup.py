@@ -0,0 +1,76 @@
+"""
+Startup benchmark: import time and peak RSS of `app.main` in a fresh interpreter.
+
+Runs the import several times in child processes and reports the median import time
+and the max peak RSS. With --max-seconds / --max-rss-mb it exits non-zero when the
+budget is exceeded, so it can run as a regression gate in CI.
+
+    python scripts/bench_startup.py --runs 5 --max-seconds 1.0 --max-rss-mb 120
+    python scripts/bench_startup.py --top 15   # slowest modules from -X importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = (
+    "import json, resource, sys, time\n"
+    "t0 = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - t0\n"
+    "heavy = [m for m in ('pandas', 'numpy', 'matplotlib', 'PyPDF2', 'playwright', 'pyarrow', 'bs4') if m in sys.modules]\n"
+    "print(json.dumps({'seconds': elapsed, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'heavy': heavy}))\n"
+)
+
+
+def probe() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(n: int):
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = [p.strip() for p in line.split(":", 1)[1].split("|")]
+        rows.append((int(cum_us), int(self_us), name))
+    for cum, own, name in sorted(rows, reverse=True)[:n]:
+        print(f"{cum / 1000:>9.1f} ms cumulative {own / 1000:>8.1f} ms self  {name}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-seconds", type=float, default=None, help="fail if median import time exceeds this")
+    ap.add_argument("--max-rss-mb", type=float, default=None, help="fail if peak RSS exceeds this")
+    ap.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = ap.parse_args()
+
+    results = [probe() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in results)
+    rss = max(r["rss_mb"] for r in results)
+    heavy = sorted(set().union(*[r["heavy"] for r in results]))
+    print(f"import app.main: median {median:.3f}s over {args.runs} runs, peak RSS {rss:.1f} MB")
+    print(f"heavy modules loaded at import: {', '.join(heavy) or 'none'}")
+    if args.top:
+        top_imports(args.top)
+
+    failed = False
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"FAIL: import time {median:.3f}s > budget {args.max_seconds}s")
+        failed = True
+    if args.max_rss_mb is not None and rss > args.max_rss_mb:
+        print(f"FAIL: peak RSS {rss:.1f} MB > budget {args.max_rss_mb} MB")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Offline stand-in for the quiz server, for end-to-end runs without network access.
+
+Every chain is a sequence of quiz pages at /quiz/<chain>/<step>. Step kinds:
+  atob   instruction hidden in an atob(`...`) script; sum the value column of a CSV
+  csv    linked CSV attachment (--csv-rows rows); sum the value column
+  xlsx   linked XLSX attachment (--xlsx-rows rows); sum the value column
+  pdf    linked PDF (--pdf-pages pages); the answer is on one named page (LLM step)
+  table  HTML table on the page (--table-rows rows); add up the first column
+  api    JSON endpoint named in the instruction; count its items (LLM step)
+POST /submit checks the answer and returns the next step's URL like the real server.
+POST /llm is a stub of the AiPipe responses API: it answers LLM steps from a token in
+the prompt, but for PDF steps only when the prompt carries the page text it needs.
+With "stream": true it answers as SSE deltas; --llm-ramble appends that many chunks of
+explanation after the answer line (streamed or not), like a chatty model.
+
+    python scripts/quiz_fixture_server.py --port 8900 --steps atob,csv,xlsx,pdf,table,api
+    AIPIPE_URL=http://127.0.0.1:8900/llm AIPIPE_TOKEN=stub uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import base64
+import functools
+import io
+import random
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+STEP_KINDS = ("atob", "csv", "xlsx", "pdf", "table", "api")
+_TOKEN_RE = re.compile(r"quiz-token-([0-9a-f]{12})")
+
+
+def _pdf(pages: List[str]) -> bytes:
+    """Minimal multi-page PDF with one Helvetica text block per page."""
+    def esc(s: str) -> str:
+        return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, text in enumerate(pages):
+        stream = "BT /F1 11 Tf 14 TL 72 760 Td " + " ".join(f"({esc(line)}) '" for line in text.split("\n")) + " ET"
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def create_app(steps=("atob", "csv", "xlsx", "pdf", "table", "api"), csv_rows: int = 100000, xlsx_rows: int = 2000,
+               pdf_pages: int = 5, table_rows: int = 50, llm_latency: float = 0.3,
+               llm_ramble: int = 0, llm_chunk_delay: float = 0.02) -> FastAPI:
+    fixture = FastAPI(title="Quiz fixture server")
+    stats: Counter = Counter()
+    tokens: Dict[str, Tuple[Any, str]] = {}  # token -> (answer, evidence the LLM prompt must contain)
+
+    @functools.lru_cache(maxsize=256)
+    def step(chain: str, k: int) -> Dict[str, Any]:
+        """Everything about step k of a chain, derived deterministically from (chain, k)."""
+        kind = steps[k % len(steps)]
+        rng = random.Random(f"{chain}:{k}")
+        token = "%012x" % rng.getrandbits(48)
+        a, b = rng.randint(1, 97), rng.randint(0, 999)
+        info: Dict[str, Any] = {"kind": kind, "token": token}
+        if kind in ("atob", "csv"):
+            values = [(i * a + b) % 1000 for i in range(csv_rows)]
+            info["file"] = ("csv", ("id,value\n" + "".join(f"{i},{v}\n" for i, v in enumerate(values))).encode())
+            info["answer"] = sum(values)
+        elif kind == "xlsx":
+            import pandas as pd
+            values = [(i * a + b) % 1000 for i in range(xlsx_rows)]
+            buf = io.BytesIO()
+            pd.DataFrame({"id": range(xlsx_rows), "value": values}).to_excel(buf, index=False)
+            info["file"] = ("xlsx", buf.getvalue())
+            info["answer"] = sum(values)
+        elif kind == "pdf":
+            page = rng.randint(1, pdf_pages)
+            totals = [rng.randint(1000, 99999) for _ in range(pdf_pages)]
+            info["file"] = ("pdf", _pdf([f"Quarterly report, page {p + 1}\nTotal on this page: {totals[p]}"
+                                         for p in range(pdf_pages)]))
+            info["page"] = page
+            info["answer"] = totals[page - 1]
+            tokens[token] = (info["answer"], f"Total on this page: {totals[page - 1]}")
+        elif kind == "table":
+            values = [rng.randint(1, 500) for _ in range(table_rows)]
+            info["rows"] = values
+            info["answer"] = sum(values)
+        elif kind == "api":
+            info["items"] = [{"id": i, "name": f"item-{i}"} for i in range(rng.randint(3, 40))]
+            info["answer"] = len(info["items"])
+            tokens[token] = (info["answer"], "")
+        return info
+
+    def page(request: Request, chain: str, k: int) -> str:
+        info = step(chain, k)
+        origin = str(request.base_url).rstrip("/")
+        kind = info["kind"]
+        submit = f"Post your answer to {origin}/submit"
+        file_url = f"{origin}/files/{chain}/{k}.{info['file'][0]}" if "file" in info else ""
+        if kind == "atob":
+            text = f"Download the CSV file at {file_url} and sum the value column. {submit}"
+            b64 = base64.b64encode(text.encode()).decode()
+            return (f"<div id='result'></div><script>document.querySelector('#result').innerHTML = "
+                    f"atob(`{b64}`);</script>")
+        if kind == "csv":
+            return f"<p>Download <a href='{file_url}'>the CSV file</a> and sum the value column. {submit}</p>"
+        if kind == "xlsx":
+            return (f"<p>Download <a href='{file_url}'>the spreadsheet</a> and compute the sum of the value column. "
+                    f"{submit}</p>")
+        if kind == "pdf":
+            return (f"<p>Download <a href='{file_url}'>the PDF report</a>. What is the total on page {info['page']}? "
+                    f"Reference quiz-token-{info['token']}. {submit}</p>")
+        if kind == "table":
+            rows = "".join(f"<tr><td>{v}</td><td>row {i}</td></tr>" for i, v in enumerate(info["rows"]))
+            return (f"<p>Add up the numbers in the first column shown below. {submit}</p>"
+                    f"<table><tr><th>amount</th><th>label</th></tr>{rows}</table>")
+        return (f"<p>Call the API endpoint at {origin}/api/{chain}/{k} and report how many items it returns. "
+                f"Reference quiz-token-{info['token']}. {submit}</p>")
+
+    @fixture.get("/quiz/{chain}/{k}", response_class=HTMLResponse)
+    def quiz(request: Request, chain: str, k: int):
+        stats[f"pages_{step(chain, k)['kind']}"] += 1
+        return f"<html><body><h1>Quiz {k + 1}</h1>{page(request, chain, k)}</body></html>"
+
+    @fixture.get("/files/{chain}/{name}")
+    def files(chain: str, name: str):
+        k = int(name.split(".", 1)[0])
+        ext, body = step(chain, k)["file"]
+        media = {"csv": "text/csv", "pdf": "application/pdf",
+                 "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}[ext]
+        stats["file_bytes"] += len(body)
+        return Response(body, media_type=media)
+
+    @fixture.get("/api/{chain}/{k}")
+    def api(chain: str, k: int):
+        return {"items": step(chain, k)["items"]}
+
+    @fixture.post("/submit")
+    async def submit(request: Request):
+        body = await request.json()
+        m = re.search(r"/quiz/([^/]+)/(\d+)", body.get("url") or "")
+        if not m:
+            return JSONResponse(status_code=400, content={"correct": False, "reason": "unknown quiz url"})
+        chain, k = m.group(1), int(m.group(2))
+        info = step(chain, k)
+        answer = body.get("answer")
+        try:
+            correct = float(answer) == float(info["answer"])
+        except (TypeError, ValueError):
+            correct = str(answer).strip() == str(info["answer"])
+        stats[f"{'correct' if correct else 'wrong'}_{info['kind']}"] += 1
+        origin = str(request.base_url).rstrip("/")
+        # like the real server, hand out the next URL whether or not the answer was right
+        next_url = f"{origin}/quiz/{chain}/{k + 1}" if k + 1 < len(steps) else None
+        return {"correct": correct, "url": next_url, "reason": None if correct else f"expected {info['answer']}"}
+
+    @fixture.post("/llm")
+    async def llm(request: Request):
+        body = await request.json()
+        prompt = body.get("input") or ""
+        stats["llm_calls"] += 1
+        await asyncio.sleep(llm_latency)
+        m = _TOKEN_RE.search(prompt)
+        answer, evidence = tokens.get(m.group(1), ("unknown", "")) if m else ("unknown", "")
+        if evidence and evidence not in prompt:
+            answer = "unknown"
+        ramble = [f" This figure was derived from the material provided ({i})." for i in range(llm_ramble)]
+        chunks = [str(answer), "\n\nExplanation:"] + ramble if ramble else [str(answer)]
+        if not body.get("stream"):
+            await asyncio.sleep(llm_chunk_delay * (len(chunks) - 1))
+            text = "".join(chunks)
+            return {"output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}]}
+
+        async def events():
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(llm_chunk_delay)
+                stats["llm_stream_chunks"] += 1
+                yield f"data: {json.dumps({'type': 'response.output_text.delta', 'delta': chunk})}\n\n"
+            yield f"data: {json.dumps({'type': 'response.completed'})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @fixture.get("/stats")
+    def fixture_stats():
+        return dict(stats)
+
+    return fixture
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--steps", default=",".join(STEP_KINDS), help="comma separated step kinds of every chain")
+    ap.add_argument("--csv-rows", type=int, default=100000)
+    ap.add_argument("--xlsx-rows", type=int, default=2000)
+    ap.add_argument("--pdf-pages", type=int, default=5)
+    ap.add_argument("--table-rows", type=int, default=50)
+    ap.add_argument("--llm-latency", type=float, default=0.3, help="seconds before the stub LLM's first token")
+    ap.add_argument("--llm-ramble", type=int, default=0, help="explanation chunks after the answer line")
+    ap.add_argument("--llm-chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    args = ap.parse_args()
+    steps = tuple(s.strip() for s in args.steps.split(",") if s.strip())
+    unknown = set(steps) - set(STEP_KINDS)
+    if unknown:
+        ap.error(f"unknown step kinds: {', '.join(sorted(unknown))}")
+
+    import uvicorn
+    uvicorn.run(create_app(steps, args.csv_rows, args.xlsx_rows, args.pdf_pages, args.table_rows, args.llm_latency,
+                           args.llm_ramble, args.llm_chunk_delay),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
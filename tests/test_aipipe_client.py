@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app import aipipe_client
+from app.aipipe_client import first_answer, run_llm
+from app.llm_cache import LLMCache
+
+REPLY = "The answer is:\n42\nBecause 6 times 7 is 42."
+
+
+@pytest.mark.parametrize("text, answer", [
+    (REPLY, "42"),
+    ("Here is the JSON:\n```json\n{\"a\": [1,\n2]}\n```\n", '{"a": [1,\n2]}'),
+    ("```\n12\n```\n", "12"),
+    ("Answer: 7\nmore", "Answer: 7"),
+])
+def test_first_answer_skips_preamble_and_fences(text, answer):
+    assert first_answer(text) == answer
+
+
+def test_first_answer_waits_while_only_a_preamble_arrived():
+    assert first_answer("The answer is:") is None
+    assert first_answer("The answer is:\n") is None
+
+
+@pytest.fixture
+def non_streaming(monkeypatch, tmp_path):
+    async def ask_openai(prompt, **kwargs):
+        return {"output_text": REPLY}
+
+    monkeypatch.setattr(aipipe_client, "AIPIPE_TOKEN", "token")
+    monkeypatch.setattr(aipipe_client, "LLM_STREAM", False)
+    monkeypatch.setattr(aipipe_client, "ask_openai", ask_openai)
+    monkeypatch.setattr(aipipe_client, "llm_cache", LLMCache(path=str(tmp_path / "llm.sqlite3")))
+
+
+def test_stop_applies_without_streaming(non_streaming):
+    assert asyncio.run(run_llm("q", stop=first_answer)) == "42"
+
+
+def test_stop_trimmed_reply_is_cached_apart_from_the_full_reply(non_streaming):
+    async def both():
+        return await run_llm("q", stop=first_answer), await run_llm("q")
+
+    assert asyncio.run(both()) == ("42", REPLY)
@@ -0,0 +1,20 @@
+import pytest
+
+from app.data.csv_aggregate import aggregate_csv
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "pandas"])
+def test_integer_sums_stay_exact_past_2_53(tmp_path, engine):
+    big = 2 ** 62 + 7
+    path = tmp_path / "big.csv"
+    path.write_text("id,value\n" + "".join(f"{i},{big}\n" for i in range(10)))
+    res = aggregate_csv(str(path), "value", engine=engine)
+    assert res["sum"] == 10 * big
+    assert res["max"] == big
+    assert aggregate_csv(str(path), "value", aggs=("sum",), where=("id", ">=", 7), engine=engine)["sum"] == 3 * big
+
+
+def test_decimals_after_integers_still_aggregate(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_text("id,value\n" + "".join(f"{i},1\n" for i in range(200000)) + "200000,0.5\n")
+    assert aggregate_csv(str(path), "value", aggs=("sum",))["sum"] == 200000.5
@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+from app import executors
+
+
+def _nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_run_cpu_works_across_event_loops(monkeypatch):
+    monkeypatch.setattr(executors, "HEAVY_STAGE_LIMIT", 1)
+
+    async def main():
+        return await asyncio.gather(*(executors.run_cpu(_nap, 0.01, kind="thread") for _ in range(3)))
+
+    assert asyncio.run(main()) == [0.01] * 3
+    assert asyncio.run(main()) == [0.01] * 3
@@ -0,0 +1,42 @@
+from app.llm_context import _pack, dedupe, estimate_tokens, page_blocks
+
+
+def test_pack_cut_stays_within_budget():
+    text, used, dropped = _pack([("Instruction", ["a " * 50])], 20)
+    assert used <= 20
+    assert estimate_tokens(text) <= 20
+    assert text.endswith(" ...")
+    assert dropped == 0
+
+
+def test_pack_drops_what_does_not_fit():
+    text, used, dropped = _pack([("Instruction", ["short"]), ("Other page text", ["b " * 200, "tail"])], 15)
+    assert used <= 15
+    assert "tail" not in text
+    assert dropped == 2
+
+
+def test_page_blocks_keep_repeated_table_values():
+    html = ("<body><p>Sum the value column.</p><table><tr><th>value</th></tr>"
+            "<tr><td>5</td></tr><tr><td>5</td></tr><tr><td>7</td></tr></table></body>")
+    blocks = page_blocks(html)
+    assert blocks == ["Sum the value column.", "value\n5\n5\n7"]
+
+
+def test_page_blocks_keep_long_tables_whole():
+    rows = "".join(f"<tr><td>{i}</td><td>x</td></tr>" for i in range(200))
+    blocks = page_blocks(f"<body><table><tr><th>id</th><th>tag</th></tr>{rows}</table></body>")
+    assert len(blocks) == 1
+    assert blocks[0].split("\n") == ["id | tag"] + [f"{i} | x" for i in range(200)]
+
+
+def test_page_blocks_keep_list_items_and_drop_boilerplate():
+    html = ("<body><nav>Home</nav><p>Pick one</p><ul><li>yes</li><li>yes</li><li>no</li></ul>"
+            "<p>Pick one</p><script>var x = 1;</script><footer>(c)</footer></body>")
+    assert page_blocks(html) == ["Pick one", "- yes\n- yes\n- no"]
+
+
+def test_dedupe_drops_repeated_lines_but_not_block_rows():
+    seen = set()
+    assert dedupe(["A  b", "a b", "", "x\nx"], seen) == ["A b", "x\nx"]
+    assert dedupe(["x\nx", "c"], seen) == ["c"]
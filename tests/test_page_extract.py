@@ -0,0 +1,53 @@
+import base64
+
+from app.browser.browser_runner import page_info_from_extract
+
+URL = "https://quiz.example.com/quiz/1"
+
+
+def _extract(**overrides):
+    """An EXTRACT_JS-shaped result for a plain page; fields overridden per test."""
+    data = {"html": "<html></html>", "scripts": [], "text": "", "hrefs": [], "forms": [], "attr_urls": [],
+            "origin": "https://quiz.example.com", "tables": []}
+    data.update(overrides)
+    return data
+
+
+def test_atob_page_decodes_the_instruction():
+    hidden = "Sum the value column. Post to https://quiz.example.com/submit"
+    script = f"document.querySelector('#result').innerHTML = atob(`{base64.b64encode(hidden.encode()).decode()}`);"
+    info = page_info_from_extract(_extract(scripts=[script], text="Loading..."), URL)
+    assert info["instruction"] == hidden
+    assert info["instruction_from"] == "atob"
+    assert info["submit_url"] == "https://quiz.example.com/submit"
+
+
+def test_text_page_uses_the_visible_text():
+    text = "Download the file and sum it. Submit to https://quiz.example.com/submit?step=2"
+    info = page_info_from_extract(_extract(text=text, scripts=["console.log(atob(x))"]), URL)
+    assert info["instruction"] == text
+    assert info["instruction_from"] == "text"
+    assert info["submit_url"] == "https://quiz.example.com/submit?step=2"
+    assert info["via"] == "browser" and info["url"] == URL
+
+
+def test_relative_data_urls_are_resolved_against_the_page():
+    info = page_info_from_extract(_extract(text="Get the data", hrefs=["https://quiz.example.com/files/a.csv"],
+                                           attr_urls=["/files/b.pdf", "logo.svg"]), URL)
+    assert info["data_urls"] == ["https://quiz.example.com/files/a.csv", "https://quiz.example.com/files/b.pdf"]
+
+
+def test_submit_falls_back_to_origin_when_only_the_path_is_named():
+    info = page_info_from_extract(_extract(text="POST your answer to /submit"), URL)
+    assert info["submit_url"] == "https://quiz.example.com/submit"
+
+
+def test_submit_falls_back_to_the_form_action():
+    info = page_info_from_extract(_extract(text="Answer below", origin="null",
+                                           forms=["https://quiz.example.com/answer"]), URL)
+    assert info["submit_url"] == "https://quiz.example.com/answer"
+
+
+def test_tables_are_passed_through():
+    rows = [["Name", "Score"], ["a", "1"]]
+    assert page_info_from_extract(_extract(text="t", tables=[rows]), URL)["tables"] == [rows]
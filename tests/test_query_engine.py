@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from app.data.query_engine import parse_instruction, answer_query
+
+DTYPES = {"id": "int64", "region": "object", "product": "object", "value": "int64", "price": "float64"}
+
+
+@pytest.mark.parametrize("instruction", [
+    "What is the total number of rows where value is at least 3?",
+    "How many rows have value at least 3?",
+    "number of records where value >= 3",
+    "Count the rows with value >= 3",
+])
+def test_row_count_phrasings_count_rows(instruction):
+    plan = parse_instruction(instruction, DTYPES)
+    assert plan is not None
+    assert (plan.op, plan.agg, plan.column) == ("aggregate", "count", None)
+    assert plan.where == [("value", ">=", 3)]
+
+
+@pytest.mark.parametrize("instruction", [
+    "How many entries have region north?",
+    "What is the average price of each product sold in region North",
+])
+def test_partly_understood_instructions_are_not_planned(instruction):
+    assert parse_instruction(instruction, DTYPES) is None
+
+
+@pytest.mark.parametrize("instruction, where", [
+    ("Sum the values greater than 500", [("value", ">", 500)]),
+    ("Count rows where ids are above 3", [("id", ">", 3)]),
+])
+def test_plural_column_filters_are_planned(instruction, where):
+    plan = parse_instruction(instruction, DTYPES)
+    assert plan is not None
+    assert plan.where == where
+
+
+@pytest.mark.parametrize("instruction", [
+    "How many values are above the cutoff of 500?",
+    "Sum the value for the rows over the 1,000 mark",
+    "sum of value for the first 100 rows",
+])
+def test_unplanned_conditions_are_not_planned(instruction):
+    assert parse_instruction(instruction, DTYPES) is None
+
+
+def test_labels_and_urls_are_not_conditions():
+    plan = parse_instruction("Quiz 1 Download the CSV file and sum the value column. "
+                             "Post your answer to http://127.0.0.1:8910/submit", DTYPES)
+    assert plan is not None
+    assert (plan.agg, plan.column, plan.where) == ("sum", "value", [])
+
+
+def test_count_with_filter_answers_count(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"id": range(6), "region": ["North", "South"] * 3, "product": ["fig"] * 6,
+                  "value": [1, 2, 3, 4, 5, 6], "price": [0.5] * 6}).to_csv(path, index=False)
+    res = answer_query(str(path), "csv", "What is the total number of rows where value is at least 3?")
+    assert res["answer"] == 4
+    assert answer_query(str(path), "csv", "How many entries have region north?") is None
@@ -0,0 +1,18 @@
+from app.workers.web_scraper_worker import _rows_table_sum
+
+
+def test_header_row_and_text_column_are_skipped():
+    rows = [["Name", "Amount"], ["alpha", "1,200"], ["beta", "300"], ["gamma", "45"]]
+    assert _rows_table_sum(rows) == {"worker": "web_scraper", "answer": 1545, "type": "number"}
+
+
+def test_table_without_header_sums_its_first_numeric_column():
+    assert _rows_table_sum([["1", "x"], ["2", "y"], ["3.5", "z"]])["answer"] == 6.5
+
+
+def test_empty_rows_are_ignored():
+    assert _rows_table_sum([[], ["Total"], []]) == {}
+
+
+def test_no_numeric_column_is_an_error():
+    assert "error" in _rows_table_sum([["Name"], ["alpha"], ["beta"]])